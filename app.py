@@ -3,11 +3,37 @@
 CineplexxDB - Cinema Database Management System
 Render Deployment Version (PostgreSQL) - Auto-loads sample data
 """
-from flask import Flask, render_template_string, request, jsonify
+from flask import Flask, Response, render_template_string, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 import psycopg
+from psycopg.types.numeric import FloatLoader
+from psycopg.types.string import TextLoader
+from psycopg_pool import ConnectionPool, PoolTimeout
+import atexit
+import base64
+import codecs
+import collections
+import contextlib
+import contextvars
+import csv
+import email.utils
+import functools
+import hashlib
+import json
 import os
+import re
+import sys
+import threading
+import time as clock
+import uuid
+import weakref
 from datetime import date, time
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 app = Flask(__name__)
 
@@ -19,20 +45,360 @@ DATABASE_URL = os.environ.get('DATABASE_URL', 'postgresql://localhost/cineplexxd
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+# Connection pool, one per worker process. Gunicorn forks workers after the
+# module is imported, so the pool is opened lazily in the process that uses it.
+# DB_MAX_CONNECTIONS is the budget for the whole deployment and is split across
+# WEB_CONCURRENCY workers unless DB_POOL_MAX_SIZE pins the per-worker size.
+DB_WORKERS = max(1, int(os.environ.get('WEB_CONCURRENCY', 1)))
+DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 20))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', max(1, DB_MAX_CONNECTIONS // DB_WORKERS)))
+DB_POOL_MIN_SIZE = min(int(os.environ.get('DB_POOL_MIN_SIZE', 1)), DB_POOL_MAX_SIZE)
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5))
+DB_POOL_MAX_LIFETIME = float(os.environ.get('DB_POOL_MAX_LIFETIME', 1800))
+DB_POOL_MAX_IDLE = float(os.environ.get('DB_POOL_MAX_IDLE', 300))
+DB_POOL_CHECK_IDLE = float(os.environ.get('DB_POOL_CHECK_IDLE', 30))
+DB_PREPARE = True if os.environ.get('DB_PREPARE', '1') == '1' else None
+DB_PREPARED_MAX = int(os.environ.get('DB_PREPARED_MAX', 256))
+
+# The seat-hold reaper and the analytics refresher run as daemon threads,
+# started by the first request that needs them. asgi_app turns this off and
+# runs both as tasks on its event loop instead.
+BACKGROUND_THREADS = True
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_last_used = weakref.WeakKeyDictionary()
+
+def _check_connection(conn):
+    # Only ping connections that sat idle long enough to have been dropped by
+    # a firewall or a server restart; recently used ones skip the round trip.
+    if clock.monotonic() - _last_used.get(conn, 0) > DB_POOL_CHECK_IDLE:
+        ConnectionPool.check_connection(conn)
+
+def _touch_connection(conn):
+    _last_used[conn] = clock.monotonic()
+
+# Each request served gets a RequestTrace (see INSTRUMENTATION). Pooled
+# connections use TracingCursor, which times every statement it sends and
+# the fetches that load its rows into the trace of the request being served,
+# and into per-statement totals for /metrics.
+class RequestTrace:
+    def __init__(self):
+        self.started = clock.perf_counter()
+        self.phases = collections.defaultdict(float)
+        self.statements = []
+        self.samples = collections.Counter()
+
+_trace = contextvars.ContextVar('trace', default=None)
+
+def add_phase(name, seconds):
+    trace = _trace.get()
+    if trace is not None:
+        trace.phases[name] += seconds
+
+@contextlib.contextmanager
+def phase(name):
+    began = clock.perf_counter()
+    try:
+        yield
+    finally:
+        add_phase(name, clock.perf_counter() - began)
+
+def record_statement(query, seconds):
+    text = normalize_sql(query if isinstance(query, str) else str(query))
+    with _sql_lock:
+        stats = _sql_stats.get(text)
+        if stats is None:
+            if len(_sql_stats) >= SQL_STATS_MAX:
+                text = '<other>'
+            stats = _sql_stats.setdefault(text, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+    trace = _trace.get()
+    if trace is not None:
+        trace.phases['db'] += seconds
+        trace.statements.append((text, seconds))
+
+class TracingCursor(psycopg.Cursor):
+    def execute(self, query, *args, **kwargs):
+        began = clock.perf_counter()
+        try:
+            return super().execute(query, *args, **kwargs)
+        finally:
+            record_statement(query, clock.perf_counter() - began)
+
+    def executemany(self, query, *args, **kwargs):
+        began = clock.perf_counter()
+        try:
+            return super().executemany(query, *args, **kwargs)
+        finally:
+            record_statement(query, clock.perf_counter() - began)
+
+    @contextlib.contextmanager
+    def copy(self, statement, *args, **kwargs):
+        began = clock.perf_counter()
+        try:
+            with super().copy(statement, *args, **kwargs) as copy:
+                yield copy
+        finally:
+            record_statement(statement, clock.perf_counter() - began)
+
+    def fetchone(self):
+        with phase('fetch'):
+            return super().fetchone()
+
+    def fetchmany(self, *args, **kwargs):
+        with phase('fetch'):
+            return super().fetchmany(*args, **kwargs)
+
+    def fetchall(self):
+        with phase('fetch'):
+            return super().fetchall()
+
+def _configure_connection(conn):
+    conn.prepared_max = DB_PREPARED_MAX
+    conn.cursor_factory = TracingCursor
+    _touch_connection(conn)
+
+def get_pool():
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ConnectionPool(
+                    DATABASE_URL,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    max_lifetime=DB_POOL_MAX_LIFETIME,
+                    max_idle=DB_POOL_MAX_IDLE,
+                    configure=_configure_connection,
+                    check=_check_connection,
+                    reset=_touch_connection,
+                    name=f'cineplexx-{os.getpid()}',
+                    open=True,
+                )
+                _pool_pid = os.getpid()
+    return _pool
+
+@atexit.register
+def close_pool():
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.close()
+
+@contextlib.contextmanager
 def get_connection():
-    return psycopg.connect(DATABASE_URL)
-
-def serialize_row(row, columns):
-    result = {}
-    for i, col in enumerate(columns):
-        value = row[i]
-        if isinstance(value, (date, time)):
-            result[col] = str(value)
-        elif isinstance(value, Decimal):
-            result[col] = float(value)
+    # The connection goes back to the pool when the block exits, and is rolled
+    # back first if the block raised. Waiting for it is the 'connect' phase.
+    began = clock.perf_counter()
+    with get_pool().connection() as conn:
+        add_phase('connect', clock.perf_counter() - began)
+        yield conn
+
+def db_error(e):
+    if isinstance(e, PoolTimeout):
+        return {'error': 'Database is busy, please retry'}, 503, {'Retry-After': '1'}
+    return {'error': str(e)}, 500
+
+def parse_value(value, typ):
+    # Coerce an incoming JSON/CSV value to the Python type for a TABLES type,
+    # raising ValueError with a readable message when it does not fit.
+    if value is None or value == '':
+        return None
+    if typ == 'int':
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError(f'{value!r} is not an integer')
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{value!r} is not an integer')
+    if typ.startswith('decimal'):
+        precision, scale = [int(n) for n in re.findall(r'\d+', typ)]
+        try:
+            number = Decimal(str(value))
+        except InvalidOperation:
+            raise ValueError(f'{value!r} is not a number')
+        if not number.is_finite() or abs(number) >= 10 ** (precision - scale):
+            raise ValueError(f'{value!r} is out of range for {typ}')
+        return number
+    if typ == 'date':
+        try:
+            return date.fromisoformat(str(value))
+        except ValueError:
+            raise ValueError(f'{value!r} is not a date (YYYY-MM-DD)')
+    if typ == 'time':
+        try:
+            return time.fromisoformat(str(value))
+        except ValueError:
+            raise ValueError(f'{value!r} is not a time (HH:MM[:SS])')
+    if typ.startswith('varchar'):
+        value = str(value)
+        length = int(re.search(r'\d+', typ).group())
+        if len(value) > length:
+            raise ValueError(f'longer than {length} characters')
+        return value
+    return value
+
+def validate_record(table, data):
+    schema = TABLES[table]
+    values = {}
+    errors = []
+    if not isinstance(data, dict):
+        return values, ['record must be an object']
+    for col in data:
+        if col not in schema['columns']:
+            errors.append(f'{col}: unknown column')
+    for col, typ in zip(schema['columns'], schema['types']):
+        try:
+            values[col] = parse_value(data.get(col), typ)
+        except ValueError as e:
+            errors.append(f'{col}: {e}')
+            continue
+        if values[col] is None and col in schema['required']:
+            errors.append(f'{col}: required')
+    return values, errors
+
+# ============================================
+# DATABASE STEPS
+# ============================================
+# Route bodies are shared by this Flask app and the Quart app in asgi_app.py.
+# Each is a generator (see ROUTE HANDLERS) that yields the database steps it
+# needs, gets each step's result back at the yield and returns the response.
+# run_steps() runs the steps on one pooled connection, taken at the first step
+# and given back when the handler returns; run_steps_async() does the same on
+# an async connection. A failed step raises at the handler's yield, so the
+# handler catches the database errors it expects and the rest reach db_error().
+class Result:
+    def __init__(self, cursor, rows):
+        self.columns = [desc[0] for desc in cursor.description] if cursor.description else []
+        self.rows = rows
+        self.rowcount = cursor.rowcount
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def records(self):
+        return [dict(zip(self.columns, row)) for row in self.rows]
+
+class Query:
+    # json reads through json_cursor(), prepared runs a compiled statement,
+    # and transaction wraps the statement in its own transaction (a savepoint
+    # if one is open).
+    def __init__(self, sql, params=None, json=False, prepared=False, transaction=False):
+        self.sql = sql
+        self.params = params
+        self.json = json
+        self.prepared = prepared
+        self.transaction = transaction
+
+    def execute(self, conn, cursor):
+        if self.prepared:
+            return execute_compiled(conn, self.sql, self.params, cursor=cursor)
+        return cursor.execute(self.sql, self.params)
+
+    def run(self, conn):
+        cursor = json_cursor(conn) if self.json else conn.cursor()
+        if self.transaction:
+            with conn.transaction():
+                self.execute(conn, cursor)
         else:
-            result[col] = value
-    return result
+            self.execute(conn, cursor)
+        return Result(cursor, cursor.fetchall() if cursor.description else [])
+
+    async def run_async(self, conn):
+        cursor = json_cursor(conn) if self.json else conn.cursor()
+        if self.transaction:
+            async with conn.transaction():
+                await self.execute(conn, cursor)
+        else:
+            await self.execute(conn, cursor)
+        return Result(cursor, await cursor.fetchall() if cursor.description else [])
+
+class Copy:
+    # COPY ... FROM STDIN fed from (line_no, record) pairs, an async iterable
+    # under run_async(); to_row returns the row to send, or None to skip it.
+    def __init__(self, sql, records, to_row):
+        self.sql = sql
+        self.records = records
+        self.to_row = to_row
+
+    def run(self, conn):
+        with conn.cursor().copy(self.sql) as copy:
+            for line_no, record in self.records:
+                row = self.to_row(line_no, record)
+                if row is not None:
+                    copy.write_row(row)
+
+    async def run_async(self, conn):
+        async with conn.cursor().copy(self.sql) as copy:
+            async for line_no, record in self.records:
+                row = self.to_row(line_no, record)
+                if row is not None:
+                    await copy.write_row(row)
+
+class Commit:
+    def run(self, conn):
+        conn.commit()
+
+    async def run_async(self, conn):
+        await conn.commit()
+
+class Rollback:
+    def run(self, conn):
+        conn.rollback()
+
+    async def run_async(self, conn):
+        await conn.rollback()
+
+class Autocommit:
+    def __init__(self, on):
+        self.on = on
+
+    def run(self, conn):
+        conn.autocommit = self.on
+
+    async def run_async(self, conn):
+        await conn.set_autocommit(self.on)
+
+def run_steps(steps, connect=get_connection):
+    with contextlib.ExitStack() as stack:
+        conn = reply = error = None
+        while True:
+            try:
+                step = steps.send(reply) if error is None else steps.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            reply = error = None
+            try:
+                if conn is None:
+                    conn = stack.enter_context(connect())
+                reply = step.run(conn)
+            except Exception as e:
+                error = e
+
+async def run_steps_async(steps, connect):
+    async with contextlib.AsyncExitStack() as stack:
+        conn = reply = error = None
+        while True:
+            try:
+                step = steps.send(reply) if error is None else steps.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            reply = error = None
+            try:
+                if conn is None:
+                    conn = await stack.enter_async_context(connect())
+                reply = await step.run_async(conn)
+            except Exception as e:
+                error = e
+
+def respond(handler):
+    try:
+        return run_steps(handler)
+    except Exception as e:
+        return db_error(e)
 
 # ============================================
 # TABLE SCHEMAS
@@ -328,7 +694,13 @@ HTML_TEMPLATE = '''
         .table-container { background: var(--bg-card); border-radius: var(--radius-lg); border: 1px solid var(--border-color); overflow: hidden; }
         .table-header { padding: 20px 25px; border-bottom: 1px solid var(--border-color); display: flex; justify-content: space-between; align-items: center; background: linear-gradient(90deg, rgba(229, 9, 20, 0.05) 0%, transparent 100%); }
         .table-header span { color: var(--text-gray); font-size: 0.9rem; }
+        .table-footer { display: none; justify-content: center; padding: 18px; border-top: 1px solid var(--border-color); }
+        .table-footer.active { display: flex; }
         .table-wrapper { overflow-x: auto; }
+        #tableScroll { max-height: calc(100vh - 260px); overflow-y: auto; }
+        #tableScroll th { position: sticky; top: 0; z-index: 1; background: var(--bg-card); }
+        #tableScroll td { white-space: nowrap; max-width: 320px; overflow: hidden; text-overflow: ellipsis; }
+        #tableScroll tr.spacer td { padding: 0; border: none; }
         table { width: 100%; border-collapse: collapse; }
         th, td { padding: 14px 20px; text-align: left; border-bottom: 1px solid var(--border-color); }
         th { background: rgba(255, 255, 255, 0.03); font-weight: 600; font-size: 0.75rem; text-transform: uppercase; letter-spacing: 1px; color: var(--text-gray); white-space: nowrap; }
@@ -471,6 +843,14 @@ HTML_TEMPLATE = '''
                     <div class="stat-card"><div class="stat-icon blue"><i class="fas fa-calendar-check"></i></div><div class="stat-info"><span class="stat-value" id="statBookings">-</span><span class="stat-label">Bookings</span></div></div>
                     <div class="stat-card"><div class="stat-icon purple"><i class="fas fa-credit-card"></i></div><div class="stat-info"><span class="stat-value" id="statPayments">-</span><span class="stat-label">Payments</span></div></div>
                     <div class="stat-card"><div class="stat-icon orange"><i class="fas fa-id-badge"></i></div><div class="stat-info"><span class="stat-value" id="statEmployees">-</span><span class="stat-label">Employees</span></div></div>
+                    <div class="stat-card"><div class="stat-icon green"><i class="fas fa-ticket-alt"></i></div><div class="stat-info"><span class="stat-value" id="statTicketsToday">-</span><span class="stat-label">Tickets Today</span></div></div>
+                    <div class="stat-card"><div class="stat-icon gold"><i class="fas fa-sack-dollar"></i></div><div class="stat-info"><span class="stat-value" id="statRevenueToday">-</span><span class="stat-label">Revenue Today</span></div></div>
+                </div>
+                <h2 class="section-title">Today's Showtimes</h2>
+                <div class="table-container">
+                    <div class="table-wrapper">
+                        <table><thead><tr><th>Start</th><th>Movie</th><th>Hall</th><th>Sold</th><th>Seats Left</th></tr></thead><tbody id="liveShowtimes"></tbody></table>
+                    </div>
                 </div>
                 <h2 class="section-title">All Tables</h2>
                 <div class="tables-grid" id="allTablesGrid"></div>
@@ -479,9 +859,10 @@ HTML_TEMPLATE = '''
             <div class="content" id="tableView" style="display: none;">
                 <div class="table-container">
                     <div class="table-header"><span id="recordCount">0 records</span></div>
-                    <div class="table-wrapper">
+                    <div class="table-wrapper" id="tableScroll">
                         <table id="dataTable"><thead id="tableHead"></thead><tbody id="tableBody"></tbody></table>
                     </div>
+                    <div class="table-footer" id="tableFooter"><i class="fas fa-spinner fa-spin"></i></div>
                 </div>
             </div>
         </main>
@@ -508,25 +889,130 @@ HTML_TEMPLATE = '''
     <script>
         let currentTable = null;
         let currentTableData = [];
+        let currentColumns = [];
+        let nextCursor = null;
+        const PAGE_LIMIT = 100;
+        const ROW_OVERSCAN = 20;
+        const ESTIMATED_ROW_HEIGHT = 49;
+        let rowHeight = 0;
+        let renderedRange = null;
+        let loadingMore = false;
+        let scrollFrame = 0;
         let tableSchemas = {};
         let editingPK = null;
+        let searchController = null;
 
         document.addEventListener('DOMContentLoaded', async () => {
             await loadTableSchemas();
             await loadDashboardStats();
             setupEventListeners();
             buildAllTablesGrid();
+            connectEvents();
         });
 
+        // Client data layer: GETs go through fetchJson, which shares one
+        // request among concurrent callers of the same URL and keeps the body
+        // of every response that carried an ETag. The next request for that URL
+        // revalidates with If-None-Match, so an unchanged page or schema costs
+        // a 304 and no parse. The schema is also kept in localStorage, so a
+        // reload starts from it. Cached bodies are shared; callers copy before
+        // changing them.
+        const RESPONSE_CACHE_SIZE = 200;
+        const SCHEMA_STORAGE_KEY = 'cineplexx.tables';
+        const responseCache = new Map();
+        const inflightRequests = new Map();
+
+        function fetchJson(url, { signal } = {}) {
+            if (!signal && inflightRequests.has(url)) return inflightRequests.get(url);
+            const request = revalidate(url, signal).finally(() => { if (inflightRequests.get(url) === request) inflightRequests.delete(url); });
+            if (!signal) inflightRequests.set(url, request);
+            return request;
+        }
+
+        async function revalidate(url, signal) {
+            const cached = responseCache.get(url);
+            const response = await fetch(url, { headers: cached ? { 'If-None-Match': cached.etag } : {}, signal });
+            if (response.status === 304 && cached) { storeResponse(url, cached); return cached.body; }
+            const body = await response.json();
+            const etag = response.headers.get('ETag');
+            if (response.ok && etag) storeResponse(url, { etag, body });
+            else responseCache.delete(url);
+            return body;
+        }
+
+        function storeResponse(url, entry) {
+            responseCache.delete(url);
+            responseCache.set(url, entry);
+            if (responseCache.size > RESPONSE_CACHE_SIZE) responseCache.delete(responseCache.keys().next().value);
+        }
+
+        // Server-sent change events keep the open table and the dashboard
+        // counters current without refetching; 'reset' means events may have
+        // been missed, so everything shown is reloaded.
+        const STAT_ELEMENTS = { cinema: 'statCinemas', movie: 'statMovies', customer: 'statCustomers', ticket: 'statTickets', booking: 'statBookings', payment: 'statPayments', employee: 'statEmployees' };
+        const STATS_POLL_MS = 30000;
+        let eventSource = null;
+        let statsPoll = 0;
+        const scheduleLiveRefresh = debounce(loadLiveCounters, 1000);
+        const scheduleStatsReload = debounce(loadDashboardStats, 1000);
+
+        function connectEvents() {
+            if (!window.EventSource) { startStatsPolling(); return; }
+            eventSource = new EventSource('/api/events');
+            eventSource.addEventListener('change', (e) => applyChange(JSON.parse(e.data)));
+            eventSource.addEventListener('stats', (e) => applyStatsDelta(JSON.parse(e.data)));
+            eventSource.addEventListener('reset', () => { scheduleStatsReload(); if (currentTable) loadTable(currentTable); });
+            // A refused stream (the sync app answers 501) closes for good;
+            // dropped connections stay CONNECTING and are retried.
+            eventSource.addEventListener('error', (e) => {
+                if (e.target.readyState !== EventSource.CLOSED) return;
+                eventSource = null;
+                startStatsPolling();
+            });
+        }
+
+        function startStatsPolling() {
+            if (statsPoll) return;
+            statsPoll = setInterval(() => { if (currentTable === null) loadDashboardStats(); }, STATS_POLL_MS);
+        }
+
+        function eventsConnected() { return eventSource !== null && eventSource.readyState === EventSource.OPEN; }
+
+        function applyStatsDelta(event) {
+            if (event.reload) { scheduleStatsReload(); return; }
+            const element = document.getElementById(STAT_ELEMENTS[event.table]);
+            if (element && element.textContent !== '-') element.textContent = Number(element.textContent) + event.delta;
+        }
+
+        async function applyChange(event) {
+            if (event.table === 'ticket' || event.table === 'booking') scheduleLiveRefresh();
+            const tableName = event.table;
+            if (tableName !== currentTable || document.getElementById('searchInput').value.trim()) return;
+            if (event.op === 'reload') { loadTable(tableName); return; }
+            let row = event.row;
+            if (event.op !== 'delete' && !row) {
+                try { row = await fetchJson(`/api/${tableName}/${event.key}`); } catch (error) { return; }
+                if (row.error || currentTable !== tableName) return;
+            }
+            if (event.op === 'delete') removeRow(tableName, event.key);
+            else upsertRow(tableName, event.key, row);
+        }
+
         async function loadTableSchemas() {
-            const response = await fetch('/api/tables');
-            tableSchemas = await response.json();
+            let stored = null;
+            try { stored = JSON.parse(localStorage.getItem(SCHEMA_STORAGE_KEY)); } catch (error) {}
+            if (stored && stored.etag) responseCache.set('/api/tables', stored);
+            try { tableSchemas = await fetchJson('/api/tables'); }
+            catch (error) { if (!stored) throw error; tableSchemas = stored.body; return; }
+            const entry = responseCache.get('/api/tables');
+            if (entry && entry !== stored) {
+                try { localStorage.setItem(SCHEMA_STORAGE_KEY, JSON.stringify(entry)); } catch (error) {}
+            }
         }
 
         async function loadDashboardStats() {
             try {
-                const response = await fetch('/api/stats');
-                const stats = await response.json();
+                const stats = await fetchJson('/api/stats');
                 if (!stats.error) {
                     document.getElementById('statCinemas').textContent = stats.cinema || 0;
                     document.getElementById('statMovies').textContent = stats.movie || 0;
@@ -537,6 +1023,25 @@ HTML_TEMPLATE = '''
                     document.getElementById('statEmployees').textContent = stats.employee || 0;
                 }
             } catch (error) { console.error('Stats error:', error); }
+            loadLiveCounters();
+        }
+
+        async function loadLiveCounters() {
+            try {
+                const [live, showtimes] = await Promise.all([
+                    fetchJson('/api/live'),
+                    fetchJson('/api/live/showtimes')
+                ]);
+                if (!live.error) {
+                    document.getElementById('statTicketsToday').textContent = live.tickets_sold;
+                    document.getElementById('statRevenueToday').textContent = Number(live.revenue).toFixed(2);
+                }
+                if (!showtimes.error) {
+                    document.getElementById('liveShowtimes').innerHTML = showtimes.data.length
+                        ? showtimes.data.map(st => `<tr><td>${formatValue(st.start_time)}</td><td>${formatValue(st.title)}</td><td>${formatValue(st.hall_id)}</td><td>${formatValue(st.tickets_sold)}</td><td>${formatValue(st.seats_remaining)}</td></tr>`).join('')
+                        : '<tr><td colspan="5" class="empty-state">No showtimes today</td></tr>';
+                }
+            } catch (error) { console.error('Live counters error:', error); }
         }
 
         function buildAllTablesGrid() {
@@ -571,6 +1076,13 @@ HTML_TEMPLATE = '''
             document.getElementById('closeDeleteModal').addEventListener('click', closeDeleteModal);
             document.getElementById('cancelDeleteBtn').addEventListener('click', closeDeleteModal);
             document.getElementById('saveBtn').addEventListener('click', saveRecord);
+            document.getElementById('tableScroll').addEventListener('scroll', () => { if (!scrollFrame) scrollFrame = requestAnimationFrame(() => { scrollFrame = 0; renderWindow(false); }); });
+            document.getElementById('tableBody').addEventListener('click', (e) => {
+                const button = e.target.closest('button[data-action]');
+                if (!button) return;
+                const key = button.closest('tr').dataset.key;
+                if (button.dataset.action === 'edit') editRecord(key); else confirmDelete(key);
+            });
             document.getElementById('searchInput').addEventListener('input', debounce(handleSearch, 300));
             document.getElementById('recordModal').addEventListener('click', (e) => { if (e.target.id === 'recordModal') closeModal(); });
             document.getElementById('deleteModal').addEventListener('click', (e) => { if (e.target.id === 'deleteModal') closeDeleteModal(); });
@@ -583,10 +1095,11 @@ HTML_TEMPLATE = '''
             document.getElementById('tableView').style.display = 'none';
             document.getElementById('searchBox').style.display = 'none';
             document.getElementById('addNewBtn').style.display = 'none';
-            loadDashboardStats();
+            if (!eventsConnected()) loadDashboardStats();
         }
 
         async function loadTable(tableName) {
+            cancelSearch();
             currentTable = tableName;
             const schema = tableSchemas[tableName];
             document.getElementById('pageTitle').textContent = schema.display_name;
@@ -596,31 +1109,153 @@ HTML_TEMPLATE = '''
             document.getElementById('addNewBtn').style.display = 'flex';
             document.getElementById('searchInput').value = '';
             document.getElementById('tableBody').innerHTML = '<tr><td colspan="100" class="loading"><div class="spinner"></div></td></tr>';
+            nextCursor = null;
+            try {
+                const result = await fetchTablePage(tableName, null);
+                if (currentTable !== tableName) return;
+                showFirstPage(result);
+            } catch (error) { showToast('Failed to load data', 'error'); }
+        }
+
+        function showFirstPage(result) {
+            if (result.error) { showToast(result.error, 'error'); return; }
+            currentTableData = result.data.slice();
+            nextCursor = result.next;
+            renderTable(result.columns, result.data, Boolean(result.next));
+        }
+
+        function pageArgs(after) {
+            const args = { limit: PAGE_LIMIT, shape: 'columns' };
+            if (after) args.after = after;
+            return args;
+        }
+
+        async function fetchTablePage(tableName, after) {
+            return toRecords(await fetchJson(`/api/${tableName}?${new URLSearchParams(pageArgs(after))}`));
+        }
+
+        // Runs a write and, unless it is a delete, reads the written row back
+        // in the same request, so the table can update that one row in place.
+        async function writeRecord(operation, key) {
+            const operations = operation.op === 'delete' ? [operation] : [operation, { op: 'get', table: operation.table, key }];
+            const response = await fetch('/api/batch', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ mode: 'best_effort', operations }) });
+            const result = await response.json();
+            if (!result.results) return { write: result };
+            const [write, read] = result.results;
+            return { write: write.status >= 400 ? { error: write.body.error } : write.body, row: read && read.status === 200 ? read.body : null };
+        }
+
+        function toRecords(result) {
+            if (result.rows) result.data = result.rows.map(row => Object.fromEntries(result.columns.map((col, i) => [col, row[i]])));
+            return result;
+        }
+
+        // Pages are fetched as the visible window nears the end of the rows
+        // loaded so far.
+        async function loadMoreRows() {
+            if (!nextCursor || loadingMore) return;
+            const tableName = currentTable;
+            loadingMore = true;
+            document.getElementById('tableFooter').classList.add('active');
             try {
-                const response = await fetch(`/api/${tableName}`);
-                const result = await response.json();
+                const result = await fetchTablePage(tableName, nextCursor);
+                if (currentTable !== tableName) return;
                 if (result.error) { showToast(result.error, 'error'); return; }
-                currentTableData = result.data;
-                renderTable(result.columns, result.data);
+                currentTableData = currentTableData.concat(result.data);
+                nextCursor = result.next;
+                refreshRows();
             } catch (error) { showToast('Failed to load data', 'error'); }
+            finally {
+                loadingMore = false;
+                document.getElementById('tableFooter').classList.remove('active');
+            }
         }
 
-        function renderTable(columns, data) {
-            const schema = tableSchemas[currentTable];
+        function renderTable(columns, data, hasMore = false) {
+            currentColumns = columns;
             const thead = document.getElementById('tableHead');
             thead.innerHTML = `<tr>${columns.map(col => `<th>${formatColumnName(col)}</th>`).join('')}<th>Actions</th></tr>`;
+            document.getElementById('tableScroll').scrollTop = 0;
+            renderWindow(true);
+            updateRecordCount(data.length, hasMore);
+        }
+
+        // Only the rows in view (plus ROW_OVERSCAN on either side) are in the
+        // DOM; spacer rows stand in for the rest. Cells do not wrap, so every
+        // row has the height measured from the first one rendered.
+        function renderWindow(force) {
             const tbody = document.getElementById('tableBody');
-            if (data.length === 0) {
-                tbody.innerHTML = `<tr><td colspan="${columns.length + 1}"><div class="empty-state"><i class="fas fa-inbox"></i><p>No records found</p></div></td></tr>`;
-            } else {
-                tbody.innerHTML = data.map(row => `<tr>${columns.map(col => `<td>${formatValue(row[col])}</td>`).join('')}<td class="actions-cell"><button class="btn btn-sm btn-icon btn-edit" onclick="editRecord('${getPKValue(row, schema.pk)}')"><i class="fas fa-pen"></i></button><button class="btn btn-sm btn-icon btn-delete" onclick="confirmDelete('${getPKValue(row, schema.pk)}')"><i class="fas fa-trash"></i></button></td></tr>`).join('');
+            const schema = tableSchemas[currentTable];
+            if (currentTableData.length === 0) {
+                renderedRange = null;
+                tbody.innerHTML = `<tr><td colspan="${currentColumns.length + 1}"><div class="empty-state"><i class="fas fa-inbox"></i><p>No records found</p></div></td></tr>`;
+                return;
+            }
+            const scroller = document.getElementById('tableScroll');
+            const height = rowHeight || ESTIMATED_ROW_HEIGHT;
+            const start = Math.max(0, Math.floor(scroller.scrollTop / height) - ROW_OVERSCAN);
+            const end = Math.min(currentTableData.length, Math.ceil((scroller.scrollTop + scroller.clientHeight) / height) + ROW_OVERSCAN);
+            if (!force && renderedRange && renderedRange[0] === start && renderedRange[1] === end) return;
+            renderedRange = [start, end];
+            const spacer = (rows) => rows > 0 ? `<tr class="spacer" style="height: ${rows * height}px"><td colspan="${currentColumns.length + 1}"></td></tr>` : '';
+            tbody.innerHTML = spacer(start) + currentTableData.slice(start, end).map(row => buildRowHtml(row, currentColumns, schema)).join('') + spacer(currentTableData.length - end);
+            if (!rowHeight) {
+                const first = tbody.querySelector('tr[data-key]');
+                if (first && first.offsetHeight) { rowHeight = first.offsetHeight; renderWindow(true); return; }
             }
-            document.getElementById('recordCount').textContent = `${data.length} record${data.length !== 1 ? 's' : ''} found`;
+            if (end >= currentTableData.length - ROW_OVERSCAN) loadMoreRows();
+        }
+
+        function refreshRows() {
+            renderWindow(true);
+            updateRecordCount(currentTableData.length, Boolean(nextCursor));
+        }
+
+        function upsertRow(tableName, key, row) {
+            if (currentTable !== tableName || !row) return;
+            const schema = tableSchemas[tableName];
+            const index = currentTableData.findIndex(r => getPKValue(r, schema.pk) === key);
+            if (index >= 0) currentTableData[index] = row;
+            else if (!nextCursor) currentTableData.push(row);
+            else return;
+            refreshRows();
+        }
+
+        function removeRow(tableName, key) {
+            if (currentTable !== tableName) return;
+            const schema = tableSchemas[tableName];
+            const index = currentTableData.findIndex(r => getPKValue(r, schema.pk) === key);
+            if (index < 0) return;
+            currentTableData.splice(index, 1);
+            refreshRows();
+        }
+
+        function findRow(tableName, key) {
+            if (currentTable !== tableName) return { index: -1, row: null };
+            const schema = tableSchemas[tableName];
+            const index = currentTableData.findIndex(r => getPKValue(r, schema.pk) === key);
+            return { index, row: index >= 0 ? currentTableData[index] : null };
+        }
+
+        // Puts back a row an optimistic delete took out, where it was.
+        function restoreRow(tableName, index, row) {
+            if (currentTable !== tableName || findRow(tableName, getPKValue(row, tableSchemas[tableName].pk)).row) return;
+            currentTableData.splice(Math.min(index, currentTableData.length), 0, row);
+            refreshRows();
+        }
+
+        function buildRowHtml(row, columns, schema) {
+            return `<tr data-key="${escapeHtml(getPKValue(row, schema.pk))}">${columns.map(col => `<td>${formatValue(row[col])}</td>`).join('')}<td class="actions-cell"><button class="btn btn-sm btn-icon btn-edit" data-action="edit"><i class="fas fa-pen"></i></button><button class="btn btn-sm btn-icon btn-delete" data-action="delete"><i class="fas fa-trash"></i></button></td></tr>`;
+        }
+
+        function updateRecordCount(count, hasMore) {
+            document.getElementById('recordCount').textContent = `${count} record${count !== 1 ? 's' : ''} ${hasMore ? 'loaded, more available' : 'found'}`;
         }
 
         function formatColumnName(name) { return name.replace(/_/g, ' ').replace(/\b\w/g, l => l.toUpperCase()); }
         function formatValue(value) { return value === null || value === undefined ? '<span style="color: var(--text-gray)">—</span>' : escapeHtml(String(value)); }
-        function escapeHtml(text) { const div = document.createElement('div'); div.textContent = text; return div.innerHTML; }
+        const HTML_ESCAPES = { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' };
+        function escapeHtml(text) { return text.replace(/[&<>"']/g, ch => HTML_ESCAPES[ch]); }
         function getPKValue(row, pkColumns) { return pkColumns.map(col => row[col]).join('/'); }
 
         function openModal(mode, pkValue = null) {
@@ -659,14 +1294,28 @@ HTML_TEMPLATE = '''
             const data = {};
             form.querySelectorAll('input, select').forEach(input => { if (input.value !== '') data[input.name] = input.value; });
             form.querySelectorAll('input[disabled]').forEach(input => { if (input.value !== '') data[input.name] = input.value; });
+            // The edit shows at once; the row the server returns replaces it,
+            // and a failed write puts the old row back and reopens the form.
+            const tableName = currentTable;
+            const pk = tableSchemas[tableName].pk;
+            const editedPK = editingPK;
+            const operation = editedPK ? { op: 'update', table: tableName, key: editedPK, data } : { op: 'create', table: tableName, data };
+            const key = editedPK || pk.map(col => data[col]).join('/');
+            const { row: previous } = findRow(tableName, key);
+            const optimistic = editedPK || pk.every(col => data[col] !== undefined);
+            if (optimistic) upsertRow(tableName, key, { ...previous, ...data });
+            closeModal();
+            const rollback = (message) => {
+                if (optimistic) { if (previous) upsertRow(tableName, key, previous); else removeRow(tableName, key); }
+                showToast(message, 'error');
+                const modal = document.getElementById('recordModal');
+                if (currentTable === tableName && !modal.classList.contains('active')) { editingPK = editedPK; modal.classList.add('active'); }
+            };
             try {
-                let response;
-                if (editingPK) { response = await fetch(`/api/${currentTable}/${editingPK}`, { method: 'PUT', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(data) }); }
-                else { response = await fetch(`/api/${currentTable}`, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(data) }); }
-                const result = await response.json();
-                if (result.error) { showToast(result.error, 'error'); }
-                else { showToast(result.message, 'success'); closeModal(); loadTable(currentTable); }
-            } catch (error) { showToast('Failed to save record', 'error'); }
+                const { write, row } = await writeRecord(operation, key);
+                if (write.error) rollback(write.error);
+                else { showToast(write.message, 'success'); upsertRow(tableName, key, row); }
+            } catch (error) { rollback('Failed to save record'); }
         }
 
         let deletePK = null;
@@ -674,27 +1323,43 @@ HTML_TEMPLATE = '''
             deletePK = pkValue;
             document.getElementById('deleteModal').classList.add('active');
             document.getElementById('confirmDeleteBtn').onclick = async () => {
-                try {
-                    const response = await fetch(`/api/${currentTable}/${deletePK}`, { method: 'DELETE' });
-                    const result = await response.json();
-                    if (result.error) showToast(result.error, 'error');
-                    else { showToast(result.message, 'success'); loadTable(currentTable); }
-                } catch (error) { showToast('Failed to delete record', 'error'); }
+                const tableName = currentTable;
+                const key = deletePK;
+                const { index, row } = findRow(tableName, key);
+                removeRow(tableName, key);
                 closeDeleteModal();
+                const rollback = (message) => { if (row) restoreRow(tableName, index, row); showToast(message, 'error'); };
+                try {
+                    const { write } = await writeRecord({ op: 'delete', table: tableName, key });
+                    if (write.error) rollback(write.error);
+                    else showToast(write.message, 'success');
+                } catch (error) { rollback('Failed to delete record'); }
             };
         }
         function closeDeleteModal() { document.getElementById('deleteModal').classList.remove('active'); deletePK = null; }
 
+        // A new keystroke aborts the search still in flight, so an older,
+        // slower response can never replace the results of a newer query.
+        function cancelSearch() {
+            if (searchController) searchController.abort();
+            searchController = null;
+        }
+
         async function handleSearch(e) {
             const query = e.target.value;
+            cancelSearch();
             if (!query.trim()) { loadTable(currentTable); return; }
+            const tableName = currentTable;
+            const controller = searchController = new AbortController();
             try {
-                const response = await fetch(`/api/search/${currentTable}?q=${encodeURIComponent(query)}`);
-                const result = await response.json();
+                const result = toRecords(await fetchJson(`/api/search/${tableName}?q=${encodeURIComponent(query)}&shape=columns`, { signal: controller.signal }));
+                if (controller !== searchController || currentTable !== tableName) return;
+                searchController = null;
                 if (result.error) { showToast(result.error, 'error'); return; }
-                currentTableData = result.data;
+                currentTableData = result.data.slice();
+                nextCursor = null;
                 renderTable(result.columns, result.data);
-            } catch (error) { showToast('Search failed', 'error'); }
+            } catch (error) { if (error.name !== 'AbortError') showToast('Search failed', 'error'); }
         }
 
         function showToast(message, type = 'success') {
@@ -713,508 +1378,3061 @@ HTML_TEMPLATE = '''
 '''
 
 # ============================================
-# API ROUTES
+# JSON SERIALIZATION
 # ============================================
+# Read routes fetch through json_cursor(), whose loaders turn the Postgres text
+# of every date, time and decimal column type in TABLES straight into str and
+# float, so rows come back JSON-ready and need no per-cell conversion pass.
+# ?shape=columns returns them as arrays under one columns list instead of a
+# dict per row. Responses are encoded with orjson when it is installed;
+# JSON_ENCODER=json forces the standard library encoder.
+JSON_ENCODER = os.environ.get('JSON_ENCODER', 'orjson' if orjson else 'json')
 
-@app.route('/')
-def index():
-    return render_template_string(HTML_TEMPLATE)
+def _json_loaders():
+    loaders = {}
+    for schema in TABLES.values():
+        for typ in schema['types']:
+            if typ in ('date', 'time'):
+                loaders[typ] = TextLoader
+            elif typ.startswith('decimal'):
+                loaders['numeric'] = FloatLoader
+    return [(psycopg.postgres.types[name].oid, loader) for name, loader in loaders.items()]
 
-@app.route('/api/tables')
-def get_tables():
-    return jsonify(TABLES)
+JSON_LOADERS = _json_loaders()
 
-@app.route('/api/<table>', methods=['GET'])
-def get_all_records(table):
-    if table not in TABLES:
-        return jsonify({'error': 'Table not found'}), 404
+def json_cursor(conn, **kwargs):
+    cursor = conn.cursor(**kwargs)
+    for oid, loader in JSON_LOADERS:
+        cursor.adapters.register_loader(oid, loader)
+    return cursor
+
+def parse_shape(args):
+    shape = args.get('shape', 'records')
+    if shape not in ('records', 'columns'):
+        raise ValueError('shape must be records or columns')
+    return shape
+
+def rows_payload(columns, rows, shape=None):
+    if shape == 'columns':
+        return {'columns': columns, 'rows': rows}
+    return {'columns': columns, 'data': [dict(zip(columns, row)) for row in rows]}
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+# The stdlib path encodes the way orjson does (ISO dates, Decimal as float,
+# sorted keys, no ASCII escaping, compact unless indented), so a response
+# reads the same whichever encoder wrote it.
+class FastJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        with phase('serialize'):
+            if JSON_ENCODER != 'orjson' or orjson is None or 'indent' in kwargs:
+                kwargs.setdefault('separators', (',', ': ') if kwargs.get('indent') else (',', ':'))
+                return json.dumps(obj, default=_json_default, sort_keys=True, ensure_ascii=False, **kwargs)
+            return orjson.dumps(obj, default=_json_default, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS).decode()
+
+app.json = FastJSONProvider(app)
+
+# ============================================
+# PAGINATION
+# ============================================
+PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 100))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 1000))
+EXPORT_FETCH_ROWS = int(os.environ.get('EXPORT_FETCH_ROWS', 2000))
+EXPORT_CHUNK_BYTES = 64 * 1024
+IMPORT_MAX_ERRORS = int(os.environ.get('IMPORT_MAX_ERRORS', 1000))
+MULTI_GET_MAX_KEYS = int(os.environ.get('MULTI_GET_MAX_KEYS', 1000))
+
+def encode_cursor(order_by, values):
+    values = [str(v) if isinstance(v, (date, time, Decimal, float)) else v for v in values]
+    payload = json.dumps({'o': order_by, 'k': values}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(token):
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f'SELECT * FROM "{table}"')
-        columns = [desc[0] for desc in cursor.description]
-        rows = [serialize_row(row, columns) for row in cursor.fetchall()]
-        conn.close()
-        return jsonify({'data': rows, 'columns': columns})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return payload['o'], payload['k']
+    except Exception:
+        raise ValueError('Invalid cursor')
 
-@app.route('/api/<table>', methods=['POST'])
-def create_record(table):
-    if table not in TABLES:
-        return jsonify({'error': 'Table not found'}), 404
-    data = request.json
-    columns = TABLES[table]['columns']
-    insert_cols = [col for col in columns if col in data and data[col] not in [None, '']]
-    values = [data[col] for col in insert_cols]
+# Keyset pages: rows are ordered by the sort column followed by the primary
+# key and `after` resumes strictly after the last row of the previous page, so
+# a page costs the same index range scan wherever it starts. Only NOT NULL
+# ('required') columns can be sort keys since NULLs break row comparison.
+def parse_page_args(table, args):
+    schema = TABLES[table]
+    pk_cols = schema['pk']
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        placeholders = ', '.join(['%s' for _ in insert_cols])
-        col_names = ', '.join([f'"{col}"' for col in insert_cols])
-        cursor.execute(f'INSERT INTO "{table}" ({col_names}) VALUES ({placeholders})', values)
-        conn.commit()
-        conn.close()
-        return jsonify({'success': True, 'message': 'Record created successfully'})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        limit = int(args.get('limit', PAGE_SIZE))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
 
-@app.route('/api/<table>/<path:pk_values>', methods=['GET'])
-def get_record(table, pk_values):
-    if table not in TABLES:
-        return jsonify({'error': 'Table not found'}), 404
-    pk_cols = TABLES[table]['pk']
-    pk_vals = pk_values.split('/')
-    if len(pk_vals) != len(pk_cols):
-        return jsonify({'error': 'Invalid primary key'}), 400
+    order_by = args.get('order_by', '') or pk_cols[0]
+    descending = order_by.startswith('-')
+    order_col = order_by.lstrip('-')
+    if order_col not in pk_cols and order_col not in schema['required']:
+        raise ValueError(f'Cannot order by {order_col}')
+    sort_cols = [order_col] + [col for col in pk_cols if col != order_col]
+
+    fields = args.get('fields')
+    if fields:
+        select_cols = [col.strip() for col in fields.split(',') if col.strip()]
+        unknown = [col for col in select_cols if col not in schema['columns']]
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+        select_cols += [col for col in sort_cols if col not in select_cols]
+    else:
+        select_cols = list(schema['columns'])
+
+    after = None
+    if args.get('after'):
+        cursor_order, after = decode_cursor(args['after'])
+        if cursor_order != order_by or len(after) != len(sort_cols):
+            raise ValueError('Cursor does not match order_by')
+
+    return {'limit': limit, 'order_by': order_by, 'descending': descending, 'sort_cols': sort_cols,
+            'select_cols': select_cols, 'after': after, 'shape': parse_shape(args)}
+
+def page_sql(table, page):
+    sort_cols = page['sort_cols']
+    has_after = page['after'] is not None
+
+    def build():
+        direction = 'DESC' if page['descending'] else 'ASC'
+        col_names = ', '.join([f'"{col}"' for col in page['select_cols']])
+        key_names = ', '.join([f'"{col}"' for col in sort_cols])
+        sql = f'SELECT {col_names} FROM "{table}"'
+        if has_after:
+            placeholders = ', '.join(['%s' for _ in sort_cols])
+            sql += f' WHERE ({key_names}) {"<" if page["descending"] else ">"} ({placeholders})'
+        sql += ' ORDER BY ' + ', '.join([f'"{col}" {direction}' for col in sort_cols])
+        return sql + ' LIMIT %s'
+    key = ('page', table, tuple(page['select_cols']), tuple(sort_cols), page['descending'], has_after)
+    return compiled(key, build), (list(page['after']) if has_after else []) + [page['limit'] + 1]
+
+def page_rows(page, columns, rows):
+    next_cursor = None
+    if len(rows) > page['limit']:
+        rows = rows[:page['limit']]
+        last = rows[-1]
+        next_cursor = encode_cursor(page['order_by'], [last[columns.index(col)] for col in page['sort_cols']])
+    return rows, next_cursor
+
+# ============================================
+# SCHEMA CHANGES
+# ============================================
+# Building blocks for the migrations at the bottom of this file. A migration
+# step is a SQL string, run in the migration's transaction; an Online string,
+# run after that transaction commits and outside any transaction (CREATE INDEX
+# CONCURRENTLY, VALIDATE CONSTRAINT); or a function of the migration's
+# autocommit connection returning more steps, for changes that depend on what
+# the database already has. Steps must be safe to run twice: a migration that
+# fails half way is run again from the start.
+class Online(str):
+    pass
+
+INVALID_INDEX_SQL = '''SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE c.relname = %s AND c.relnamespace = 'public'::regnamespace AND NOT i.indisvalid'''
+CONSTRAINT_EXISTS_SQL = "SELECT 1 FROM pg_constraint WHERE conname = %s AND conrelid = %s::regclass"
+
+# A concurrent build that fails leaves an INVALID index behind, which IF NOT
+# EXISTS would then keep forever, so that leftover is dropped first.
+def concurrent_index(name, table, definition, unique=False):
+    def steps(conn):
+        drop = [Online(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')] if conn.execute(INVALID_INDEX_SQL, [name]).fetchone() else []
+        return drop + [Online(f'CREATE {"UNIQUE " if unique else ""}INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{table}" {definition}')]
+    return steps
+
+# NOT VALID only checks new rows, so adding the constraint takes its lock for
+# an instant; existing rows are validated afterwards under a lock that lets
+# reads and writes through.
+def checked_constraint(table, name, definition):
+    def steps(conn):
+        add = [] if conn.execute(CONSTRAINT_EXISTS_SQL, [name, table]).fetchone() else \
+            [f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition} NOT VALID']
+        return add + [Online(f'ALTER TABLE "{table}" VALIDATE CONSTRAINT "{name}"')]
+    return steps
+
+# ============================================
+# SEARCH
+# ============================================
+SEARCH_LIMIT = int(os.environ.get('SEARCH_LIMIT', 50))
+
+def search_columns(table):
+    schema = TABLES[table]
+    return [col for col, typ in zip(schema['columns'], schema['types']) if 'varchar' in typ]
+
+# The tsvector expression is shared by the GIN index and the search query, so
+# the planner can match them. Punctuation is folded to spaces so emails and
+# phone numbers split into words that prefix matching can find.
+def search_document(table):
+    text = " || ' ' || ".join([f'coalesce("{col}", \'\')' for col in search_columns(table)])
+    return f"to_tsvector('simple', regexp_replace({text}, '[^[:alnum:]]+', ' ', 'g'))"
+
+def prefix_tsquery(query):
+    words = re.findall(r'[^\W_]+', query.lower())
+    return ' & '.join([f'{word}:*' for word in words])
+
+TRGM_SQL = "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+
+def search_sql(table, query, limit):
+    search_cols = search_columns(table)
+    pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    tsquery = prefix_tsquery(query)
+    order = ', '.join([f'"{col}"' for col in TABLES[table]['pk']])
+    conditions = []
+    params = []
+    ordering = order
+    # Each branch is backed by a GIN index (full-text and, when pg_trgm is
+    # installed, trigram per column), so the OR becomes a BitmapOr instead of
+    # a sequential scan. Without pg_trgm the ILIKE branch is kept anyway, so
+    # substrings inside a word still match, at the cost of a scan.
+    if tsquery:
+        conditions.append(f"{search_document(table)} @@ to_tsquery('simple', %s)")
+        params.append(tsquery)
+        ordering = f"ts_rank({search_document(table)}, to_tsquery('simple', %s)) DESC, {order}"
+    conditions += [f'"{col}" ILIKE %s' for col in search_cols]
+    params += [pattern for _ in search_cols]
+    if tsquery:
+        params.append(tsquery)
+    sql = f'SELECT * FROM "{table}" WHERE {" OR ".join(conditions)} ORDER BY {ordering} LIMIT %s'
+    return sql, params + [limit + 1]
+
+def parse_search_limit(args):
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        where_clause = ' AND '.join([f'"{col}" = %s' for col in pk_cols])
-        cursor.execute(f'SELECT * FROM "{table}" WHERE {where_clause}', pk_vals)
-        columns = [desc[0] for desc in cursor.description]
-        row = cursor.fetchone()
-        conn.close()
-        if row:
-            return jsonify(serialize_row(row, columns))
-        return jsonify({'error': 'Record not found'}), 404
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return max(1, min(int(args.get('limit', SEARCH_LIMIT)), MAX_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('limit must be an integer')
 
-@app.route('/api/<table>/<path:pk_values>', methods=['PUT'])
-def update_record(table, pk_values):
-    if table not in TABLES:
-        return jsonify({'error': 'Table not found'}), 404
-    pk_cols = TABLES[table]['pk']
+def search_rows(limit, columns, rows, shape=None):
+    payload = rows_payload(columns, rows[:limit], shape)
+    payload.update(limit=limit, truncated=len(rows) > limit)
+    return payload
+
+def search_index_steps(conn):
+    # pg_trgm is optional: managed Postgres may not allow it, in which case
+    # substring search runs without trigram indexes.
+    try:
+        conn.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except psycopg.Error as e:
+        app.logger.warning('pg_trgm unavailable, substring search will not be indexed: %s', e)
+    trgm = conn.execute(TRGM_SQL).fetchone() is not None
+    steps = []
+    for table in TABLES:
+        if not search_columns(table):
+            continue
+        steps.append(concurrent_index(f'{table}_search_idx', table, f'USING GIN ({search_document(table)})'))
+        if trgm:
+            for col in search_columns(table):
+                steps.append(concurrent_index(f'{table}_{col}_trgm_idx', table, f'USING GIN ("{col}" gin_trgm_ops)'))
+    return steps
+
+# ============================================
+# CRUD STATEMENTS
+# ============================================
+# SQL for the record routes is built from TABLES once per statement shape and
+# handed out as the same string afterwards; compile_statements() builds the
+# common shapes at import. Statements run with prepare=True, so each pooled
+# connection parses and plans a shape once and later requests only bind
+# parameters to the server-side prepared statement. Column lists are spelled
+# out instead of * so a prepared statement's result type never changes under
+# it. DB_PREPARE=0 turns preparing off (e.g. behind a transaction-mode
+# pgbouncer); the sync routes below and asgi_app.py share all of this.
+_statements = {}
+_statement_stats = {'executions': 0, 'hits': 0}
+_prepared_on = weakref.WeakKeyDictionary()
+
+def compiled(key, build):
+    sql = _statements.get(key)
+    if sql is None:
+        sql = _statements.setdefault(key, build())
+    return sql
+
+def note_prepared(conn, sql):
+    # psycopg keeps each connection's prepared statements in an LRU of
+    # DB_PREPARED_MAX entries, so a repeat of sql on conn skips parse/plan.
+    seen = _prepared_on.get(conn)
+    if seen is None:
+        seen = _prepared_on[conn] = set()
+    _statement_stats['executions'] += 1
+    if sql in seen:
+        _statement_stats['hits'] += 1
+    else:
+        seen.add(sql)
+    return sql
+
+def execute_compiled(conn, sql, params=None, cursor=None):
+    return (cursor or conn).execute(note_prepared(conn, sql), params, prepare=DB_PREPARE)
+
+def statement_stats(rows):
+    executions = _statement_stats['executions']
+    prepared, generic, custom = rows[0] if rows else (0, 0, 0)
+    return {'pid': os.getpid(), 'compiled': len(_statements), 'prepare': bool(DB_PREPARE),
+            'executions': executions, 'hits': _statement_stats['hits'],
+            'hit_rate': round(_statement_stats['hits'] / executions, 3) if executions else None,
+            'connection': {'prepared': prepared, 'generic_plans': generic, 'custom_plans': custom,
+                           'generic_rate': round(generic / (generic + custom), 3) if generic + custom else None}}
+
+STATEMENT_STATS_SQL = '''SELECT COUNT(*), COALESCE(SUM(generic_plans), 0)::bigint, COALESCE(SUM(custom_plans), 0)::bigint
+    FROM pg_prepared_statements WHERE NOT from_sql'''
+
+def split_pk(table, pk_values):
     pk_vals = pk_values.split('/')
-    if len(pk_vals) != len(pk_cols):
-        return jsonify({'error': 'Invalid primary key'}), 400
-    data = request.json
+    return pk_vals if len(pk_vals) == len(TABLES[table]['pk']) else None
+
+def pk_types(table):
+    schema = TABLES[table]
+    return [schema['types'][schema['columns'].index(col)] for col in schema['pk']]
+
+def pk_clause(table):
+    return ' AND '.join([f'"{col}" = %s' for col in TABLES[table]['pk']])
+
+def column_list(table, alias=None):
+    prefix = f'{alias}.' if alias else ''
+    return ', '.join([f'{prefix}"{col}"' for col in TABLES[table]['columns']])
+
+# Every column is inserted, omitted and empty ones as NULL: no column has a
+# DEFAULT, so that matches leaving them out and needs one statement per table.
+def insert_sql(table, data):
     columns = TABLES[table]['columns']
-    update_cols = [col for col in columns if col not in pk_cols and col in data]
+    sql = compiled(('insert', table), lambda: f'''INSERT INTO "{table}" ({column_list(table)})
+        VALUES ({', '.join(['%s' for _ in columns])}) RETURNING {column_list(table)}''')
+    return sql, [data[col] if col in data and data[col] not in [None, ''] else None for col in columns]
+
+def select_sql(table):
+    return compiled(('select', table), lambda: f'SELECT {column_list(table)} FROM "{table}" WHERE {pk_clause(table)}')
+
+# Many keys resolve in one statement: each key column arrives as one array,
+# unnest() zips the arrays back into keys numbered in request order and the
+# join probes the primary key index once per key. The text depends only on the
+# table, so like select_sql it is compiled and prepared once.
+def multi_get_sql(table):
+    def build():
+        pk_cols = TABLES[table]['pk']
+        arrays = ', '.join([f'%s::{typ}[]' for typ in pk_types(table)])
+        keys = ', '.join([f'"{col}"' for col in pk_cols])
+        join = ' AND '.join([f't."{col}" = k."{col}"' for col in pk_cols])
+        return f'''SELECT k.ord, {column_list(table, 't')} FROM unnest({arrays}) WITH ORDINALITY AS k({keys}, ord)
+            JOIN "{table}" AS t ON {join}'''
+    return compiled(('multi_get', table), build)
+
+def parse_multi_get(table, data):
+    if not isinstance(data, dict) or not isinstance(data.get('keys'), list) or not data['keys']:
+        raise ValueError('keys must be a non-empty list')
+    if len(data['keys']) > MULTI_GET_MAX_KEYS:
+        raise ValueError(f'At most {MULTI_GET_MAX_KEYS} keys per request')
+    pk_cols = TABLES[table]['pk']
+    arrays = [[] for _ in pk_cols]
+    for index, key in enumerate(data['keys']):
+        if isinstance(key, dict):
+            values = [key.get(col) for col in pk_cols]
+        elif isinstance(key, str):
+            values = key.split('/')
+        else:
+            values = key if isinstance(key, list) else [key]
+        if len(values) != len(pk_cols):
+            raise ValueError(f'keys[{index}]: expected {len(pk_cols)} value(s) for {", ".join(pk_cols)}')
+        for col, typ, value, array in zip(pk_cols, pk_types(table), values, arrays):
+            try:
+                value = parse_value(value, typ)
+            except ValueError as e:
+                raise ValueError(f'keys[{index}]: {col}: {e}')
+            if value is None:
+                raise ValueError(f'keys[{index}]: {col}: required')
+            array.append(value)
+    return arrays, parse_shape(data)
+
+def multi_get_payload(count, columns, rows, shape=None):
+    columns = columns[1:]
+    found = [None] * count
+    for row in rows:
+        found[row[0] - 1] = list(row[1:]) if shape == 'columns' else dict(zip(columns, row[1:]))
+    missing = [index for index, row in enumerate(found) if row is None]
+    return {'columns': columns, 'rows' if shape == 'columns' else 'data': found,
+            'found': count - len(missing), 'missing': missing}
+
+def update_columns(table, data):
+    pk_cols = TABLES[table]['pk']
+    return tuple([col for col in TABLES[table]['columns'] if col not in pk_cols and col in data])
+
+def update_sql(table, data, pk_vals):
+    pk_cols = TABLES[table]['pk']
+    update_cols = update_columns(table, data)
     values = [data[col] if data[col] != '' else None for col in update_cols]
-    try:
-        conn = get_connection()
-        cursor = conn.cursor()
+
+    def build():
         set_clause = ', '.join([f'"{col}" = %s' for col in update_cols])
-        where_clause = ' AND '.join([f'"{col}" = %s' for col in pk_cols])
-        cursor.execute(f'UPDATE "{table}" SET {set_clause} WHERE {where_clause}', values + pk_vals)
-        conn.commit()
-        conn.close()
-        return jsonify({'success': True, 'message': 'Record updated successfully'})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        join_clause = ' AND '.join([f'cur."{col}" = prev."{col}"' for col in pk_cols])
+        return f'''UPDATE "{table}" AS cur SET {set_clause}
+            FROM (SELECT * FROM "{table}" WHERE {pk_clause(table)} FOR UPDATE) AS prev
+            WHERE {join_clause} RETURNING {column_list(table, 'prev')}, {column_list(table, 'cur')}'''
+    return compiled(('update', table, update_cols), build), values + pk_vals
 
-@app.route('/api/<table>/<path:pk_values>', methods=['DELETE'])
-def delete_record(table, pk_values):
-    if table not in TABLES:
-        return jsonify({'error': 'Table not found'}), 404
-    pk_cols = TABLES[table]['pk']
-    pk_vals = pk_values.split('/')
-    if len(pk_vals) != len(pk_cols):
-        return jsonify({'error': 'Invalid primary key'}), 400
-    try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        where_clause = ' AND '.join([f'"{col}" = %s' for col in pk_cols])
-        cursor.execute(f'DELETE FROM "{table}" WHERE {where_clause}', pk_vals)
-        conn.commit()
-        conn.close()
-        return jsonify({'success': True, 'message': 'Record deleted successfully'})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+def split_update_row(table, row):
+    columns = TABLES[table]['columns']
+    return dict(zip(columns, row[:len(columns)])), dict(zip(columns, row[len(columns):]))
 
-@app.route('/api/stats')
-def get_stats():
-    try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        stats = {}
-        for table in TABLES:
-            cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
-            stats[table] = cursor.fetchone()[0]
-        conn.close()
-        return jsonify(stats)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+def delete_sql(table):
+    return compiled(('delete', table), lambda: f'DELETE FROM "{table}" WHERE {pk_clause(table)} RETURNING {column_list(table)}')
 
-@app.route('/api/search/<table>')
-def search_table(table):
-    if table not in TABLES:
-        return jsonify({'error': 'Table not found'}), 404
-    query = request.args.get('q', '')
-    if not query:
-        return get_all_records(table)
+def compile_statements():
+    for table, schema in TABLES.items():
+        select_sql(table)
+        multi_get_sql(table)
+        delete_sql(table)
+        insert_sql(table, {})
+        update_sql(table, {col: None for col in schema['columns']}, [])
+        page_sql(table, parse_page_args(table, {}))
+
+compile_statements()
+
+EXPORT_MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+def export_sql(table, args):
+    fmt = args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'csv'):
+        raise ValueError('format must be ndjson or csv')
     columns = TABLES[table]['columns']
-    types = TABLES[table]['types']
-    search_cols = [col for col, typ in zip(columns, types) if 'varchar' in typ]
-    if not search_cols:
-        return get_all_records(table)
+    if args.get('fields'):
+        fields = [col.strip() for col in args['fields'].split(',') if col.strip()]
+        unknown = [col for col in fields if col not in columns]
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+        columns = fields
+    col_names = ', '.join([f'"{col}"' for col in columns])
+    order = ', '.join([f'"{col}"' for col in TABLES[table]['pk']])
+    return fmt, columns, f'SELECT {col_names} FROM "{table}" ORDER BY {order}'
+
+def parse_import_args(args):
+    fmt = args.get('format', 'ndjson')
+    mode = args.get('mode', 'insert')
+    on_error = args.get('on_error', 'abort')
+    if fmt not in ('ndjson', 'csv'):
+        raise ValueError('format must be ndjson or csv')
+    if mode not in ('insert', 'upsert'):
+        raise ValueError('mode must be insert or upsert')
+    if on_error not in ('abort', 'skip'):
+        raise ValueError('on_error must be abort or skip')
+    return fmt, mode, on_error
+
+# Plain inserts COPY straight into the table. Upserts COPY into a staging
+# table first so duplicates can be resolved in one INSERT ... ON CONFLICT, the
+# last occurrence of a key winning.
+def import_statements(table, mode):
+    schema = TABLES[table]
+    col_names = ', '.join([f'"{col}"' for col in schema['columns']])
+    if mode != 'upsert':
+        return [], f'COPY "{table}" ({col_names}) FROM STDIN', None
+    pk_cols = schema['pk']
+    keys = ', '.join([f'"{col}"' for col in pk_cols])
+    updates = ', '.join([f'"{col}" = EXCLUDED."{col}"' for col in schema['columns'] if col not in pk_cols])
+    conflict = f'DO UPDATE SET {updates}' if updates else 'DO NOTHING'
+    setup = [f'CREATE TEMP TABLE import_stage ON COMMIT DROP AS SELECT {col_names} FROM "{table}" WITH NO DATA',
+             'ALTER TABLE import_stage ADD COLUMN import_line INT']
+    merge = f'''INSERT INTO "{table}" ({col_names})
+        SELECT DISTINCT ON ({keys}) {col_names} FROM import_stage ORDER BY {keys}, import_line DESC
+        ON CONFLICT ({keys}) {conflict}'''
+    return setup, f'COPY import_stage ({col_names}, import_line) FROM STDIN', merge
+
+def import_row(table, mode, summary, line_no, record):
+    summary['received'] += 1
+    values, errors = validate_record(table, record)
+    if errors:
+        summary['rejected'] += 1
+        if len(summary['errors']) < IMPORT_MAX_ERRORS:
+            summary['errors'].append({'line': line_no, 'errors': errors})
+        return None
+    row = [values[col] for col in TABLES[table]['columns']]
+    return row + [line_no] if mode == 'upsert' else row
+
+def parse_json_line(line_no, line):
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        conditions = ' OR '.join([f'"{col}" ILIKE %s' for col in search_cols])
-        search_values = [f'%{query}%' for _ in search_cols]
-        cursor.execute(f'SELECT * FROM "{table}" WHERE {conditions}', search_values)
-        columns = [desc[0] for desc in cursor.description]
-        rows = [serialize_row(row, columns) for row in cursor.fetchall()]
-        conn.close()
-        return jsonify({'data': rows, 'columns': columns})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f'Line {line_no}: invalid JSON ({e.msg})')
 
 # ============================================
-# INITIALIZE DATABASE WITH SAMPLE DATA
+# INDEXES
 # ============================================
-def init_db():
-    try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Create tables
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS cinema (
-                cinema_id INT PRIMARY KEY,
-                location VARCHAR(50) NOT NULL,
-                name VARCHAR(50) NOT NULL
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS department (
-                department_id INT PRIMARY KEY,
-                department_name VARCHAR(50) NOT NULL
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS customer (
-                customer_id INT PRIMARY KEY,
-                full_name VARCHAR(100) NOT NULL,
-                phone_number VARCHAR(20) UNIQUE,
-                email VARCHAR(100) UNIQUE NOT NULL,
-                date_of_birth DATE NOT NULL,
-                gender VARCHAR(10) NOT NULL
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS genre (
-                genre_id INT PRIMARY KEY,
-                genre_name VARCHAR(30) NOT NULL
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS hall (
-                hall_id INT PRIMARY KEY,
-                hall_name VARCHAR(50) NOT NULL,
-                capacity INT NOT NULL CHECK (capacity > 0),
-                cinema_id INT NOT NULL REFERENCES cinema(cinema_id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS food (
-                food_id INT PRIMARY KEY,
-                food_name VARCHAR(50) NOT NULL,
-                price DECIMAL(6,2) NOT NULL CHECK (price > 0)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS movie (
-                movie_id INT PRIMARY KEY,
-                title VARCHAR(100) NOT NULL,
-                duration INT NOT NULL CHECK (duration > 0),
-                release_date DATE NOT NULL,
-                language VARCHAR(30) NOT NULL,
-                age_rating INT NOT NULL CHECK (age_rating >= 0),
-                adult_price DECIMAL(8,2) NOT NULL,
-                kids_price DECIMAL(8,2) NOT NULL
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS employee (
-                employee_id INT PRIMARY KEY,
-                full_name VARCHAR(100) NOT NULL,
-                role VARCHAR(30) NOT NULL,
-                phone_number VARCHAR(20) UNIQUE NOT NULL,
-                email VARCHAR(100) UNIQUE NOT NULL,
-                date_of_birth DATE NOT NULL,
-                department_id INT NOT NULL REFERENCES department(department_id),
-                cinema_id INT NOT NULL REFERENCES cinema(cinema_id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS seat (
-                hall_id INT NOT NULL,
-                seat_number INT NOT NULL,
-                seat_row VARCHAR(5) NOT NULL,
-                seat_type VARCHAR(10) NOT NULL CHECK (seat_type IN ('Regular', 'VIP')),
-                PRIMARY KEY (hall_id, seat_number, seat_row),
-                FOREIGN KEY (hall_id) REFERENCES hall(hall_id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS movie_genre (
-                movie_id INT NOT NULL,
-                genre_id INT NOT NULL,
-                PRIMARY KEY (movie_id, genre_id),
-                FOREIGN KEY (movie_id) REFERENCES movie(movie_id),
-                FOREIGN KEY (genre_id) REFERENCES genre(genre_id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS showtime (
-                showtime_id INT PRIMARY KEY,
-                movie_id INT NOT NULL REFERENCES movie(movie_id),
-                hall_id INT NOT NULL REFERENCES hall(hall_id),
-                show_date DATE NOT NULL,
-                start_time TIME NOT NULL,
-                end_time TIME NOT NULL,
-                CHECK (end_time > start_time)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS booking (
-                booking_id INT PRIMARY KEY,
-                customer_id INT NOT NULL REFERENCES customer(customer_id),
-                showtime_id INT NOT NULL REFERENCES showtime(showtime_id),
-                booking_date DATE NOT NULL,
-                adult_seat INT NOT NULL CHECK (adult_seat >= 0),
-                child_seat INT NOT NULL CHECK (child_seat >= 0)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS ticket (
-                ticket_id INT PRIMARY KEY,
-                booking_id INT NOT NULL REFERENCES booking(booking_id),
-                showtime_id INT NOT NULL REFERENCES showtime(showtime_id),
-                hall_id INT NOT NULL,
-                seat_number INT NOT NULL,
-                seat_row VARCHAR(5) NOT NULL,
-                ticket_price DECIMAL(8,2) NOT NULL CHECK (ticket_price > 0),
-                FOREIGN KEY (hall_id, seat_number, seat_row) REFERENCES seat(hall_id, seat_number, seat_row)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS manager (
-                employee_id INT PRIMARY KEY REFERENCES employee(employee_id),
-                management_level INT NOT NULL,
-                contract_type VARCHAR(30) NOT NULL,
-                hire_date DATE NOT NULL
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS cashier (
-                employee_id INT PRIMARY KEY REFERENCES employee(employee_id),
-                shift_type VARCHAR(20) NOT NULL,
-                hire_date DATE NOT NULL,
-                employment_status VARCHAR(10)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS cleaner (
-                employee_id INT PRIMARY KEY REFERENCES employee(employee_id),
-                shift_type VARCHAR(20) NOT NULL
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS showtime_supervisor (
-                employee_id INT PRIMARY KEY REFERENCES employee(employee_id),
-                shift_type VARCHAR(20) NOT NULL
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS food_order (
-                order_id INT PRIMARY KEY,
-                customer_id INT NOT NULL REFERENCES customer(customer_id),
-                order_date DATE NOT NULL,
-                order_time TIME NOT NULL,
-                order_amount DECIMAL(8,2) CHECK (order_amount > 0)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS order_food (
-                order_id INT NOT NULL REFERENCES food_order(order_id),
-                food_id INT NOT NULL REFERENCES food(food_id),
-                quantity INT NOT NULL CHECK (quantity > 0),
-                PRIMARY KEY (order_id, food_id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS payment (
-                payment_id INT PRIMARY KEY,
-                booking_id INT REFERENCES booking(booking_id),
-                order_id INT REFERENCES food_order(order_id),
-                payment_date DATE NOT NULL,
-                payment_time TIME NOT NULL,
-                amount DECIMAL(8,2) NOT NULL CHECK (amount > 0),
-                status VARCHAR(15) NOT NULL CHECK (status IN ('Completed', 'Failed')),
-                payment_method VARCHAR(10) NOT NULL CHECK (payment_method IN ('Cash', 'Card'))
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS cash_payment (
-                payment_id INT PRIMARY KEY REFERENCES payment(payment_id),
-                change_amount DECIMAL(6,2) NOT NULL CHECK (change_amount >= 0)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS card_payment (
-                payment_id INT PRIMARY KEY REFERENCES payment(payment_id),
-                card_number VARCHAR(20) NOT NULL,
-                card_type VARCHAR(20) NOT NULL,
-                expiry_date DATE NOT NULL,
-                cardholder_name VARCHAR(100) NOT NULL
-            )
-        ''')
-        
-        conn.commit()
-        
-        # Check if data exists
-        cursor.execute('SELECT COUNT(*) FROM cinema')
-        if cursor.fetchone()[0] == 0:
-            # Insert sample data
-            print("Loading sample data...")
-            
-            # Cinema
-            cursor.execute('''INSERT INTO cinema (cinema_id, location, name) VALUES 
-                (1, 'Tirana', 'Cineplexx TEG'),
-                (2, 'Tirana', 'Cineplexx City Park'),
-                (3, 'Durres', 'Cineplexx Durres')''')
-            
-            # Department
-            cursor.execute('''INSERT INTO department (department_id, department_name) VALUES 
-                (1, 'Management'), (2, 'Box Office'), (3, 'Concessions'),
-                (4, 'Projection'), (5, 'Maintenance'), (6, 'Security')''')
-            
-            # Customer
-            cursor.execute('''INSERT INTO customer (customer_id, full_name, phone_number, email, date_of_birth, gender) VALUES 
-                (1, 'Arben Hoxha', '+355691234567', 'arben.hoxha@email.com', '1990-05-15', 'Male'),
-                (2, 'Maria Koci', '+355692345678', 'maria.koci@email.com', '1985-08-22', 'Female'),
-                (3, 'Dritan Leka', '+355693456789', 'dritan.leka@email.com', '1992-03-10', 'Male'),
-                (4, 'Elena Brahimi', '+355694567890', 'elena.brahimi@email.com', '1988-12-01', 'Female'),
-                (5, 'Besnik Shehu', '+355695678901', 'besnik.shehu@email.com', '1995-07-25', 'Male')''')
-            
-            # Genre
-            cursor.execute('''INSERT INTO genre (genre_id, genre_name) VALUES 
-                (1, 'Action'), (2, 'Comedy'), (3, 'Drama'), (4, 'Horror'), (5, 'Science Fiction'),
-                (6, 'Romance'), (7, 'Thriller'), (8, 'Animation'), (9, 'Adventure'), (10, 'Fantasy')''')
-            
-            # Hall
-            cursor.execute('''INSERT INTO hall (hall_id, hall_name, capacity, cinema_id) VALUES 
-                (1, 'Hall A - IMAX', 200, 1),
-                (2, 'Hall B - Premium', 150, 1),
-                (3, 'Hall C - Standard', 120, 1),
-                (4, 'Hall D - Standard', 120, 2),
-                (5, 'Hall E - VIP', 50, 2)''')
-            
-            # Food
-            cursor.execute('''INSERT INTO food (food_id, food_name, price) VALUES 
-                (1, 'Small Popcorn', 350.00), (2, 'Medium Popcorn', 500.00), (3, 'Large Popcorn', 650.00),
-                (4, 'Small Soda', 200.00), (5, 'Medium Soda', 300.00), (6, 'Large Soda', 400.00),
-                (7, 'Hot Dog', 450.00), (8, 'Nachos', 550.00)''')
-            
-            # Movie
-            cursor.execute('''INSERT INTO movie (movie_id, title, duration, release_date, language, age_rating, adult_price, kids_price) VALUES 
-                (1, 'The Dark Knight Returns', 152, '2025-06-15', 'English', 13, 800.00, 500.00),
-                (2, 'Love in Paris', 118, '2025-07-20', 'English', 12, 700.00, 450.00),
-                (3, 'Alien Invasion 3', 135, '2025-08-10', 'English', 16, 850.00, 550.00),
-                (4, 'Comedy Night', 95, '2025-09-01', 'English', 7, 600.00, 400.00),
-                (5, 'Frozen Dreams', 105, '2025-10-01', 'English', 0, 650.00, 450.00)''')
-            
-            # Employee
-            cursor.execute('''INSERT INTO employee (employee_id, full_name, role, phone_number, email, date_of_birth, department_id, cinema_id) VALUES 
-                (1, 'Robert Pasha', 'General Manager', '+355681111111', 'robert.p@cineplexx.al', '1975-03-15', 1, 1),
-                (2, 'Sara Kelmendi', 'Operations Manager', '+355682222222', 'sara.k@cineplexx.al', '1980-07-22', 1, 1),
-                (3, 'Tom Berisha', 'Floor Manager', '+355683333333', 'tom.b@cineplexx.al', '1985-11-10', 1, 2),
-                (4, 'Alba Hoti', 'Senior Cashier', '+355684444444', 'alba.h@cineplexx.al', '1992-05-18', 2, 1),
-                (5, 'Bujar Duka', 'Cashier', '+355685555555', 'bujar.d@cineplexx.al', '1995-08-25', 2, 1)''')
-            
-            # Seat
-            cursor.execute('''INSERT INTO seat (hall_id, seat_number, seat_row, seat_type) VALUES 
-                (1, 1, 'A', 'Regular'), (1, 2, 'A', 'Regular'), (1, 3, 'A', 'Regular'), (1, 4, 'A', 'Regular'), (1, 5, 'A', 'Regular'),
-                (1, 1, 'B', 'Regular'), (1, 2, 'B', 'Regular'), (1, 3, 'B', 'Regular'), (1, 4, 'B', 'Regular'), (1, 5, 'B', 'Regular'),
-                (1, 1, 'C', 'VIP'), (1, 2, 'C', 'VIP'), (1, 3, 'C', 'VIP'), (1, 4, 'C', 'VIP'), (1, 5, 'C', 'VIP'),
-                (2, 1, 'A', 'VIP'), (2, 2, 'A', 'VIP'), (2, 3, 'A', 'VIP'), (2, 4, 'A', 'VIP'), (2, 5, 'A', 'VIP')''')
-            
-            # Movie Genre
-            cursor.execute('''INSERT INTO movie_genre (movie_id, genre_id) VALUES 
-                (1, 1), (1, 7), (2, 6), (2, 2), (3, 5), (3, 1), (4, 2), (5, 8), (5, 10)''')
-            
-            # Showtime
-            cursor.execute('''INSERT INTO showtime (showtime_id, movie_id, hall_id, show_date, start_time, end_time) VALUES 
-                (1, 1, 1, '2026-03-01', '10:00:00', '12:32:00'),
-                (2, 1, 1, '2026-03-01', '14:00:00', '16:32:00'),
-                (3, 2, 2, '2026-03-01', '11:00:00', '12:58:00'),
-                (4, 3, 1, '2026-03-02', '18:00:00', '20:15:00')''')
-            
-            # Manager
-            cursor.execute('''INSERT INTO manager (employee_id, management_level, contract_type, hire_date) VALUES 
-                (1, 1, 'Full-time', '2015-01-10'),
-                (2, 2, 'Full-time', '2017-03-15'),
-                (3, 3, 'Full-time', '2019-06-20')''')
-            
-            # Cashier
-            cursor.execute('''INSERT INTO cashier (employee_id, shift_type, hire_date, employment_status) VALUES 
-                (4, 'Morning', '2020-02-01', 'Active'),
-                (5, 'Afternoon', '2021-05-15', 'Active')''')
-            
-            # Booking
-            cursor.execute('''INSERT INTO booking (booking_id, customer_id, showtime_id, booking_date, adult_seat, child_seat) VALUES 
-                (1, 1, 1, '2026-02-28', 2, 0),
-                (2, 2, 3, '2026-02-28', 2, 1)''')
-            
-            # Ticket
-            cursor.execute('''INSERT INTO ticket (ticket_id, booking_id, showtime_id, hall_id, seat_number, seat_row, ticket_price) VALUES 
-                (1, 1, 1, 1, 1, 'A', 800.00),
-                (2, 1, 1, 1, 2, 'A', 800.00),
-                (3, 2, 3, 2, 1, 'A', 700.00),
-                (4, 2, 3, 2, 2, 'A', 700.00),
-                (5, 2, 3, 2, 3, 'A', 450.00)''')
-            
-            # Food Order
-            cursor.execute('''INSERT INTO food_order (order_id, customer_id, order_date, order_time, order_amount) VALUES 
-                (1, 1, '2026-03-01', '09:45:00', 1200.00),
-                (2, 2, '2026-03-01', '10:30:00', 950.00)''')
-            
-            # Order Food
-            cursor.execute('''INSERT INTO order_food (order_id, food_id, quantity) VALUES 
-                (1, 3, 1), (1, 6, 2), (2, 2, 1), (2, 5, 1)''')
-            
-            # Payment
-            cursor.execute('''INSERT INTO payment (payment_id, booking_id, order_id, payment_date, payment_time, amount, status, payment_method) VALUES 
-                (1, 1, 1, '2026-03-01', '09:50:00', 2800.00, 'Completed', 'Card'),
-                (2, 2, 2, '2026-03-01', '10:35:00', 2800.00, 'Completed', 'Cash')''')
-            
-            # Card Payment
-            cursor.execute('''INSERT INTO card_payment (payment_id, card_number, card_type, expiry_date, cardholder_name) VALUES 
-                (1, '4532XXXXXXXX1234', 'Visa', '2028-05-01', 'Arben Hoxha')''')
-            
-            # Cash Payment
-            cursor.execute('''INSERT INTO cash_payment (payment_id, change_amount) VALUES (2, 200.00)''')
-            
-            conn.commit()
-            print("Sample data loaded successfully!")
-        
-        conn.close()
+# Postgres indexes the referenced side of a foreign key but not the referencing
+# one, so without help joins on FK columns and the checks a parent delete runs
+# against its children scan whole tables. Every foreign key therefore gets a
+# btree index on its columns unless an existing valid btree index already
+# leads with them, and ACCESS_PATTERNS declares the composite filters the
+# routes use on top of that. index_steps() is a migration step, so the
+# indexes are built CONCURRENTLY and never block writes.
+ACCESS_PATTERNS = {
+    'showtime': [('movie_id', 'show_date'), ('hall_id', 'show_date')],
+}
+INDEX_REPORT_MIN_ROWS = int(os.environ.get('INDEX_REPORT_MIN_ROWS', 10000))
+FOREIGN_KEYS_SQL = '''SELECT c.conrelid::regclass::text, array_agg(a.attname::text ORDER BY k.ord)
+    FROM pg_constraint c
+    CROSS JOIN LATERAL unnest(c.conkey) WITH ORDINALITY AS k(attnum, ord)
+    JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+    WHERE c.contype = 'f' AND c.connamespace = 'public'::regnamespace
+    GROUP BY c.oid, c.conrelid ORDER BY 1, 2'''
+BTREE_INDEXES_SQL = '''SELECT i.indrelid::regclass::text, c.relname::text, i.indisvalid,
+        ARRAY(SELECT a.attname::text FROM unnest(i.indkey::int2[]) WITH ORDINALITY AS k(attnum, ord)
+              JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum ORDER BY k.ord)
+    FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid JOIN pg_am am ON am.oid = c.relam
+    WHERE c.relnamespace = 'public'::regnamespace AND am.amname = 'btree' '''
+UNUSED_INDEXES_SQL = '''SELECT s.relname::text, s.indexrelname::text, pg_relation_size(s.indexrelid)
+    FROM pg_stat_user_indexes s JOIN pg_index i ON i.indexrelid = s.indexrelid
+    WHERE s.idx_scan = 0 AND NOT i.indisunique AND NOT i.indisprimary
+    ORDER BY pg_relation_size(s.indexrelid) DESC'''
+SEQ_SCANNED_SQL = '''SELECT relname::text, seq_scan, seq_tup_read, COALESCE(idx_scan, 0), n_live_tup
+    FROM pg_stat_user_tables
+    WHERE n_live_tup >= %s AND seq_scan > COALESCE(idx_scan, 0)
+    ORDER BY seq_tup_read DESC'''
+
+def index_name(table, cols):
+    return f'{table}_{"_".join(cols)}_idx'
+
+def covers(index_cols, cols, ordered):
+    lead = list(index_cols[:len(cols)])
+    return lead == list(cols) if ordered else sorted(lead) == sorted(cols)
+
+# Declared patterns need their column order; a foreign key only needs its
+# columns to lead the index in any order.
+def planned_indexes(foreign_keys, indexes):
+    existing = [(table, cols) for table, _, valid, cols in indexes if valid]
+    planned = []
+    wanted = [(table, cols, True) for table, patterns in ACCESS_PATTERNS.items() for cols in patterns]
+    wanted += [(table, cols, False) for table, cols in foreign_keys]
+    for table, cols, ordered in wanted:
+        if not any(t == table and covers(c, cols, ordered) for t, c in existing + planned):
+            planned.append((table, list(cols)))
+    return planned
+
+# An unused index that covers a foreign key may still be what keeps parent
+# deletes fast, so the report flags those before anyone drops them.
+def index_report(foreign_keys, indexes, unused, scanned):
+    columns = {name: cols for _, name, _, cols in indexes}
+    return {
+        'missing': [{'table': table, 'columns': cols, 'name': index_name(table, cols)}
+                    for table, cols in planned_indexes(foreign_keys, indexes)],
+        'invalid': [name for _, name, valid, _ in indexes if not valid],
+        'unused': [{'table': table, 'name': name, 'bytes': size,
+                    'foreign_key': any(t == table and covers(columns.get(name, []), cols, False) for t, cols in foreign_keys)}
+                   for table, name, size in unused],
+        'seq_scanned': [{'table': table, 'seq_scan': seq_scan, 'seq_tup_read': tup_read,
+                         'idx_scan': idx_scan, 'rows': rows}
+                        for table, seq_scan, tup_read, idx_scan, rows in scanned],
+    }
+
+def index_steps(conn):
+    indexes = conn.execute(BTREE_INDEXES_SQL).fetchall()
+    return [concurrent_index(index_name(table, cols), table, '(' + ', '.join([f'"{col}"' for col in cols]) + ')')
+            for table, cols in planned_indexes(conn.execute(FOREIGN_KEYS_SQL).fetchall(), indexes)]
+
+# ============================================
+# WRITE HOOKS
+# ============================================
+# Subsystems that keep derived state (caches, counters) register here and are
+# told about every committed write made through the API.
+_write_hooks = []
+
+def on_write(func):
+    _write_hooks.append(func)
+    return func
+
+def emit_write(table, before=None, after=None):
+    for hook in _write_hooks:
+        try:
+            hook(table, before, after)
+        except Exception as e:
+            print(f"Write hook {hook.__name__} failed: {e}")
+
+# ============================================
+# NOTIFICATIONS
+# ============================================
+# One listener thread per process owns a dedicated autocommit connection,
+# LISTENs on every channel a handler registered for and dispatches incoming
+# NOTIFY payloads to those handlers. publish() queues a payload that the same
+# thread sends, so publishing never takes a pooled connection. Payloads carry
+# the sender's pid and a process skips its own. After (re)connecting, each
+# handler is called with None: notifications may have been missed meanwhile.
+NOTIFY_POLL_INTERVAL = float(os.environ.get('NOTIFY_POLL_INTERVAL', 0.2))
+_notify_handlers = {}
+_outbox = collections.deque()
+_listener_pid = None
+
+def on_notify(channel):
+    def register(func):
+        _notify_handlers.setdefault(channel, []).append(func)
+        return func
+    return register
+
+def publish(channel, payload):
+    start_listener()
+    _outbox.append((channel, json.dumps(dict(payload, pid=os.getpid()), separators=(',', ':'), default=_json_default)))
+
+def _dispatch(channel, payload):
+    for handler in _notify_handlers.get(channel, []):
+        try:
+            handler(payload)
+        except Exception as e:
+            print(f"Notify handler {handler.__name__} failed: {e}")
+
+def _listen_loop():
+    while True:
+        try:
+            with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+                for channel in _notify_handlers:
+                    conn.execute(f'LISTEN "{channel}"')
+                for channel in _notify_handlers:
+                    _dispatch(channel, None)
+                while True:
+                    while _outbox:
+                        channel, payload = _outbox[0]
+                        conn.execute('SELECT pg_notify(%s, %s)', [channel, payload])
+                        _outbox.popleft()
+                    for note in conn.notifies(timeout=NOTIFY_POLL_INTERVAL):
+                        payload = json.loads(note.payload)
+                        if payload.get('pid') != os.getpid():
+                            _dispatch(note.channel, payload)
+        except Exception as e:
+            print(f"Notification listener failed, reconnecting: {e}")
+            clock.sleep(1)
+
+def start_listener():
+    global _listener_pid
+    if _listener_pid != os.getpid():
+        with _pool_lock:
+            if _listener_pid != os.getpid():
+                _outbox.clear()
+                threading.Thread(target=_listen_loop, name='notify-listener', daemon=True).start()
+                _listener_pid = os.getpid()
+
+# ============================================
+# EVENT STREAM
+# ============================================
+# Dashboards subscribe to /api/events (Server-Sent Events) instead of polling.
+# Every write made through the API becomes a 'change' event with the table,
+# operation, primary key path and new row, and inserts and deletes also a
+# 'stats' event with the row count delta. Events reach this process's
+# subscribers directly and other processes over NOTIFY, so a process needs no
+# connection per subscriber, only the listener it already has. Each event is
+# encoded once for all subscribers. The last EVENTS_BACKLOG are kept, so a
+# client that reconnects to the same process with Last-Event-ID gets what it
+# missed; any other client that may have missed events (and a subscriber that
+# fell EVENTS_QUEUE_SIZE events behind) gets a 'reset' event and reloads.
+# Streams are served by asgi_app, where a subscriber is a coroutine waiting
+# on an event; the Flask app answers /api/events with 501, as a stream there
+# would hold a worker per subscriber. Writes made through either app are
+# published over NOTIFY, and a dashboard without the stream polls its counters
+# every 30 seconds.
+EVENTS_CHANNEL = 'cineplexx_events'
+EVENTS_BACKLOG = int(os.environ.get('EVENTS_BACKLOG', 1000))
+EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', 1000))
+EVENTS_MAX_SUBSCRIBERS = int(os.environ.get('EVENTS_MAX_SUBSCRIBERS', 100))
+EVENTS_HEARTBEAT = float(os.environ.get('EVENTS_HEARTBEAT', 15))
+EVENTS_RETRY_MS = 3000
+NOTIFY_MAX_PAYLOAD = 7900
+RESET_EVENT = 'event: reset\ndata: {}\n\n'
+_event_backlog = collections.deque(maxlen=EVENTS_BACKLOG)
+_event_seq = 0
+_events_listening = False
+_subscribers = set()
+_events_lock = threading.Lock()
+
+class Subscription:
+    def __init__(self, tables, wake):
+        self.tables = tables
+        self.wake = wake
+        self.events = collections.deque()
+        self.overflowed = False
+
+    def deliver(self, event):
+        if self.tables and event[1] is not None and event[1] not in self.tables:
+            return
+        if len(self.events) >= EVENTS_QUEUE_SIZE:
+            self.overflowed = True
+        else:
+            self.events.append(event)
+        self.wake()
+
+def parse_event_tables(args):
+    tables = {t.strip() for t in args.get('tables', '').split(',') if t.strip()}
+    unknown = sorted(tables - set(TABLES))
+    if unknown:
+        raise ValueError(f'Unknown tables: {", ".join(unknown)}')
+    return tables
+
+def subscribe(tables, wake, last_event_id=None):
+    # Returns the subscription and the backlog events after last_event_id,
+    # or None in place of those when the client may have missed events.
+    start_listener()
+    with _events_lock:
+        subscription = Subscription(tables, wake)
+        _subscribers.add(subscription)
+        return subscription, replay_events(last_event_id, tables)
+
+def unsubscribe(subscription):
+    with _events_lock:
+        _subscribers.discard(subscription)
+
+def replay_events(last_event_id, tables):
+    if not last_event_id:
+        return []
+    pid, _, seq = last_event_id.partition('-')
+    if pid != str(os.getpid()) or not seq.isdigit():
+        return None
+    seq = int(seq)
+    if seq > _event_seq or (_event_backlog and _event_backlog[0][0] > seq + 1):
+        return None
+    return [event for event in _event_backlog if event[0] > seq and (not tables or event[1] in tables)]
+
+def broadcast(kind, table, data):
+    global _event_seq
+    with _events_lock:
+        _event_seq += 1
+        event = (_event_seq, table, f'id: {os.getpid()}-{_event_seq}\nevent: {kind}\ndata: {app.json.dumps(data)}\n\n')
+        _event_backlog.append(event)
+        for subscription in _subscribers:
+            subscription.deliver(event)
+
+def event_preamble(replay):
+    return f'retry: {EVENTS_RETRY_MS}\n\n' + (RESET_EVENT if replay is None else ''.join([e[2] for e in replay]))
+
+def drain_events(subscription):
+    if subscription.overflowed:
+        subscription.events.clear()
+        subscription.overflowed = False
+        return RESET_EVENT
+    parts = []
+    while subscription.events:
+        parts.append(subscription.events.popleft()[2])
+    return ''.join(parts)
+
+def change_event(table, before, after):
+    if before is None and after is None:
+        return {'table': table, 'op': 'reload'}
+    row = after if after is not None else before
+    event = {'table': table, 'op': 'insert' if before is None else 'delete' if after is None else 'update',
+             'key': '/'.join([str(row[col]) for col in TABLES[table]['pk']])}
+    if after is not None:
+        event['row'] = after
+    return event
+
+def deliver_change(event):
+    table = event['table']
+    broadcast('change', table, event)
+    if event['op'] == 'reload':
+        broadcast('stats', table, {'table': table, 'reload': True})
+    elif event['op'] != 'update':
+        broadcast('stats', table, {'table': table, 'delta': 1 if event['op'] == 'insert' else -1})
+
+@on_write
+def publish_change(table, before, after):
+    if table not in TABLES:
+        return
+    event = change_event(table, before, after)
+    deliver_change(event)
+    # NOTIFY payloads are limited to 8000 bytes; other processes then get
+    # the key only and their clients fetch the row.
+    if 'row' in event and len(json.dumps(event, default=_json_default)) > NOTIFY_MAX_PAYLOAD:
+        del event['row']
+    publish(EVENTS_CHANNEL, event)
+
+@on_notify(EVENTS_CHANNEL)
+def apply_event_notification(payload):
+    # None on the listener's first connect is not a gap; on a reconnect,
+    # events from other processes may have been lost.
+    global _events_listening
+    if payload is None:
+        if _events_listening:
+            broadcast('reset', None, {})
+        _events_listening = True
+        return
+    payload.pop('pid', None)
+    deliver_change(payload)
+
+# ============================================
+# REFERENCE CACHE
+# ============================================
+# Reference tables change a few times a week but are read by every booking
+# flow, so their list pages and records are served from an in-process LRU of
+# encoded response bodies, keyed by table and primary key (or page query).
+# Entries live REFERENCE_CACHE_TTL seconds at most. A write through the API
+# drops the written keys and the table's pages here at once and, via NOTIFY,
+# in every other worker. Each table has a generation that every invalidation
+# bumps; a body computed while the generation moved is not stored, so a slow
+# read racing a write cannot cache the old rows. Responses carry an ETag and
+# Last-Modified, and conditional requests for unchanged bodies get a 304.
+REFERENCE_TABLES = [t.strip() for t in os.environ.get(
+    'REFERENCE_TABLES', 'cinema,hall,genre,department,food,movie,movie_genre').split(',') if t.strip()]
+REFERENCE_CACHE_TTL = float(os.environ.get('REFERENCE_CACHE_TTL', 300))
+REFERENCE_CACHE_SIZE = int(os.environ.get('REFERENCE_CACHE_SIZE', 2048))
+CACHE_CHANNEL = 'cineplexx_cache'
+_reference_cache = collections.OrderedDict()
+_reference_generations = collections.defaultdict(int)
+_reference_lock = threading.Lock()
+
+# Record keys are the primary key values as the database prints them, so
+# /api/cinema/05 and a write to cinema 5 land on the same entry.
+def record_key(table, values):
+    try:
+        return tuple([str(parse_value(value, typ)) for value, typ in zip(values, pk_types(table))])
+    except ValueError:
+        return None
+
+def reference_key(table, kind, value):
+    if table not in REFERENCE_TABLES:
+        return None
+    if kind == 'page':
+        value = tuple(sorted(value.items(multi=True)))
+    else:
+        value = record_key(table, value)
+        if value is None:
+            return None
+    start_listener()
+    return (table, kind, value), _reference_generations[table]
+
+def body_etag(body):
+    return f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+def etag_matches(etag, headers):
+    if_none_match = headers.get('If-None-Match')
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return etag in tags or '*' in tags
+
+# Other JSON GET responses under /api/ get an ETag from their body on the way
+# out, so the dashboard can revalidate the schema and table pages it keeps and
+# skip the transfer and parse when nothing changed. The query still runs; only
+# the reference cache saves that.
+def conditional_etag(request, response):
+    return (request.method == 'GET' and response.status_code == 200 and response.mimetype == 'application/json'
+            and request.path.startswith('/api/') and 'ETag' not in response.headers)
+
+def not_modified(request, response, body):
+    response.headers['ETag'] = body_etag(body)
+    return etag_matches(response.headers['ETag'], request.headers)
+
+def cache_get(key):
+    now = clock.time()
+    with _reference_lock:
+        entry = _reference_cache.get(key[0])
+        if entry is None or entry['expires'] <= now:
+            return None
+        _reference_cache.move_to_end(key[0])
+        return entry
+
+def cache_put(key, body, status=200):
+    body = body.encode() if isinstance(body, str) else body
+    now = clock.time()
+    entry = {'body': body, 'status': status, 'expires': now + REFERENCE_CACHE_TTL,
+             'etag': body_etag(body),
+             'last_modified': email.utils.formatdate(int(now), usegmt=True)}
+    table = key[0][0]
+    with _reference_lock:
+        if _reference_generations[table] == key[1]:
+            _reference_cache[key[0]] = entry
+            _reference_cache.move_to_end(key[0])
+            while len(_reference_cache) > REFERENCE_CACHE_SIZE:
+                _reference_cache.popitem(last=False)
+    return entry
+
+def cached_response(entry, headers):
+    response_headers = {'ETag': entry['etag'], 'Last-Modified': entry['last_modified'],
+                        'Cache-Control': 'no-cache', 'Content-Type': 'application/json'}
+    if entry['status'] == 200:
+        if headers.get('If-None-Match'):
+            if etag_matches(entry['etag'], headers):
+                return b'', 304, response_headers
+        elif headers.get('If-Modified-Since'):
+            try:
+                since = email.utils.parsedate_to_datetime(headers['If-Modified-Since'])
+                if since >= email.utils.parsedate_to_datetime(entry['last_modified']):
+                    return b'', 304, response_headers
+            except (TypeError, ValueError):
+                pass
+    return entry['body'], entry['status'], response_headers
+
+def drop_reference_entries(table, keys=None):
+    with _reference_lock:
+        _reference_generations[table] += 1
+        for key in list(_reference_cache):
+            if key[0] == table and (keys is None or key[1] == 'page' or key[2] in keys):
+                del _reference_cache[key]
+
+@on_write
+def invalidate_reference_cache(table, before, after):
+    if table not in REFERENCE_TABLES:
+        return
+    pk_cols = TABLES[table]['pk']
+    keys = [tuple(str(row[col]) for col in pk_cols) for row in (before, after) if row]
+    drop_reference_entries(table, set(keys) if keys else None)
+    publish(CACHE_CHANNEL, {'table': table, 'keys': keys or None})
+
+@on_notify(CACHE_CHANNEL)
+def apply_cache_notification(payload):
+    if payload is None:
+        for table in REFERENCE_TABLES:
+            drop_reference_entries(table)
+    elif payload.get('table') in REFERENCE_TABLES:
+        keys = payload.get('keys')
+        drop_reference_entries(payload['table'], {tuple(key) for key in keys} if keys else None)
+
+# ============================================
+# STATS
+# ============================================
+# Small tables are counted exactly; tables whose planner estimate is at least
+# STATS_ESTIMATE_ROWS report pg_class.reltuples instead of a full scan. The
+# COUNT(*) subqueries are InitPlans, which Postgres only runs when the CASE
+# actually reaches them, so all 20 counts come back from one statement.
+STATS_CACHE_TTL = float(os.environ.get('STATS_CACHE_TTL', 5))
+STATS_ESTIMATE_ROWS = int(os.environ.get('STATS_ESTIMATE_ROWS', 100000))
+STATS_SQL = ' UNION ALL '.join([
+    f"""SELECT '{table}', CASE WHEN c.reltuples >= %(threshold)s THEN c.reltuples::bigint
+        ELSE (SELECT COUNT(*) FROM "{table}") END, COALESCE(c.reltuples >= %(threshold)s, false)
+        FROM pg_class c WHERE c.oid = '"{table}"'::regclass"""
+    for table in TABLES
+])
+_stats_cache = {'counts': None, 'estimated': [], 'expires': 0.0}
+_stats_lock = threading.Lock()
+
+def stats_from_rows(rows):
+    counts = {table: count for table, count, _ in rows}
+    estimated = [table for table, _, is_estimate in rows if is_estimate]
+    return counts, estimated
+
+def read_stats(exact=False):
+    result = yield Query(STATS_SQL, {'threshold': None if exact else STATS_ESTIMATE_ROWS})
+    return stats_from_rows(result.rows)
+
+def load_stats(exact=False):
+    return run_steps(read_stats(exact))
+
+def cached_stats():
+    if _stats_cache['counts'] is not None and clock.monotonic() < _stats_cache['expires']:
+        return _stats_cache['counts'], _stats_cache['estimated']
+    return None
+
+def store_stats(counts, estimated):
+    _stats_cache.update(counts=counts, estimated=estimated, expires=clock.monotonic() + STATS_CACHE_TTL)
+
+def get_cached_stats():
+    cached = cached_stats()
+    if cached:
+        return cached
+    with _stats_lock:
+        cached = cached_stats()
+        if cached is None:
+            cached = load_stats()
+            store_stats(*cached)
+        return cached
+
+def stats_response(stats, estimated):
+    return stats, 200, {'X-Stats-Estimated': ','.join(estimated)}
+
+@on_write
+def invalidate_stats(table, before, after):
+    _stats_cache['expires'] = 0.0
+
+# ============================================
+# SEAT AVAILABILITY
+# ============================================
+# Every hall gets a bit layout: one bit per seat, rows laid out one after the
+# other in seat-number order with an unused bit between rows, so a run of set
+# bits is always a run of physically adjacent seats. A showtime's occupancy is
+# then a single int with the sold seats' bits set, built once from seat/ticket
+# and kept current by the ticket write hook; unexpired seat holds are tracked
+# alongside with their expiry time. SEAT_MAP_TTL bounds how long a map may miss
+# sales made by other worker processes.
+SEAT_MAP_TTL = float(os.environ.get('SEAT_MAP_TTL', 10))
+
+class HallLayout:
+    def __init__(self, hall_id, seats):
+        self.hall_id = hall_id
+        self.bits = {}
+        self.seats = []
+        self.rows = []
+        self.type_masks = {}
+        self.mask = 0
+        by_row = {}
+        for seat_row, seat_number, seat_type in seats:
+            by_row.setdefault(seat_row, []).append((seat_number, seat_type))
+        base = 0
+        for seat_row in sorted(by_row, key=lambda r: (len(r), r)):
+            numbers = sorted(by_row[seat_row])
+            low = numbers[0][0]
+            row_mask = 0
+            for seat_number, seat_type in numbers:
+                bit = base + seat_number - low
+                self.bits[(seat_row, seat_number)] = bit
+                self.seats.append((seat_row, seat_number, seat_type, bit))
+                self.type_masks[seat_type] = self.type_masks.get(seat_type, 0) | (1 << bit)
+                row_mask |= 1 << bit
+            self.rows.append((seat_row, row_mask, base + (numbers[-1][0] - low) / 2))
+            self.mask |= row_mask
+            base += numbers[-1][0] - low + 2
+
+class ShowtimeSeats:
+    def __init__(self, showtime_id, layout, occupied, holds=None):
+        self.showtime_id = showtime_id
+        self.layout = layout
+        self.occupied = occupied
+        self.holds = holds or {}
+        self.built_at = clock.monotonic()
+
+    def set_seat(self, seat_row, seat_number, taken):
+        bit = self.layout.bits.get((seat_row, seat_number))
+        if bit is not None:
+            if taken:
+                self.occupied |= 1 << bit
+            else:
+                self.occupied &= ~(1 << bit)
+
+    def set_hold(self, seat_row, seat_number, expires_at):
+        bit = self.layout.bits.get((seat_row, seat_number))
+        if bit is not None:
+            if expires_at is None:
+                self.holds.pop(bit, None)
+            else:
+                self.holds[bit] = expires_at
+
+    def held_mask(self):
+        now = clock.time()
+        mask = 0
+        for bit, expires_at in list(self.holds.items()):
+            if expires_at <= now:
+                self.holds.pop(bit, None)
+            else:
+                mask |= 1 << bit
+        return mask
+
+    def free_mask(self, seat_type=None):
+        mask = self.layout.type_masks.get(seat_type, 0) if seat_type else self.layout.mask
+        return mask & ~(self.occupied | self.held_mask())
+
+    def best_block(self, count, seat_type=None):
+        # runs has a bit set wherever `count` free seats start; rows nearest
+        # the middle of the hall win, then the block nearest the row centre.
+        free = self.free_mask(seat_type)
+        middle = (len(self.layout.rows) - 1) / 2
+        best = None
+        for index, (seat_row, row_mask, centre) in enumerate(self.layout.rows):
+            runs = free & row_mask
+            for _ in range(count - 1):
+                runs &= runs >> 1
+            while runs:
+                start = (runs & -runs).bit_length() - 1
+                score = (abs(index - middle), abs(start + (count - 1) / 2 - centre))
+                if best is None or score < best[0]:
+                    best = (score, start)
+                runs &= runs - 1
+        if best is None:
+            return None
+        wanted = range(best[1], best[1] + count)
+        return [seat for seat in self.layout.seats if seat[3] in wanted]
+
+_hall_layouts = {}
+_showtime_seats = {}
+_seat_lock = threading.Lock()
+
+SEAT_MAP_SQL = '''SELECT s.hall_id, t.seat_row, t.seat_number, NULL::timestamptz FROM showtime s
+    LEFT JOIN ticket t ON t.showtime_id = s.showtime_id WHERE s.showtime_id = %(showtime_id)s
+    UNION ALL
+    SELECT h.hall_id, h.seat_row, h.seat_number, h.expires_at FROM seat_hold h
+    WHERE h.showtime_id = %(showtime_id)s AND h.expires_at > now()'''
+HALL_SEATS_SQL = 'SELECT seat_row, seat_number, seat_type FROM seat WHERE hall_id = %s'
+
+def cached_showtime_seats(showtime_id):
+    seats = _showtime_seats.get(showtime_id)
+    if seats is not None and clock.monotonic() - seats.built_at < SEAT_MAP_TTL:
+        return seats
+    return None
+
+def cached_hall_layout(hall_id):
+    return _hall_layouts.get(hall_id)
+
+def store_showtime_seats(showtime_id, layout, sold):
+    occupied = 0
+    holds = {}
+    for _, seat_row, seat_number, expires_at in sold:
+        bit = layout.bits.get((seat_row, seat_number))
+        if bit is None:
+            continue
+        if expires_at is None:
+            occupied |= 1 << bit
+        else:
+            holds[bit] = expires_at.timestamp()
+    seats = ShowtimeSeats(showtime_id, layout, occupied, holds)
+    with _seat_lock:
+        _hall_layouts[layout.hall_id] = layout
+        _showtime_seats[showtime_id] = seats
+    return seats
+
+def showtime_seats(showtime_id):
+    seats = cached_showtime_seats(showtime_id)
+    if seats is not None:
+        return seats
+    sold = (yield Query(SEAT_MAP_SQL, {'showtime_id': showtime_id})).rows
+    if not sold:
+        return None
+    hall_id = sold[0][0]
+    layout = cached_hall_layout(hall_id)
+    if layout is None:
+        layout = HallLayout(hall_id, (yield Query(HALL_SEATS_SQL, [hall_id])).rows)
+    return store_showtime_seats(showtime_id, layout, sold)
+
+def seat_map_payload(showtime_id, seats, only_free=False):
+    free = seats.free_mask()
+    held = seats.held_mask()
+    return {
+        'showtime_id': showtime_id,
+        'hall_id': seats.layout.hall_id,
+        'capacity': len(seats.layout.seats),
+        'available': bin(free).count('1'),
+        'held': bin(held).count('1'),
+        'seats': [{'seat_row': seat_row, 'seat_number': seat_number, 'seat_type': seat_type,
+                   'available': bool(free >> bit & 1), 'held': bool(held >> bit & 1)}
+                  for seat_row, seat_number, seat_type, bit in seats.layout.seats if not only_free or free >> bit & 1],
+    }
+
+def parse_block_count(args):
+    try:
+        count = int(args.get('count', 1))
+    except ValueError:
+        raise ValueError('count must be an integer')
+    if count < 1:
+        raise ValueError('count must be at least 1')
+    if count > BOOKING_MAX_SEATS:
+        raise ValueError(f'At most {BOOKING_MAX_SEATS} seats per booking')
+    return count
+
+def best_block_payload(showtime_id, seats, count, seat_type=None):
+    block = seats.best_block(count, seat_type)
+    if block is None:
+        return {'error': f'No block of {count} adjacent seats available'}, 404
+    return {'showtime_id': showtime_id, 'hall_id': seats.layout.hall_id,
+            'seats': [{'seat_row': seat_row, 'seat_number': seat_number, 'seat_type': seat_type}
+                      for seat_row, seat_number, seat_type, _ in block]}, 200
+
+@on_write
+def update_seat_maps(table, before, after):
+    with _seat_lock:
+        if table == 'ticket':
+            if before is None and after is None:
+                _showtime_seats.clear()
+            for row, taken in ((before, False), (after, True)):
+                seats = _showtime_seats.get(row['showtime_id']) if row else None
+                if seats is not None:
+                    seats.set_seat(row['seat_row'], row['seat_number'], taken)
+        elif table == 'seat_hold':
+            for row, active in ((before, False), (after, True)):
+                seats = _showtime_seats.get(row['showtime_id']) if row else None
+                if seats is not None:
+                    seats.set_hold(row['seat_row'], row['seat_number'], row['expires_at'].timestamp() if active else None)
+        elif table in ('seat', 'hall'):
+            halls = {row['hall_id'] for row in (before, after) if row}
+            for hall_id in list(_hall_layouts):
+                if not halls or hall_id in halls:
+                    del _hall_layouts[hall_id]
+            for showtime_id, seats in list(_showtime_seats.items()):
+                if not halls or seats.layout.hall_id in halls:
+                    del _showtime_seats[showtime_id]
+        elif table == 'showtime':
+            showtimes = {row['showtime_id'] for row in (before, after) if row}
+            for showtime_id in list(_showtime_seats):
+                if not showtimes or showtime_id in showtimes:
+                    del _showtime_seats[showtime_id]
+
+# ============================================
+# BOOKINGS
+# ============================================
+# A sale is one statement: booking, tickets, payment and the card/cash row are
+# chained data-modifying CTEs, with ticket prices taken from the movie. Seats
+# are arbitrated by the unique (showtime, seat) index on ticket: a concurrent
+# buyer of the same seat waits on the index entry and then skips it via ON
+# CONFLICT DO NOTHING, so nothing locks seat rows or the showtime and sales of
+# different seats never block each other. Seats are inserted in a fixed order
+# so overlapping requests cannot deadlock.
+BOOKING_MAX_SEATS = int(os.environ.get('BOOKING_MAX_SEATS', 20))
+BOOKING_ID_RETRIES = int(os.environ.get('BOOKING_ID_RETRIES', 3))
+BOOKING_SQL = '''
+WITH st AS (
+    SELECT s.showtime_id, s.hall_id, m.adult_price, m.kids_price
+    FROM showtime s JOIN movie m ON m.movie_id = s.movie_id
+    WHERE s.showtime_id = %(showtime_id)s
+),
+b AS (
+    INSERT INTO booking (booking_id, customer_id, showtime_id, booking_date, adult_seat, child_seat)
+    SELECT nextval('booking_id_seq'), %(customer_id)s, showtime_id, CURRENT_DATE, %(adults)s, %(children)s FROM st
+    RETURNING *
+),
+t AS (
+    INSERT INTO ticket (ticket_id, booking_id, showtime_id, hall_id, seat_number, seat_row, ticket_price)
+    SELECT nextval('ticket_id_seq'), b.booking_id, st.showtime_id, st.hall_id, r.seat_number, r.seat_row,
+           CASE WHEN r.child THEN st.kids_price ELSE st.adult_price END
+    FROM b CROSS JOIN st
+    CROSS JOIN unnest(%(seat_numbers)s::int[], %(seat_rows)s::varchar[], %(child)s::bool[]) AS r(seat_number, seat_row, child)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM seat_hold h
+        WHERE h.showtime_id = st.showtime_id AND h.hall_id = st.hall_id AND h.seat_number = r.seat_number
+          AND h.seat_row = r.seat_row AND h.expires_at > now() AND h.hold_token IS DISTINCT FROM %(hold_token)s::uuid)
+    ORDER BY r.seat_row, r.seat_number
+    ON CONFLICT (showtime_id, hall_id, seat_number, seat_row) DO NOTHING
+    RETURNING *
+),
+released AS (
+    DELETE FROM seat_hold WHERE hold_token = %(hold_token)s::uuid AND showtime_id = %(showtime_id)s
+    RETURNING *
+),
+p AS (
+    INSERT INTO payment (payment_id, booking_id, order_id, payment_date, payment_time, amount, status, payment_method)
+    SELECT nextval('payment_id_seq'), b.booking_id, NULL, CURRENT_DATE, LOCALTIME(0), total.amount, 'Completed', %(method)s::varchar
+    FROM b CROSS JOIN (SELECT SUM(ticket_price) AS amount FROM t) total
+    WHERE %(method)s::varchar IS NOT NULL AND total.amount IS NOT NULL
+    RETURNING *
+),
+card AS (
+    INSERT INTO card_payment (payment_id, card_number, card_type, expiry_date, cardholder_name)
+    SELECT payment_id, %(card_number)s::varchar, %(card_type)s::varchar, %(expiry_date)s::date, %(cardholder_name)s::varchar
+    FROM p WHERE %(method)s::varchar = 'Card'
+    RETURNING *
+),
+cash AS (
+    INSERT INTO cash_payment (payment_id, change_amount)
+    SELECT payment_id, %(tendered)s::numeric - amount FROM p WHERE %(method)s::varchar = 'Cash'
+    RETURNING *
+)
+SELECT (SELECT row_to_json(b) FROM b), (SELECT json_agg(t) FROM t), (SELECT row_to_json(p) FROM p),
+       (SELECT row_to_json(card) FROM card), (SELECT row_to_json(cash) FROM cash),
+       (SELECT json_agg(released) FROM released)
+'''
+
+BOOKING_SEQUENCES = (('booking', 'booking_id'), ('ticket', 'ticket_id'), ('payment', 'payment_id'))
+BOOKING_SCHEMA = [f'CREATE SEQUENCE IF NOT EXISTS {col}_seq' for _, col in BOOKING_SEQUENCES] + [
+    concurrent_index('ticket_showtime_seat_key', 'ticket', '(showtime_id, hall_id, seat_number, seat_row)', unique=True),
+]
+
+# Bookings allocate ids from sequences, but the record, batch and import
+# routes insert explicit ids, which the sequences may later hand out again.
+# These move each sequence past every existing id (and any id already handed
+# out). Migration 10 runs them once over the existing rows; after that, a
+# booking whose id turns out to be taken runs them and retries, up to
+# BOOKING_ID_RETRIES times.
+BOOKING_SEQUENCE_SYNC = [f'''SELECT setval('{col}_seq', GREATEST(
+    (SELECT COALESCE(MAX({col}), 0) FROM {table}),
+    (SELECT CASE WHEN is_called THEN last_value ELSE last_value - 1 END FROM {col}_seq)) + 1, false)'''
+    for table, col in BOOKING_SEQUENCES]
+BOOKING_KEYS = {f'{table}_pkey' for table, _ in BOOKING_SEQUENCES}
+
+def sync_booking_sequences(conn):
+    for sql in BOOKING_SEQUENCE_SYNC:
+        conn.execute(sql)
+
+def parse_booking(data):
+    if not isinstance(data, dict):
+        raise ValueError('Request body must be a JSON object')
+    params = {}
+    try:
+        params['customer_id'] = parse_value(data.get('customer_id'), 'int')
+        params['showtime_id'] = parse_value(data.get('showtime_id'), 'int')
+    except ValueError as e:
+        raise ValueError(f'customer_id/showtime_id: {e}')
+    if params['customer_id'] is None or params['showtime_id'] is None:
+        raise ValueError('customer_id and showtime_id are required')
+    seats = data.get('seats')
+    if not isinstance(seats, list) or not seats:
+        raise ValueError('seats must be a non-empty list')
+    if len(seats) > BOOKING_MAX_SEATS:
+        raise ValueError(f'At most {BOOKING_MAX_SEATS} seats per booking')
+    parsed = []
+    for seat in seats:
+        if not isinstance(seat, dict):
+            raise ValueError('Each seat must be an object')
+        seat_row = parse_value(seat.get('seat_row'), 'varchar(5)')
+        seat_number = parse_value(seat.get('seat_number'), 'int')
+        kind = seat.get('kind', 'adult')
+        if seat_row is None or seat_number is None or kind not in ('adult', 'child'):
+            raise ValueError('Each seat needs seat_row, seat_number and kind adult or child')
+        parsed.append((seat_row, seat_number, kind == 'child'))
+    if len({seat[:2] for seat in parsed}) != len(parsed):
+        raise ValueError('A seat is listed twice')
+    parsed.sort()
+    params['seat_rows'] = [seat[0] for seat in parsed]
+    params['seat_numbers'] = [seat[1] for seat in parsed]
+    params['child'] = [seat[2] for seat in parsed]
+    params['children'] = sum(params['child'])
+    params['adults'] = len(parsed) - params['children']
+
+    params['hold_token'] = parse_hold_token(data.get('hold_token'))
+    payment = data.get('payment') or {}
+    params.update(method=None, card_number=None, card_type=None, expiry_date=None, cardholder_name=None, tendered=None)
+    if payment:
+        params['method'] = payment.get('method')
+        if params['method'] == 'Card':
+            card_types = dict(zip(TABLES['card_payment']['columns'], TABLES['card_payment']['types']))
+            for col in ('card_number', 'card_type', 'expiry_date', 'cardholder_name'):
+                params[col] = parse_value(payment.get(col), card_types[col])
+                if params[col] is None:
+                    raise ValueError(f'payment.{col} is required for card payments')
+        elif params['method'] == 'Cash':
+            # The change is tendered minus a positive total, so a tendered
+            # amount that fits change_amount always leaves change that fits.
+            change_type = dict(zip(TABLES['cash_payment']['columns'], TABLES['cash_payment']['types']))['change_amount']
+            try:
+                params['tendered'] = parse_value(payment.get('tendered'), change_type)
+            except ValueError as e:
+                raise ValueError(f'payment.tendered: {e}')
+            if params['tendered'] is None:
+                raise ValueError('payment.tendered is required for cash payments')
+        else:
+            raise ValueError('payment.method must be Card or Cash')
+    return params
+
+# Turns the BOOKING_SQL row into (payload, status, writes). Anything but 201
+# means the transaction must be rolled back; writes are emitted after commit.
+def booking_result(params, row):
+    booking, tickets, payment, card, cash, released = row
+    if booking is None:
+        return {'error': 'Showtime not found'}, 404, []
+    tickets = tickets or []
+    if len(tickets) < len(params['seat_numbers']):
+        sold = {(t['seat_row'], t['seat_number']) for t in tickets}
+        taken = [{'seat_row': row, 'seat_number': number}
+                 for row, number in zip(params['seat_rows'], params['seat_numbers']) if (row, number) not in sold]
+        return {'error': 'Some seats are no longer available', 'taken': taken}, 409, []
+    writes = [('booking', None, booking)]
+    writes += [('seat_hold', hold, None) for hold in released or []]
+    writes += [('ticket', None, ticket) for ticket in tickets]
+    if payment:
+        writes.append(('payment', None, payment))
+        writes.append(('card_payment' if card else 'cash_payment', None, card or cash))
+    return {'success': True, 'message': 'Booking created successfully', 'booking': booking,
+            'tickets': tickets, 'payment': payment, 'card_payment': card, 'cash_payment': cash}, 201, writes
+
+def booking_error(e):
+    if isinstance(e, psycopg.errors.CheckViolation):
+        if e.diag.constraint_name == 'cash_payment_change_amount_check':
+            return {'error': 'Tendered amount is less than the total'}, 400
+        return {'error': str(e)}, 400
+    if isinstance(e, psycopg.errors.ForeignKeyViolation):
+        return {'error': 'Unknown customer or seat', 'detail': e.diag.message_detail}, 409
+    if isinstance(e, psycopg.errors.UniqueViolation):
+        return {'error': 'Booking conflicts with an existing row', 'detail': e.diag.message_detail}, 409
+    if isinstance(e, psycopg.DataError):
+        return {'error': str(e)}, 400
+    return None
+
+# ============================================
+# SEAT HOLDS
+# ============================================
+# Checkout holds seats for HOLD_TTL seconds before the booking is paid. A hold
+# is a seat_hold row keyed like a ticket; placing one is a single upsert that
+# only takes over a row that is expired or already belongs to the same token,
+# so holds on different seats never contend. Expiry is enforced by comparing
+# expires_at with now() everywhere, and a background reaper deletes expired
+# rows in batches with SKIP LOCKED under an advisory lock, so only one worker
+# reaps at a time and nothing locks the table.
+HOLD_TTL = int(os.environ.get('HOLD_TTL', 300))
+HOLD_MAX_TTL = int(os.environ.get('HOLD_MAX_TTL', 900))
+HOLD_REAP_INTERVAL = float(os.environ.get('HOLD_REAP_INTERVAL', 30))
+HOLD_REAP_BATCH = int(os.environ.get('HOLD_REAP_BATCH', 5000))
+HOLD_REAPER_LOCK = 7248001
+HOLD_SQL = '''
+INSERT INTO seat_hold (showtime_id, hall_id, seat_number, seat_row, hold_token, expires_at)
+SELECT st.showtime_id, st.hall_id, r.seat_number, r.seat_row, %(hold_token)s, now() + make_interval(secs => %(ttl)s)
+FROM showtime st
+CROSS JOIN unnest(%(seat_numbers)s::int[], %(seat_rows)s::varchar[]) AS r(seat_number, seat_row)
+WHERE st.showtime_id = %(showtime_id)s AND NOT EXISTS (
+    SELECT 1 FROM ticket t
+    WHERE t.showtime_id = st.showtime_id AND t.hall_id = st.hall_id
+      AND t.seat_number = r.seat_number AND t.seat_row = r.seat_row)
+ORDER BY r.seat_row, r.seat_number
+ON CONFLICT (showtime_id, hall_id, seat_number, seat_row) DO UPDATE
+SET hold_token = EXCLUDED.hold_token, expires_at = EXCLUDED.expires_at
+WHERE seat_hold.hold_token = EXCLUDED.hold_token OR seat_hold.expires_at <= now()
+RETURNING *
+'''
+HOLD_LOOKUP_SQL = '''SELECT showtime_id, seat_row, seat_number, expires_at FROM seat_hold
+    WHERE hold_token = %s AND expires_at > now() ORDER BY seat_row, seat_number'''
+HOLD_RELEASE_SQL = 'DELETE FROM seat_hold WHERE hold_token = %s RETURNING *'
+REAP_SQL = '''DELETE FROM seat_hold WHERE ctid = ANY(ARRAY(
+    SELECT ctid FROM seat_hold WHERE expires_at <= now()
+    LIMIT %s FOR UPDATE SKIP LOCKED))'''
+_reaper_pid = None
+
+HOLD_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS seat_hold (
+        showtime_id INT NOT NULL REFERENCES showtime(showtime_id) ON DELETE CASCADE,
+        hall_id INT NOT NULL,
+        seat_number INT NOT NULL,
+        seat_row VARCHAR(5) NOT NULL,
+        hold_token UUID NOT NULL,
+        expires_at TIMESTAMPTZ NOT NULL,
+        PRIMARY KEY (showtime_id, hall_id, seat_number, seat_row),
+        FOREIGN KEY (hall_id, seat_number, seat_row) REFERENCES seat(hall_id, seat_number, seat_row) ON DELETE CASCADE
+    )''',
+    'CREATE INDEX IF NOT EXISTS seat_hold_token_idx ON seat_hold (hold_token)',
+    'CREATE INDEX IF NOT EXISTS seat_hold_expires_idx ON seat_hold (expires_at)',
+]
+
+def parse_hold_token(value):
+    if value in (None, ''):
+        return None
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        raise ValueError('hold_token must be a UUID')
+
+def parse_hold(data):
+    if not isinstance(data, dict):
+        raise ValueError('Request body must be a JSON object')
+    showtime_id = parse_value(data.get('showtime_id'), 'int')
+    hold_token = parse_hold_token(data.get('hold_token')) or uuid.uuid4()
+    ttl = parse_value(data.get('ttl', HOLD_TTL), 'int')
+    seats = data.get('seats')
+    if showtime_id is None or not isinstance(seats, list) or not seats:
+        raise ValueError('showtime_id and a non-empty seats list are required')
+    if len(seats) > BOOKING_MAX_SEATS:
+        raise ValueError(f'At most {BOOKING_MAX_SEATS} seats per hold')
+    seats = sorted({(parse_value(seat.get('seat_row'), 'varchar(5)'), parse_value(seat.get('seat_number'), 'int'))
+                    for seat in seats if isinstance(seat, dict)})
+    if len(seats) != len(data['seats']) or any(None in seat for seat in seats):
+        raise ValueError('Each seat needs a distinct seat_row and seat_number')
+    return {'showtime_id': showtime_id, 'hold_token': hold_token, 'ttl': max(1, min(ttl or HOLD_TTL, HOLD_MAX_TTL)),
+            'seat_rows': [seat[0] for seat in seats], 'seat_numbers': [seat[1] for seat in seats]}
+
+def hold_result(params, holds):
+    if len(holds) < len(params['seat_numbers']):
+        held = {(h['seat_row'], h['seat_number']) for h in holds}
+        return {'error': 'Some seats are not available',
+                'unavailable': [{'seat_row': row, 'seat_number': number}
+                                for row, number in zip(params['seat_rows'], params['seat_numbers'])
+                                if (row, number) not in held]}, 409
+    return {'success': True, 'hold_token': str(params['hold_token']), 'showtime_id': params['showtime_id'],
+            'expires_at': holds[0]['expires_at'].isoformat(),
+            'seats': [{'seat_row': h['seat_row'], 'seat_number': h['seat_number']} for h in holds]}, 201
+
+def hold_lookup_payload(hold_token, rows):
+    if not rows:
+        return {'error': 'Hold not found or expired'}, 404
+    return {'hold_token': str(hold_token), 'expires_at': min(row[3] for row in rows).isoformat(),
+            'seats': [{'showtime_id': row[0], 'seat_row': row[1], 'seat_number': row[2]} for row in rows]}, 200
+
+def reap_expired_holds():
+    yield Autocommit(True)
+    try:
+        if not (yield Query('SELECT pg_try_advisory_lock(%s)', [HOLD_REAPER_LOCK])).first()[0]:
+            return 0
+        reaped = 0
+        try:
+            while True:
+                deleted = (yield Query(REAP_SQL, [HOLD_REAP_BATCH])).rowcount
+                reaped += deleted
+                if deleted < HOLD_REAP_BATCH:
+                    return reaped
+        finally:
+            yield Query('SELECT pg_advisory_unlock(%s)', [HOLD_REAPER_LOCK])
+    finally:
+        yield Autocommit(False)
+
+def _reaper_loop():
+    while True:
+        clock.sleep(HOLD_REAP_INTERVAL)
+        try:
+            run_steps(reap_expired_holds())
+        except Exception as e:
+            print(f"Seat hold reaper failed: {e}")
+
+def start_hold_reaper():
+    global _reaper_pid
+    if BACKGROUND_THREADS and _reaper_pid != os.getpid():
+        with _pool_lock:
+            if _reaper_pid != os.getpid():
+                threading.Thread(target=_reaper_loop, name='seat-hold-reaper', daemon=True).start()
+                _reaper_pid = os.getpid()
+
+# ============================================
+# ANALYTICS
+# ============================================
+# Management reports read materialized views instead of scanning ticket,
+# payment and order_food. Each view has a unique index, so REFRESH ...
+# CONCURRENTLY never blocks readers. A write through the API marks the views
+# built from its table as dirty in that process; every ANALYTICS_REFRESH_INTERVAL
+# seconds a background thread refreshes the dirty ones, plus any view older
+# than ANALYTICS_MAX_AGE (writes made in other processes or outside the API),
+# under an advisory lock so one worker refreshes at a time. analytics_refresh
+# records when each view was last refreshed; responses report it. SUM over a
+# bigint count is numeric, so count measures are cast back to bigint and
+# serialize as integers.
+ANALYTICS_REFRESH_INTERVAL = float(os.environ.get('ANALYTICS_REFRESH_INTERVAL', 60))
+ANALYTICS_MAX_AGE = float(os.environ.get('ANALYTICS_MAX_AGE', 900))
+ANALYTICS_LOCK = 7248004
+ANALYTICS = {
+    'revenue': {
+        'view': 'analytics_revenue',
+        'sources': ['ticket', 'payment', 'booking', 'showtime', 'hall'],
+        'sql': '''WITH sold AS (
+                SELECT showtime_id, COUNT(*) AS tickets, SUM(ticket_price) AS ticket_revenue
+                FROM ticket GROUP BY showtime_id),
+            paid AS (
+                SELECT b.showtime_id, SUM(p.amount) AS paid_revenue
+                FROM payment p JOIN booking b ON b.booking_id = p.booking_id
+                WHERE p.status = 'Completed' GROUP BY b.showtime_id)
+            SELECT st.show_date AS day, h.cinema_id, st.movie_id, COUNT(*) AS showtimes,
+                COALESCE(SUM(sold.tickets), 0) AS tickets,
+                COALESCE(SUM(sold.ticket_revenue), 0) AS ticket_revenue,
+                COALESCE(SUM(paid.paid_revenue), 0) AS paid_revenue
+            FROM showtime st
+            JOIN hall h ON h.hall_id = st.hall_id
+            LEFT JOIN sold ON sold.showtime_id = st.showtime_id
+            LEFT JOIN paid ON paid.showtime_id = st.showtime_id
+            GROUP BY st.show_date, h.cinema_id, st.movie_id''',
+        'key': ['day', 'cinema_id', 'movie_id'],
+        'filters': {'cinema_id': 'int', 'movie_id': 'int'},
+        'groups': {
+            'day': (['v.day'], ''),
+            'movie': (['v.movie_id', 'm.title'], 'JOIN movie m ON m.movie_id = v.movie_id'),
+            'cinema': (['v.cinema_id', 'c.name'], 'JOIN cinema c ON c.cinema_id = v.cinema_id'),
+        },
+        'measures': '''SUM(v.showtimes)::bigint AS showtimes, SUM(v.tickets)::bigint AS tickets,
+            SUM(v.ticket_revenue) AS ticket_revenue, SUM(v.paid_revenue) AS paid_revenue''',
+        'rank': 'ticket_revenue',
+    },
+    'occupancy': {
+        'view': 'analytics_occupancy',
+        'sources': ['ticket', 'showtime', 'hall'],
+        'sql': '''SELECT st.showtime_id, st.show_date AS day, st.start_time, st.movie_id, st.hall_id, h.cinema_id,
+                h.capacity, COALESCE(sold.tickets, 0) AS sold
+            FROM showtime st
+            JOIN hall h ON h.hall_id = st.hall_id
+            LEFT JOIN (SELECT showtime_id, COUNT(*) AS tickets FROM ticket GROUP BY showtime_id) sold
+                ON sold.showtime_id = st.showtime_id''',
+        'key': ['showtime_id'],
+        'filters': {'cinema_id': 'int', 'movie_id': 'int', 'hall_id': 'int'},
+        'groups': {
+            'showtime': (['v.showtime_id', 'v.day', 'v.start_time', 'v.movie_id', 'v.hall_id', 'v.cinema_id'], ''),
+            'day': (['v.day'], ''),
+            'movie': (['v.movie_id', 'm.title'], 'JOIN movie m ON m.movie_id = v.movie_id'),
+            'cinema': (['v.cinema_id', 'c.name'], 'JOIN cinema c ON c.cinema_id = v.cinema_id'),
+            'hall': (['v.hall_id', 'h.hall_name'], 'JOIN hall h ON h.hall_id = v.hall_id'),
+        },
+        'measures': '''COUNT(*) AS showtimes, SUM(v.capacity)::bigint AS capacity, SUM(v.sold)::bigint AS sold,
+            ROUND(SUM(v.sold)::numeric / NULLIF(SUM(v.capacity), 0), 4) AS occupancy''',
+        'rank': 'occupancy',
+    },
+    'concessions': {
+        'view': 'analytics_concessions',
+        'sources': ['order_food', 'food_order', 'food'],
+        'sql': '''SELECT fo.order_date AS day, oi.food_id, COUNT(*) AS orders, SUM(oi.quantity) AS quantity,
+                SUM(oi.quantity * f.price) AS revenue
+            FROM order_food oi
+            JOIN food_order fo ON fo.order_id = oi.order_id
+            JOIN food f ON f.food_id = oi.food_id
+            GROUP BY fo.order_date, oi.food_id''',
+        'key': ['day', 'food_id'],
+        'filters': {'food_id': 'int'},
+        'groups': {
+            'food': (['v.food_id', 'f.food_name'], 'JOIN food f ON f.food_id = v.food_id'),
+            'day': (['v.day'], ''),
+        },
+        'measures': 'SUM(v.orders)::bigint AS orders, SUM(v.quantity)::bigint AS quantity, SUM(v.revenue) AS revenue',
+        'rank': 'revenue',
+    },
+    'payments': {
+        'view': 'analytics_payments',
+        'sources': ['payment'],
+        'sql': '''SELECT payment_date AS day, payment_method, status, COUNT(*) AS payments, SUM(amount) AS amount,
+                COUNT(booking_id) AS booking_payments, COUNT(order_id) AS order_payments
+            FROM payment GROUP BY payment_date, payment_method, status''',
+        'key': ['day', 'payment_method', 'status'],
+        'filters': {'payment_method': 'varchar(10)', 'status': 'varchar(15)'},
+        'groups': {
+            'day': (['v.day'], ''),
+            'method': (['v.payment_method'], ''),
+            'status': (['v.status'], ''),
+        },
+        'measures': '''SUM(v.payments)::bigint AS payments, SUM(v.amount) AS amount,
+            SUM(v.booking_payments)::bigint AS booking_payments, SUM(v.order_payments)::bigint AS order_payments''',
+        'rank': 'amount',
+    },
+}
+ANALYTICS_REFRESHED_SQL = 'SELECT view_name, refreshed_at, duration_ms FROM analytics_refresh'
+ANALYTICS_STALE_SQL = '''SELECT view_name FROM analytics_refresh
+    WHERE refreshed_at < now() - make_interval(secs => %s)'''
+ANALYTICS_RECORD_SQL = '''INSERT INTO analytics_refresh (view_name, refreshed_at, duration_ms) VALUES (%s, now(), %s)
+    ON CONFLICT (view_name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at, duration_ms = EXCLUDED.duration_ms'''
+_analytics_dirty = set()
+_analytics_pid = None
+
+ANALYTICS_SCHEMA = ['''CREATE TABLE IF NOT EXISTS analytics_refresh (
+    view_name TEXT PRIMARY KEY,
+    refreshed_at TIMESTAMPTZ NOT NULL,
+    duration_ms INT NOT NULL
+)'''] + [sql for spec in ANALYTICS.values() for sql in (
+    f"CREATE MATERIALIZED VIEW IF NOT EXISTS {spec['view']} AS {spec['sql']}",
+    f"CREATE UNIQUE INDEX IF NOT EXISTS {spec['view']}_key ON {spec['view']} ({', '.join(spec['key'])})",
+    f"INSERT INTO analytics_refresh VALUES ('{spec['view']}', now(), 0) ON CONFLICT DO NOTHING",
+)]
+
+def parse_analytics(report, args):
+    # Returns (sql, params, limit) for a report: rows of the view filtered by
+    # day range and the report's filters, grouped by ?group=.
+    spec = ANALYTICS[report]
+    group = args.get('group') or next(iter(spec['groups']))
+    if group not in spec['groups']:
+        raise ValueError(f'group must be one of {", ".join(spec["groups"])}')
+    try:
+        limit = max(1, min(int(args.get('limit', PAGE_SIZE)), MAX_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    conditions = []
+    params = []
+    for name, op in (('from', '>='), ('to', '<=')):
+        if args.get(name):
+            conditions.append((f'v.day {op} %s', name))
+            params.append(parse_value(args[name], 'date'))
+    for col, typ in spec['filters'].items():
+        if args.get(col):
+            conditions.append((f'v.{col} = %s', col))
+            params.append(parse_value(args[col], typ))
+    columns, join = spec['groups'][group]
+
+    def build():
+        where = ' AND '.join([condition for condition, _ in conditions]) or 'true'
+        order = 'v.day' if group == 'day' else f'{spec["rank"]} DESC NULLS LAST'
+        return f'''SELECT {', '.join(columns)}, {spec['measures']}
+            FROM {spec['view']} v {join} WHERE {where}
+            GROUP BY {', '.join(columns)} ORDER BY {order} LIMIT %s'''
+    key = ('analytics', report, group, tuple([name for _, name in conditions]))
+    return compiled(key, build), params + [limit], limit
+
+def analytics_payload(report, columns, rows, refreshed, shape=None):
+    payload = rows_payload(columns, rows, shape)
+    view = ANALYTICS[report]['view']
+    payload.update(report=report, refreshed_at=refreshed.get(view, {}).get('refreshed_at'))
+    return payload
+
+def analytics_status(rows):
+    return {view: {'refreshed_at': refreshed_at.isoformat(), 'duration_ms': duration_ms}
+            for view, refreshed_at, duration_ms in rows}
+
+def analytics_views(names=None):
+    if names is None:
+        return [spec['view'] for spec in ANALYTICS.values()]
+    unknown = [name for name in names if name not in ANALYTICS]
+    if unknown:
+        raise ValueError(f'Unknown reports: {", ".join(unknown)}')
+    return [ANALYTICS[name]['view'] for name in names]
+
+def due_analytics_views(stale):
+    views = [view for view in analytics_views() if view in _analytics_dirty or view in stale]
+    _analytics_dirty.difference_update(views)
+    return views
+
+@on_write
+def mark_analytics_dirty(table, before, after):
+    for spec in ANALYTICS.values():
+        if table in spec['sources']:
+            _analytics_dirty.add(spec['view'])
+    if _analytics_dirty:
+        start_analytics_refresher()
+
+def refresh_analytics(views):
+    # Runs in autocommit. Returns {view: ms} for the refreshed views, or None
+    # when another process holds the refresh lock.
+    if not (yield Query('SELECT pg_try_advisory_lock(%s)', [ANALYTICS_LOCK])).first()[0]:
+        return None
+    try:
+        durations = {}
+        for view in views:
+            began = clock.perf_counter()
+            yield Query(f'REFRESH MATERIALIZED VIEW CONCURRENTLY {view}')
+            durations[view] = round((clock.perf_counter() - began) * 1000)
+            yield Query(ANALYTICS_RECORD_SQL, [view, durations[view]])
+        return durations
+    finally:
+        yield Query('SELECT pg_advisory_unlock(%s)', [ANALYTICS_LOCK])
+
+def refresh_due_analytics():
+    yield Autocommit(True)
+    try:
+        stale = {row[0] for row in (yield Query(ANALYTICS_STALE_SQL, [ANALYTICS_MAX_AGE])).rows}
+        views = due_analytics_views(stale)
+        if views and (yield from refresh_analytics(views)) is None:
+            _analytics_dirty.update(views)
+    finally:
+        yield Autocommit(False)
+
+def _analytics_loop():
+    while True:
+        clock.sleep(ANALYTICS_REFRESH_INTERVAL)
+        try:
+            run_steps(refresh_due_analytics())
+        except Exception as e:
+            print(f"Analytics refresh failed: {e}")
+
+def start_analytics_refresher():
+    global _analytics_pid
+    if BACKGROUND_THREADS and _analytics_pid != os.getpid():
+        with _pool_lock:
+            if _analytics_pid != os.getpid():
+                threading.Thread(target=_analytics_loop, name='analytics-refresher', daemon=True).start()
+                _analytics_pid = os.getpid()
+
+# ============================================
+# LIVE COUNTERS
+# ============================================
+# Dashboard counters (tickets sold and revenue per showtime and per cinema per
+# booking day) are kept in rollup tables by statement-level triggers on
+# ticket, so every write path (CRUD, bookings, batch, import) updates them at
+# the cost of one upsert per showtime and cinema-day touched by a statement.
+# Each counter is split over LIVE_SLOTS rows picked by backend pid and summed
+# on read, so concurrent bookings for one showtime do not queue on a single
+# row. Moving a booking to another day or a hall to another cinema is not
+# followed; check_live_counters() finds such drift and can rebuild the rollups
+# from ticket.
+LIVE_SLOTS = 8
+LIVE_ROLLUP_SQL = '''
+WITH delta AS (
+    SELECT showtime_id, hall_id, booking_id, SUM(n) AS tickets, SUM(n * ticket_price) AS revenue
+    FROM (%s) AS r GROUP BY showtime_id, hall_id, booking_id),
+per_showtime AS (
+    INSERT INTO live_showtime AS l (showtime_id, slot, tickets_sold, revenue)
+    SELECT showtime_id, $1, SUM(tickets), SUM(revenue) FROM delta GROUP BY showtime_id ORDER BY showtime_id
+    ON CONFLICT (showtime_id, slot) DO UPDATE
+    SET tickets_sold = l.tickets_sold + EXCLUDED.tickets_sold, revenue = l.revenue + EXCLUDED.revenue)
+INSERT INTO live_cinema_day AS l (cinema_id, day, slot, tickets_sold, revenue)
+SELECT h.cinema_id, b.booking_date, $1, SUM(d.tickets), SUM(d.revenue)
+FROM delta d JOIN hall h ON h.hall_id = d.hall_id JOIN booking b ON b.booking_id = d.booking_id
+GROUP BY h.cinema_id, b.booking_date ORDER BY h.cinema_id, b.booking_date
+ON CONFLICT (cinema_id, day, slot) DO UPDATE
+SET tickets_sold = l.tickets_sold + EXCLUDED.tickets_sold, revenue = l.revenue + EXCLUDED.revenue
+'''
+LIVE_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS live_showtime (
+        showtime_id INT NOT NULL,
+        slot SMALLINT NOT NULL,
+        tickets_sold INT NOT NULL,
+        revenue DECIMAL(12,2) NOT NULL,
+        PRIMARY KEY (showtime_id, slot)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS live_cinema_day (
+        cinema_id INT NOT NULL,
+        day DATE NOT NULL,
+        slot SMALLINT NOT NULL,
+        tickets_sold INT NOT NULL,
+        revenue DECIMAL(14,2) NOT NULL,
+        PRIMARY KEY (cinema_id, day, slot)
+    )''',
+    f'''CREATE OR REPLACE FUNCTION live_ticket_rollup() RETURNS trigger LANGUAGE plpgsql AS $fn$
+    DECLARE
+        source text;
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            source := 'SELECT showtime_id, hall_id, booking_id, 1 AS n, ticket_price FROM new_rows';
+        ELSIF TG_OP = 'DELETE' THEN
+            source := 'SELECT showtime_id, hall_id, booking_id, -1 AS n, ticket_price FROM old_rows';
+        ELSE
+            source := 'SELECT showtime_id, hall_id, booking_id, 1 AS n, ticket_price FROM new_rows
+                UNION ALL SELECT showtime_id, hall_id, booking_id, -1, ticket_price FROM old_rows';
+        END IF;
+        EXECUTE format($sql${LIVE_ROLLUP_SQL}$sql$, source) USING pg_backend_pid() % {LIVE_SLOTS};
+        RETURN NULL;
+    END
+    $fn$''',
+    'DROP TRIGGER IF EXISTS ticket_live_insert ON ticket',
+    '''CREATE TRIGGER ticket_live_insert AFTER INSERT ON ticket REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION live_ticket_rollup()''',
+    'DROP TRIGGER IF EXISTS ticket_live_update ON ticket',
+    '''CREATE TRIGGER ticket_live_update AFTER UPDATE ON ticket REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION live_ticket_rollup()''',
+    'DROP TRIGGER IF EXISTS ticket_live_delete ON ticket',
+    '''CREATE TRIGGER ticket_live_delete AFTER DELETE ON ticket REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION live_ticket_rollup()''',
+]
+# Rebuilding holds a SHARE lock on ticket, so ticket writes wait until the
+# rollups match the table again; reads are not blocked.
+LIVE_REBUILD = [
+    'LOCK TABLE ticket IN SHARE MODE',
+    'DELETE FROM live_showtime',
+    '''INSERT INTO live_showtime (showtime_id, slot, tickets_sold, revenue)
+        SELECT showtime_id, 0, COUNT(*), SUM(ticket_price) FROM ticket GROUP BY showtime_id''',
+    'DELETE FROM live_cinema_day',
+    '''INSERT INTO live_cinema_day (cinema_id, day, slot, tickets_sold, revenue)
+        SELECT h.cinema_id, b.booking_date, 0, COUNT(*), SUM(t.ticket_price)
+        FROM ticket t JOIN hall h ON h.hall_id = t.hall_id JOIN booking b ON b.booking_id = t.booking_id
+        GROUP BY h.cinema_id, b.booking_date''',
+]
+LIVE_CHECK_SQL = '''
+WITH expected_showtime AS (
+    SELECT showtime_id, COUNT(*) AS tickets_sold, SUM(ticket_price) AS revenue FROM ticket GROUP BY showtime_id),
+actual_showtime AS (
+    SELECT showtime_id, SUM(tickets_sold) AS tickets_sold, SUM(revenue) AS revenue
+    FROM live_showtime GROUP BY showtime_id),
+expected_day AS (
+    SELECT h.cinema_id, b.booking_date AS day, COUNT(*) AS tickets_sold, SUM(t.ticket_price) AS revenue
+    FROM ticket t JOIN hall h ON h.hall_id = t.hall_id JOIN booking b ON b.booking_id = t.booking_id
+    GROUP BY h.cinema_id, b.booking_date),
+actual_day AS (
+    SELECT cinema_id, day, SUM(tickets_sold) AS tickets_sold, SUM(revenue) AS revenue
+    FROM live_cinema_day GROUP BY cinema_id, day),
+drift AS (
+    SELECT 'showtime' AS rollup, showtime_id::text AS key,
+        COALESCE(e.tickets_sold, 0) AS expected_tickets, COALESCE(a.tickets_sold, 0) AS actual_tickets,
+        COALESCE(e.revenue, 0) AS expected_revenue, COALESCE(a.revenue, 0) AS actual_revenue
+    FROM expected_showtime e FULL JOIN actual_showtime a USING (showtime_id)
+    UNION ALL
+    SELECT 'cinema_day', cinema_id || '/' || day, COALESCE(e.tickets_sold, 0), COALESCE(a.tickets_sold, 0),
+        COALESCE(e.revenue, 0), COALESCE(a.revenue, 0)
+    FROM expected_day e FULL JOIN actual_day a USING (cinema_id, day))
+SELECT * FROM drift WHERE expected_tickets <> actual_tickets OR expected_revenue <> actual_revenue
+ORDER BY rollup, key
+'''
+LIVE_CINEMAS_SQL = '''SELECT COALESCE(%(day)s::date, CURRENT_DATE) AS day, c.cinema_id, c.name,
+    COALESCE(SUM(l.tickets_sold), 0) AS tickets_sold, COALESCE(SUM(l.revenue), 0) AS revenue
+FROM cinema c
+LEFT JOIN live_cinema_day l ON l.cinema_id = c.cinema_id AND l.day = COALESCE(%(day)s::date, CURRENT_DATE)
+GROUP BY c.cinema_id ORDER BY c.cinema_id'''
+LIVE_SHOWTIMES_SQL = '''SELECT st.showtime_id, st.movie_id, m.title, st.hall_id, h.cinema_id, st.show_date,
+    st.start_time, st.end_time, h.capacity, COALESCE(SUM(l.tickets_sold), 0) AS tickets_sold,
+    h.capacity - COALESCE(SUM(l.tickets_sold), 0) AS seats_remaining
+FROM showtime st
+JOIN hall h ON h.hall_id = st.hall_id
+JOIN movie m ON m.movie_id = st.movie_id
+LEFT JOIN live_showtime l ON l.showtime_id = st.showtime_id
+WHERE st.show_date = COALESCE(%(day)s::date, CURRENT_DATE)
+  AND (%(cinema_id)s::int IS NULL OR h.cinema_id = %(cinema_id)s::int)
+GROUP BY st.showtime_id, m.movie_id, h.hall_id ORDER BY st.start_time, st.showtime_id'''
+LIVE_CHECK_SAMPLE = 100
+
+def parse_live_args(args):
+    return {'day': parse_value(args.get('day'), 'date'), 'cinema_id': parse_value(args.get('cinema_id'), 'int')}
+
+def live_payload(rows):
+    cinemas = [{'cinema_id': row[1], 'name': row[2], 'tickets_sold': row[3], 'revenue': row[4]} for row in rows]
+    return {'day': rows[0][0] if rows else None, 'tickets_sold': sum(c['tickets_sold'] for c in cinemas),
+            'revenue': sum(c['revenue'] for c in cinemas), 'cinemas': cinemas}
+
+def live_check_payload(columns, rows, repaired):
+    return {'consistent': not rows, 'mismatches': len(rows), 'repaired': repaired,
+            'sample': [dict(zip(columns, row)) for row in rows[:LIVE_CHECK_SAMPLE]]}
+
+def check_live_counters(repair=False):
+    result = yield Query(LIVE_CHECK_SQL)
+    if result.rows and repair:
+        for sql in LIVE_REBUILD:
+            yield Query(sql)
+    yield Commit()
+    return live_check_payload(result.columns, result.rows, bool(result.rows and repair))
+
+# ============================================
+# BATCH
+# ============================================
+# POST /api/batch runs an ordered list of record operations on one pooled
+# connection. In atomic mode they share one transaction and the first failing
+# operation (an error, or an update or delete whose key matched no row) rolls
+# back all of them; a get that finds nothing just reports its 404. In
+# best_effort mode each operation commits on its own and every one reports its
+# own status. Reads inside an atomic batch see the batch's earlier writes.
+BATCH_MAX_OPERATIONS = int(os.environ.get('BATCH_MAX_OPERATIONS', 100))
+BATCH_OPS = ('list', 'get', 'create', 'update', 'delete')
+
+def parse_batch_op(index, op):
+    if not isinstance(op, dict):
+        raise ValueError(f'operations[{index}]: must be an object')
+    kind, table = op.get('op'), op.get('table')
+    if kind not in BATCH_OPS:
+        raise ValueError(f'operations[{index}]: op must be one of {", ".join(BATCH_OPS)}')
+    if table not in TABLES:
+        raise ValueError(f'operations[{index}]: unknown table {table!r}')
+    parsed = {'op': kind, 'table': table}
+    if kind in ('get', 'update', 'delete'):
+        key = op.get('key')
+        pk_vals = split_pk(table, key) if isinstance(key, str) else [str(v) for v in key] if isinstance(key, list) else None
+        if pk_vals is None or len(pk_vals) != len(TABLES[table]['pk']):
+            raise ValueError(f'operations[{index}]: invalid primary key')
+        parsed['pk'] = pk_vals
+    if kind in ('create', 'update'):
+        if not isinstance(op.get('data'), dict):
+            raise ValueError(f'operations[{index}]: data must be an object')
+        parsed['data'] = op['data']
+        if kind == 'update' and not update_columns(table, op['data']):
+            raise ValueError(f'operations[{index}]: no columns to update')
+    if kind == 'list':
+        args = op.get('args') or {}
+        if not isinstance(args, dict):
+            raise ValueError(f'operations[{index}]: args must be an object')
+        try:
+            parsed['page'] = parse_page_args(table, args)
+        except ValueError as e:
+            raise ValueError(f'operations[{index}]: {e}')
+    return parsed
+
+def parse_batch(data):
+    if not isinstance(data, dict):
+        raise ValueError('Body must be an object')
+    mode = data.get('mode', 'atomic')
+    if mode not in ('atomic', 'best_effort'):
+        raise ValueError('mode must be atomic or best_effort')
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        raise ValueError('operations must be a non-empty list')
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        raise ValueError(f'At most {BATCH_MAX_OPERATIONS} operations per batch')
+    return mode, [parse_batch_op(index, op) for index, op in enumerate(operations)]
+
+def batch_statement(op):
+    table = op['table']
+    if op['op'] == 'list':
+        return page_sql(table, op['page'])
+    if op['op'] == 'get':
+        return select_sql(table), op['pk']
+    if op['op'] == 'create':
+        return insert_sql(table, op['data'])
+    if op['op'] == 'update':
+        return update_sql(table, op['data'], op['pk'])
+    return delete_sql(table), op['pk']
+
+def batch_reads(op):
+    return op['op'] in ('list', 'get')
+
+# Turns one operation's rows into (result, writes), the result being the
+# status and body the single-record route would have answered with.
+def batch_result(op, columns, rows):
+    table = op['table']
+    if op['op'] == 'list':
+        rows, next_cursor = page_rows(op['page'], columns, rows)
+        body = rows_payload(columns, rows, op['page']['shape'])
+        body.update(next=next_cursor, limit=op['page']['limit'])
+        return {'status': 200, 'body': body}, []
+    if not rows:
+        return {'status': 404, 'body': {'error': 'Record not found'}}, []
+    if op['op'] == 'get':
+        return {'status': 200, 'body': dict(zip(columns, rows[0]))}, []
+    if op['op'] == 'create':
+        write = (table, None, dict(zip(columns, rows[0])))
+        message = 'Record created successfully'
+    elif op['op'] == 'update':
+        before, after = split_update_row(table, rows[0])
+        write = (table, before, after)
+        message = 'Record updated successfully'
+    else:
+        write = (table, dict(zip(columns, rows[0])), None)
+        message = 'Record deleted successfully'
+    return {'status': 200, 'body': {'success': True, 'message': message}}, [write]
+
+# Errors a single operation can cause; anything else (pool, connection) fails
+# the whole request.
+def batch_error(e):
+    if isinstance(e, psycopg.IntegrityError):
+        return {'status': 409, 'body': {'error': str(e)}}
+    if isinstance(e, (psycopg.DataError, psycopg.ProgrammingError)):
+        return {'status': 400, 'body': {'error': str(e)}}
+    return None
+
+def emit_writes(writes):
+    while writes:
+        emit_write(*writes.pop(0))
+
+def batch_payload(mode, results, failed=None):
+    payload = {'success': failed is None and all(r['status'] < 400 for r in results), 'mode': mode, 'results': results}
+    if failed is not None:
+        payload.update(failed=failed, error=f'Operation {failed} failed, nothing was applied')
+        return payload, results[failed]['status']
+    return payload, 200
+
+# ============================================
+# INSTRUMENTATION
+# ============================================
+# Every request is traced: time spent waiting for a pooled connection
+# ('connect'), in statements ('db'), loading rows ('fetch') and encoding JSON
+# ('serialize'); the rest is 'app'. The breakdown goes out in a Server-Timing
+# header and into the latency histograms that /metrics renders in Prometheus
+# text format, labelled by route and table. Statements are also totalled per
+# normalized query text. All of it is per worker process.
+#
+# With PROFILE_SLOW_MS set, a sampler thread records the Python stack of each
+# thread serving a request every PROFILE_INTERVAL seconds; requests slower
+# than the threshold are handed, with their folded stacks, to the hooks
+# registered with on_slow_request() and kept for /api/profiles.
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '1') == '1'
+METRICS_BUCKETS = [float(b) for b in os.environ.get(
+    'METRICS_BUCKETS', '0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10').split(',')]
+SQL_STATS_MAX = int(os.environ.get('SQL_STATS_MAX', 500))
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 0))
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', 0.005))
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 20))
+TRACE_PHASES = ('connect', 'db', 'fetch', 'serialize', 'app')
+
+_sql_stats = {}
+_sql_lock = threading.Lock()
+_request_metrics = {}
+_metrics_lock = threading.Lock()
+_active_traces = {}
+_slow_request_hooks = []
+_slow_requests = collections.deque(maxlen=PROFILE_KEEP)
+_profiler_pid = None
+
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\$\d+|%s|\b\d+(?:\.\d+)?\b")
+SQL_LISTS = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+
+@functools.lru_cache(maxsize=4096)
+def normalize_sql(query):
+    # Literals and placeholders become ?, so statements that differ only in
+    # their values share one entry.
+    text = ' '.join(SQL_LITERALS.sub('?', query).split())
+    return SQL_LISTS.sub('(...)', text)
+
+def route_labels(rule, view_args):
+    # Only known table names become label values, so unknown paths cannot
+    # grow the metrics without bound.
+    table = (view_args or {}).get('table')
+    return rule or 'unmatched', table if table in TABLES else ''
+
+def begin_trace(profile=True):
+    trace = RequestTrace()
+    _trace.set(trace)
+    if profile and PROFILE_SLOW_MS:
+        start_profiler()
+        _active_traces[threading.get_ident()] = trace
+    return trace
+
+def finish_trace(method, rule, view_args, status):
+    # Returns the response headers that report the trace, or {} when the
+    # request was not traced.
+    trace = _trace.get()
+    if trace is None:
+        return {}
+    _trace.set(None)
+    if _active_traces.get(threading.get_ident()) is trace:
+        del _active_traces[threading.get_ident()]
+    total = clock.perf_counter() - trace.started
+    phases = dict(trace.phases)
+    phases['app'] = max(0.0, total - sum(phases.values()))
+    route, table = route_labels(rule, view_args)
+    observe_request(method, route, table, status, total, phases, len(trace.statements))
+    if PROFILE_SLOW_MS and total * 1000 >= PROFILE_SLOW_MS:
+        report_slow_request(method, route, table, status, total, phases, trace)
+    headers = {'X-DB-Round-Trips': str(len(trace.statements))}
+    if SERVER_TIMING:
+        parts = [f'{name};dur={phases[name] * 1000:.2f}' for name in TRACE_PHASES if name in phases]
+        parts.append(f'total;dur={total * 1000:.2f}')
+        headers['Server-Timing'] = ', '.join(parts)
+    return headers
+
+def observe_request(method, route, table, status, total, phases, round_trips):
+    key = (method, route, table, str(status))
+    with _metrics_lock:
+        metric = _request_metrics.get(key)
+        if metric is None:
+            metric = _request_metrics[key] = {'buckets': [0] * len(METRICS_BUCKETS), 'count': 0, 'sum': 0.0,
+                                              'round_trips': 0, 'phases': collections.defaultdict(float)}
+        for i, bound in enumerate(METRICS_BUCKETS):
+            if total <= bound:
+                metric['buckets'][i] += 1
+        metric['count'] += 1
+        metric['sum'] += total
+        metric['round_trips'] += round_trips
+        for name, seconds in phases.items():
+            metric['phases'][name] += seconds
+
+def metric_labels(**labels):
+    escaped = [(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in labels.items()]
+    return '{' + ','.join([f'{k}="{v}"' for k, v in escaped]) + '}'
+
+def render_metrics(pool_stats=None):
+    lines = ['# HELP cineplexx_request_duration_seconds Request latency by route and table.',
+             '# TYPE cineplexx_request_duration_seconds histogram']
+    with _metrics_lock:
+        metrics = [(key, dict(m, buckets=list(m['buckets']), phases=dict(m['phases'])))
+                   for key, m in _request_metrics.items()]
+    with _sql_lock:
+        statements = [(text, list(stats)) for text, stats in _sql_stats.items()]
+    for (method, route, table, status), m in metrics:
+        labels = dict(method=method, route=route, table=table, status=status)
+        for bound, count in zip(METRICS_BUCKETS, m['buckets']):
+            lines.append(f'cineplexx_request_duration_seconds_bucket{metric_labels(**labels, le=f"{bound:g}")} {count}')
+        lines.append(f'cineplexx_request_duration_seconds_bucket{metric_labels(**labels, le="+Inf")} {m["count"]}')
+        lines.append(f'cineplexx_request_duration_seconds_sum{metric_labels(**labels)} {m["sum"]:.6f}')
+        lines.append(f'cineplexx_request_duration_seconds_count{metric_labels(**labels)} {m["count"]}')
+    lines += ['# HELP cineplexx_request_phase_seconds_total Request time by phase.',
+              '# TYPE cineplexx_request_phase_seconds_total counter']
+    for (method, route, table, status), m in metrics:
+        for name in TRACE_PHASES:
+            if name in m['phases']:
+                labels = metric_labels(method=method, route=route, table=table, status=status, phase=name)
+                lines.append(f'cineplexx_request_phase_seconds_total{labels} {m["phases"][name]:.6f}')
+    lines += ['# HELP cineplexx_request_db_round_trips_total Statements sent while serving requests.',
+              '# TYPE cineplexx_request_db_round_trips_total counter']
+    for (method, route, table, status), m in metrics:
+        labels = metric_labels(method=method, route=route, table=table, status=status)
+        lines.append(f'cineplexx_request_db_round_trips_total{labels} {m["round_trips"]}')
+    lines += ['# HELP cineplexx_sql_calls_total Executions per normalized statement.',
+              '# TYPE cineplexx_sql_calls_total counter']
+    lines += [f'cineplexx_sql_calls_total{metric_labels(statement=text)} {calls}' for text, (calls, _, _) in statements]
+    lines += ['# HELP cineplexx_sql_seconds_total Execution time per normalized statement.',
+              '# TYPE cineplexx_sql_seconds_total counter']
+    lines += [f'cineplexx_sql_seconds_total{metric_labels(statement=text)} {seconds:.6f}'
+              for text, (_, seconds, _) in statements]
+    lines += ['# HELP cineplexx_sql_max_seconds Slowest execution per normalized statement.',
+              '# TYPE cineplexx_sql_max_seconds gauge']
+    lines += [f'cineplexx_sql_max_seconds{metric_labels(statement=text)} {slowest:.6f}'
+              for text, (_, _, slowest) in statements]
+    if pool_stats:
+        lines += ['# HELP cineplexx_pool Connection pool statistics.', '# TYPE cineplexx_pool gauge']
+        lines += [f'cineplexx_pool{metric_labels(stat=name)} {value}' for name, value in sorted(pool_stats.items())
+                  if isinstance(value, (int, float))]
+    return '\n'.join(lines) + '\n'
+
+def on_slow_request(func):
+    _slow_request_hooks.append(func)
+    return func
+
+def report_slow_request(method, route, table, status, total, phases, trace):
+    slowest = collections.defaultdict(float)
+    for text, seconds in trace.statements:
+        slowest[text] += seconds
+    report = {
+        'method': method, 'route': route, 'table': table, 'status': status, 'pid': os.getpid(),
+        'ms': round(total * 1000, 2), 'phases_ms': {k: round(v * 1000, 2) for k, v in phases.items()},
+        'statements': [{'sql': text, 'ms': round(seconds * 1000, 2)}
+                       for text, seconds in sorted(slowest.items(), key=lambda item: -item[1])[:10]],
+        'samples': sum(trace.samples.values()),
+        'stacks': [{'stack': stack, 'samples': count} for stack, count in trace.samples.most_common(50)],
+    }
+    _slow_requests.append(report)
+    for hook in _slow_request_hooks:
+        try:
+            hook(report)
+        except Exception as e:
+            print(f"Slow request hook {hook.__name__} failed: {e}")
+
+@on_slow_request
+def log_slow_request(report):
+    top = report['stacks'][0]['stack'].rsplit(';', 1)[-1] if report['stacks'] else '-'
+    print(f"Slow request {report['method']} {report['route']} {report['table']} {report['ms']}ms "
+          f"phases={report['phases_ms']} statements={len(report['statements'])} hottest={top}")
+
+def folded_stack(frame):
+    # Root-first and ';'-separated, the format flame graph tools read.
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+def _sample_loop():
+    while True:
+        clock.sleep(PROFILE_INTERVAL)
+        if not _active_traces:
+            continue
+        frames = sys._current_frames()
+        for ident, trace in list(_active_traces.items()):
+            frame = frames.get(ident)
+            if frame is not None:
+                trace.samples[folded_stack(frame)] += 1
+
+def start_profiler():
+    global _profiler_pid
+    if _profiler_pid != os.getpid():
+        with _pool_lock:
+            if _profiler_pid != os.getpid():
+                _active_traces.clear()
+                threading.Thread(target=_sample_loop, name='request-profiler', daemon=True).start()
+                _profiler_pid = os.getpid()
+
+# ============================================
+# ROUTE HANDLERS
+# ============================================
+# One body per API route, run by the Flask routes below through respond() and
+# by asgi_app's routes through its async respond(). Handlers take what the
+# route read from the request (args, headers, the decoded JSON body) and
+# return what a view returns: a payload, (payload, status) or (payload,
+# status, headers).
+def handle_statement_stats():
+    result = yield Query(STATEMENT_STATS_SQL)
+    return statement_stats(result.rows)
+
+def handle_index_report():
+    results = []
+    for sql, params in ((FOREIGN_KEYS_SQL, None), (BTREE_INDEXES_SQL, None),
+                        (UNUSED_INDEXES_SQL, None), (SEQ_SCANNED_SQL, [INDEX_REPORT_MIN_ROWS])):
+        results.append((yield Query(sql, params)).rows)
+    return index_report(*results)
+
+def handle_list_records(table, args, headers):
+    if table not in TABLES:
+        return {'error': 'Table not found'}, 404
+    try:
+        page = parse_page_args(table, args)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    key = reference_key(table, 'page', args)
+    entry = cache_get(key) if key else None
+    if entry:
+        return cached_response(entry, headers)
+    result = yield Query(*page_sql(table, page), json=True, prepared=True)
+    rows, next_cursor = page_rows(page, result.columns, result.rows)
+    payload = rows_payload(result.columns, rows, page['shape'])
+    payload.update(next=next_cursor, limit=page['limit'])
+    if key:
+        return cached_response(cache_put(key, app.json.dumps(payload)), headers)
+    return payload
+
+def handle_create_record(table, data):
+    if table not in TABLES:
+        return {'error': 'Table not found'}, 404
+    result = yield Query(*insert_sql(table, data), prepared=True)
+    yield Commit()
+    emit_write(table, after=result.records()[0])
+    return {'success': True, 'message': 'Record created successfully'}
+
+def handle_get_record(table, pk_values, headers):
+    if table not in TABLES:
+        return {'error': 'Table not found'}, 404
+    pk_vals = split_pk(table, pk_values)
+    if pk_vals is None:
+        return {'error': 'Invalid primary key'}, 400
+    key = reference_key(table, 'record', pk_vals)
+    entry = cache_get(key) if key else None
+    if entry:
+        return cached_response(entry, headers)
+    result = yield Query(select_sql(table), pk_vals, json=True, prepared=True)
+    payload, status = (result.records()[0], 200) if result.rows else ({'error': 'Record not found'}, 404)
+    if key:
+        return cached_response(cache_put(key, app.json.dumps(payload), status), headers)
+    return payload, status
+
+def handle_lookup_records(table, data):
+    if table not in TABLES:
+        return {'error': 'Table not found'}, 404
+    try:
+        arrays, shape = parse_multi_get(table, data)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    result = yield Query(multi_get_sql(table), arrays, json=True, prepared=True)
+    return multi_get_payload(len(arrays[0]), result.columns, result.rows, shape)
+
+def handle_update_record(table, pk_values, data):
+    if table not in TABLES:
+        return {'error': 'Table not found'}, 404
+    pk_vals = split_pk(table, pk_values)
+    if pk_vals is None:
+        return {'error': 'Invalid primary key'}, 400
+    if not isinstance(data, dict) or not update_columns(table, data):
+        return {'error': 'No columns to update'}, 400
+    result = yield Query(*update_sql(table, data, pk_vals), prepared=True)
+    yield Commit()
+    if result.rows:
+        before, after = split_update_row(table, result.rows[0])
+        emit_write(table, before=before, after=after)
+    return {'success': True, 'message': 'Record updated successfully'}
+
+def handle_delete_record(table, pk_values):
+    if table not in TABLES:
+        return {'error': 'Table not found'}, 404
+    pk_vals = split_pk(table, pk_values)
+    if pk_vals is None:
+        return {'error': 'Invalid primary key'}, 400
+    result = yield Query(delete_sql(table), pk_vals, prepared=True)
+    yield Commit()
+    if result.rows:
+        emit_write(table, before=result.records()[0])
+    return {'success': True, 'message': 'Record deleted successfully'}
+
+def handle_batch(data):
+    try:
+        mode, operations = parse_batch(data)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    results = []
+    writes = []
+    for index, op in enumerate(operations):
+        sql, params = batch_statement(op)
+        try:
+            result = yield Query(sql, params, json=batch_reads(op), prepared=True, transaction=mode != 'atomic')
+        except psycopg.Error as e:
+            error = batch_error(e)
+            if error is None:
+                raise
+            results.append(error)
+            if mode == 'atomic':
+                yield Rollback()
+                return batch_payload(mode, results, failed=index)
+            continue
+        result, op_writes = batch_result(op, result.columns, result.rows)
+        results.append(result)
+        if mode == 'atomic' and result['status'] >= 400 and not batch_reads(op):
+            yield Rollback()
+            return batch_payload(mode, results, failed=index)
+        writes += op_writes
+        if mode != 'atomic':
+            emit_writes(writes)
+    yield Commit()
+    emit_writes(writes)
+    return batch_payload(mode, results)
+
+def export_headers(table, fmt):
+    return {'Content-Disposition': f'attachment; filename={table}.{fmt}', 'X-Accel-Buffering': 'no'}
+
+# read_records(body, fmt) yields the body's (line_no, record) pairs; each app
+# reads its own request body.
+def handle_import(table, args, body, read_records):
+    if table not in TABLES:
+        return {'error': 'Table not found'}, 404
+    try:
+        fmt, mode, on_error = parse_import_args(args)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    setup, copy_sql, merge_sql = import_statements(table, mode)
+    summary = {'table': table, 'mode': mode, 'received': 0, 'loaded': 0, 'rejected': 0, 'errors': []}
+    try:
+        for sql in setup:
+            yield Query(sql)
+        yield Copy(copy_sql, read_records(body, fmt),
+                   lambda line_no, record: import_row(table, mode, summary, line_no, record))
+        if summary['rejected'] and on_error == 'abort':
+            yield Rollback()
+            summary['error'] = f'{summary["rejected"]} invalid record(s), nothing imported'
+            return summary, 400
+        if merge_sql:
+            summary['loaded'] = (yield Query(merge_sql)).rowcount
+        else:
+            summary['loaded'] = summary['received'] - summary['rejected']
+        yield Commit()
+    except psycopg.IntegrityError as e:
+        summary['error'] = str(e)
+        summary['loaded'] = 0
+        return summary, 409
+    except (ValueError, psycopg.DataError) as e:
+        summary['error'] = str(e)
+        summary['loaded'] = 0
+        return summary, 400
+    emit_write(table)
+    summary['success'] = True
+    return summary
+
+def handle_seat_map(showtime_id, args):
+    seats = yield from showtime_seats(showtime_id)
+    if seats is None:
+        return {'error': 'Showtime not found'}, 404
+    return seat_map_payload(showtime_id, seats, args.get('available') == '1')
+
+def handle_best_seats(showtime_id, args):
+    try:
+        count = parse_block_count(args)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    seats = yield from showtime_seats(showtime_id)
+    if seats is None:
+        return {'error': 'Showtime not found'}, 404
+    if count > len(seats.layout.seats):
+        return {'error': f'The hall has only {len(seats.layout.seats)} seats'}, 400
+    return best_block_payload(showtime_id, seats, count, args.get('seat_type') or None)
+
+def handle_booking(data):
+    try:
+        params = parse_booking(data)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    for attempt in range(BOOKING_ID_RETRIES + 1):
+        try:
+            result = yield Query(BOOKING_SQL, params, prepared=True)
+            payload, status, writes = booking_result(params, result.first())
+            if status != 201:
+                yield Rollback()
+                return payload, status
+            yield Commit()
+            break
+        except psycopg.Error as e:
+            if (isinstance(e, psycopg.errors.UniqueViolation)
+                    and e.diag.constraint_name in BOOKING_KEYS and attempt < BOOKING_ID_RETRIES):
+                yield Rollback()
+                for sql in BOOKING_SEQUENCE_SYNC:
+                    yield Query(sql)
+                yield Commit()
+                continue
+            error = booking_error(e)
+            if error is None:
+                raise
+            return error
+    for table, before, after in writes:
+        emit_write(table, before=before, after=after)
+    return payload, status
+
+def handle_create_hold(data):
+    try:
+        params = parse_hold(data)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    start_hold_reaper()
+    try:
+        holds = (yield Query(HOLD_SQL, params, prepared=True)).records()
+        payload, status = hold_result(params, holds)
+        if status != 201:
+            yield Rollback()
+            return payload, status
+        yield Commit()
+    except psycopg.errors.ForeignKeyViolation as e:
+        return {'error': 'Unknown seat', 'detail': e.diag.message_detail}, 409
+    for hold in holds:
+        emit_write('seat_hold', after=hold)
+    return payload, status
+
+def handle_get_hold(hold_token):
+    try:
+        hold_token = parse_hold_token(hold_token)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    result = yield Query(HOLD_LOOKUP_SQL, [hold_token])
+    return hold_lookup_payload(hold_token, result.rows)
+
+def handle_release_hold(hold_token):
+    try:
+        hold_token = parse_hold_token(hold_token)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    released = (yield Query(HOLD_RELEASE_SQL, [hold_token])).records()
+    yield Commit()
+    for hold in released:
+        emit_write('seat_hold', before=hold)
+    return {'success': True, 'message': f'Released {len(released)} seat(s)'}
+
+def handle_analytics_status():
+    start_analytics_refresher()
+    result = yield Query(ANALYTICS_REFRESHED_SQL)
+    return {'reports': list(ANALYTICS), 'views': analytics_status(result.rows)}
+
+def handle_analytics(report, args):
+    if report not in ANALYTICS:
+        return {'error': 'Report not found'}, 404
+    try:
+        sql, params, limit = parse_analytics(report, args)
+        shape = parse_shape(args)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    start_analytics_refresher()
+    result = yield Query(sql, params, json=True, prepared=True)
+    refreshed = analytics_status((yield Query(ANALYTICS_REFRESHED_SQL)).rows)
+    payload = analytics_payload(report, result.columns, result.rows, refreshed, shape)
+    payload.update(limit=limit)
+    return payload
+
+def handle_refresh_analytics(args):
+    try:
+        views = analytics_views(args.get('reports').split(',') if args.get('reports') else None)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    yield Autocommit(True)
+    try:
+        durations = yield from refresh_analytics(views)
+    finally:
+        yield Autocommit(False)
+    if durations is None:
+        return {'error': 'A refresh is already running, please retry'}, 409
+    _analytics_dirty.difference_update(views)
+    return {'success': True, 'refreshed_ms': durations}
+
+def handle_live_counters(args):
+    try:
+        params = parse_live_args(args)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    result = yield Query(LIVE_CINEMAS_SQL, params)
+    return live_payload(result.rows)
+
+def handle_live_showtimes(args):
+    try:
+        params = parse_live_args(args)
+        shape = parse_shape(args)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    result = yield Query(LIVE_SHOWTIMES_SQL, params, json=True, prepared=True)
+    return rows_payload(result.columns, result.rows, shape)
+
+def handle_search(table, args, headers):
+    if table not in TABLES:
+        return {'error': 'Table not found'}, 404
+    query = args.get('q', '').strip()
+    if not query or not search_columns(table):
+        return (yield from handle_list_records(table, args, headers))
+    try:
+        limit = parse_search_limit(args)
+        shape = parse_shape(args)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    result = yield Query(*search_sql(table, query, limit), json=True)
+    return search_rows(limit, result.columns, result.rows, shape)
+
+# ============================================
+# API ROUTES
+# ============================================
+
+@app.before_request
+def start_trace():
+    begin_trace()
+
+@app.after_request
+def report_trace(response):
+    rule = request.url_rule.rule if request.url_rule else None
+    response.headers.update(finish_trace(request.method, rule, request.view_args, response.status_code))
+    return response
+
+@app.after_request
+def revalidate_response(response):
+    if (not response.is_streamed and conditional_etag(request, response)
+            and not_modified(request, response, response.get_data())):
+        response.status_code = 304
+        response.set_data(b'')
+    return response
+
+@app.route('/')
+def index():
+    return render_template_string(HTML_TEMPLATE)
+
+@app.route('/api/tables')
+def get_tables():
+    return jsonify(TABLES)
+
+@app.route('/api/pool')
+def get_pool_stats():
+    pool = get_pool()
+    stats = pool.get_stats()
+    in_use = stats.get('pool_size', 0) - stats.get('pool_available', 0)
+    stats['pid'] = os.getpid()
+    stats['in_use'] = in_use
+    stats['saturation'] = round(in_use / pool.max_size, 3)
+    return jsonify(stats)
+
+@app.route('/metrics')
+def get_metrics():
+    pool_stats = get_pool().get_stats() if _pool is not None and _pool_pid == os.getpid() else None
+    return Response(render_metrics(pool_stats), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/profiles')
+def get_profiles():
+    return jsonify({'threshold_ms': PROFILE_SLOW_MS, 'requests': list(_slow_requests)})
+
+@app.route('/api/statements')
+def get_statement_stats():
+    return respond(handle_statement_stats())
+
+@app.route('/api/indexes')
+def get_index_report():
+    return respond(handle_index_report())
+
+@app.route('/api/<table>', methods=['GET'])
+def get_all_records(table):
+    return respond(handle_list_records(table, request.args, request.headers))
+
+@app.route('/api/<table>', methods=['POST'])
+def create_record(table):
+    return respond(handle_create_record(table, request.json))
+
+@app.route('/api/<table>/<path:pk_values>', methods=['GET'])
+def get_record(table, pk_values):
+    return respond(handle_get_record(table, pk_values, request.headers))
+
+@app.route('/api/lookup/<table>', methods=['POST'])
+def lookup_records(table):
+    return respond(handle_lookup_records(table, request.json))
+
+@app.route('/api/<table>/<path:pk_values>', methods=['PUT'])
+def update_record(table, pk_values):
+    return respond(handle_update_record(table, pk_values, request.json))
+
+@app.route('/api/<table>/<path:pk_values>', methods=['DELETE'])
+def delete_record(table, pk_values):
+    return respond(handle_delete_record(table, pk_values))
+
+@app.route('/api/batch', methods=['POST'])
+def run_batch():
+    return respond(handle_batch(request.json))
+
+@app.route('/api/export/<table>')
+def export_table(table):
+    if table not in TABLES:
+        return jsonify({'error': 'Table not found'}), 404
+    try:
+        fmt, columns, sql = export_sql(table, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    generate = export_csv if fmt == 'csv' else export_ndjson
+    return Response(stream_with_context(generate(sql, columns)), mimetype=EXPORT_MIMETYPES[fmt],
+                    headers=export_headers(table, fmt))
+
+# Both exporters hold one pooled connection for the life of the response and
+# never materialise more than EXPORT_FETCH_ROWS rows or one chunk of output.
+def export_ndjson(sql, columns):
+    with get_connection() as conn:
+        cursor = json_cursor(conn, name='export')
+        cursor.itersize = EXPORT_FETCH_ROWS
+        cursor.execute(sql)
+        buffer = []
+        size = 0
+        for row in cursor:
+            line = app.json.dumps(dict(zip(columns, row))) + '\n'
+            buffer.append(line)
+            size += len(line)
+            if size >= EXPORT_CHUNK_BYTES:
+                yield ''.join(buffer)
+                buffer = []
+                size = 0
+        if buffer:
+            yield ''.join(buffer)
+        cursor.close()
+
+def export_csv(sql, columns):
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        buffer = bytearray()
+        with cursor.copy(f'COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)') as copy:
+            for data in copy:
+                buffer += data
+                if len(buffer) >= EXPORT_CHUNK_BYTES:
+                    yield bytes(buffer)
+                    buffer.clear()
+        if buffer:
+            yield bytes(buffer)
+
+# Iterate the body line by line: gunicorn and werkzeug streams both support
+# that, while neither is a full io object TextIOWrapper accepts.
+@app.route('/api/import/<table>', methods=['POST'])
+def import_table(table):
+    return respond(handle_import(table, request.args, codecs.iterdecode(request.stream, 'utf-8'), read_import_records))
+
+def read_import_records(stream, fmt):
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            if None in record:
+                raise ValueError(f'Line {reader.line_num}: more values than header columns')
+            yield reader.line_num, record
+        return
+    for line_no, line in enumerate(stream, 1):
+        if line.strip():
+            yield line_no, parse_json_line(line_no, line)
+
+@app.route('/api/seats/<int:showtime_id>')
+def get_seat_availability(showtime_id):
+    return respond(handle_seat_map(showtime_id, request.args))
+
+@app.route('/api/seats/<int:showtime_id>/best')
+def get_best_seats(showtime_id):
+    return respond(handle_best_seats(showtime_id, request.args))
+
+@app.route('/api/bookings', methods=['POST'])
+def create_booking():
+    return respond(handle_booking(request.json))
+
+@app.route('/api/holds', methods=['POST'])
+def create_hold():
+    return respond(handle_create_hold(request.json))
+
+@app.route('/api/holds/<hold_token>', methods=['GET'])
+def get_hold(hold_token):
+    return respond(handle_get_hold(hold_token))
+
+@app.route('/api/holds/<hold_token>', methods=['DELETE'])
+def release_hold(hold_token):
+    return respond(handle_release_hold(hold_token))
+
+@app.route('/api/stats')
+def get_stats():
+    try:
+        stats = load_stats(exact=True) if request.args.get('exact') == '1' else get_cached_stats()
+    except Exception as e:
+        return db_error(e)
+    return stats_response(*stats)
+
+@app.route('/api/analytics')
+def get_analytics_status():
+    return respond(handle_analytics_status())
+
+@app.route('/api/analytics/<report>')
+def get_analytics(report):
+    return respond(handle_analytics(report, request.args))
+
+@app.route('/api/analytics/refresh', methods=['POST'])
+def refresh_analytics_now():
+    return respond(handle_refresh_analytics(request.args))
+
+@app.route('/api/live')
+def get_live_counters():
+    return respond(handle_live_counters(request.args))
+
+@app.route('/api/live/showtimes')
+def get_live_showtimes():
+    return respond(handle_live_showtimes(request.args))
+
+@app.route('/api/live/check', methods=['POST'])
+def check_live():
+    return respond(check_live_counters(request.args.get('repair') == '1'))
+
+@app.route('/api/events')
+def stream_events():
+    # A subscriber would hold a sync worker for as long as it stays
+    # connected, so only asgi_app streams; dashboards poll instead.
+    return jsonify({'error': 'Event stream is served by asgi_app only'}), 501
+
+@app.route('/api/search/<table>')
+def search_table(table):
+    return respond(handle_search(table, request.args, request.headers))
+
+# ============================================
+# SCHEMA MIGRATIONS
+# ============================================
+# The schema is the numbered MIGRATIONS list, and schema_version records the
+# ones applied. Startup reads the version with one query and is done when it
+# is current, so workers starting against an up-to-date database run no DDL.
+# Otherwise one process applies what is pending under an advisory lock, and
+# the others wait on that lock and then find nothing left to do. A migration's
+# plain statements run in one transaction with a short lock_timeout, retried
+# with backoff, so DDL gives way to box-office traffic instead of queueing
+# every query behind its lock; its Online statements then run outside a
+# transaction (see SCHEMA CHANGES). The first migrations use IF NOT EXISTS
+# throughout, so databases created before schema_version adopt it in place.
+MIGRATION_LOCK = 7248003
+MIGRATION_LOCK_TIMEOUT = os.environ.get('MIGRATION_LOCK_TIMEOUT', '2s')
+MIGRATION_RETRIES = int(os.environ.get('MIGRATION_RETRIES', 5))
+SCHEMA_VERSION_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS schema_version (
+    version INT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+)'''
+
+BASE_TABLES = [
+    '''CREATE TABLE IF NOT EXISTS cinema (
+        cinema_id INT PRIMARY KEY,
+        location VARCHAR(50) NOT NULL,
+        name VARCHAR(50) NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS department (
+        department_id INT PRIMARY KEY,
+        department_name VARCHAR(50) NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS customer (
+        customer_id INT PRIMARY KEY,
+        full_name VARCHAR(100) NOT NULL,
+        phone_number VARCHAR(20) UNIQUE,
+        email VARCHAR(100) UNIQUE NOT NULL,
+        date_of_birth DATE NOT NULL,
+        gender VARCHAR(10) NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS genre (
+        genre_id INT PRIMARY KEY,
+        genre_name VARCHAR(30) NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS hall (
+        hall_id INT PRIMARY KEY,
+        hall_name VARCHAR(50) NOT NULL,
+        capacity INT NOT NULL CHECK (capacity > 0),
+        cinema_id INT NOT NULL REFERENCES cinema(cinema_id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS food (
+        food_id INT PRIMARY KEY,
+        food_name VARCHAR(50) NOT NULL,
+        price DECIMAL(6,2) NOT NULL CHECK (price > 0)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS movie (
+        movie_id INT PRIMARY KEY,
+        title VARCHAR(100) NOT NULL,
+        duration INT NOT NULL CHECK (duration > 0),
+        release_date DATE NOT NULL,
+        language VARCHAR(30) NOT NULL,
+        age_rating INT NOT NULL CHECK (age_rating >= 0),
+        adult_price DECIMAL(8,2) NOT NULL,
+        kids_price DECIMAL(8,2) NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS employee (
+        employee_id INT PRIMARY KEY,
+        full_name VARCHAR(100) NOT NULL,
+        role VARCHAR(30) NOT NULL,
+        phone_number VARCHAR(20) UNIQUE NOT NULL,
+        email VARCHAR(100) UNIQUE NOT NULL,
+        date_of_birth DATE NOT NULL,
+        department_id INT NOT NULL REFERENCES department(department_id),
+        cinema_id INT NOT NULL REFERENCES cinema(cinema_id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS seat (
+        hall_id INT NOT NULL,
+        seat_number INT NOT NULL,
+        seat_row VARCHAR(5) NOT NULL,
+        seat_type VARCHAR(10) NOT NULL CHECK (seat_type IN ('Regular', 'VIP')),
+        PRIMARY KEY (hall_id, seat_number, seat_row),
+        FOREIGN KEY (hall_id) REFERENCES hall(hall_id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS movie_genre (
+        movie_id INT NOT NULL,
+        genre_id INT NOT NULL,
+        PRIMARY KEY (movie_id, genre_id),
+        FOREIGN KEY (movie_id) REFERENCES movie(movie_id),
+        FOREIGN KEY (genre_id) REFERENCES genre(genre_id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS showtime (
+        showtime_id INT PRIMARY KEY,
+        movie_id INT NOT NULL REFERENCES movie(movie_id),
+        hall_id INT NOT NULL REFERENCES hall(hall_id),
+        show_date DATE NOT NULL,
+        start_time TIME NOT NULL,
+        end_time TIME NOT NULL,
+        CHECK (end_time > start_time)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS booking (
+        booking_id INT PRIMARY KEY,
+        customer_id INT NOT NULL REFERENCES customer(customer_id),
+        showtime_id INT NOT NULL REFERENCES showtime(showtime_id),
+        booking_date DATE NOT NULL,
+        adult_seat INT NOT NULL CHECK (adult_seat >= 0),
+        child_seat INT NOT NULL CHECK (child_seat >= 0)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS ticket (
+        ticket_id INT PRIMARY KEY,
+        booking_id INT NOT NULL REFERENCES booking(booking_id),
+        showtime_id INT NOT NULL REFERENCES showtime(showtime_id),
+        hall_id INT NOT NULL,
+        seat_number INT NOT NULL,
+        seat_row VARCHAR(5) NOT NULL,
+        ticket_price DECIMAL(8,2) NOT NULL CHECK (ticket_price > 0),
+        FOREIGN KEY (hall_id, seat_number, seat_row) REFERENCES seat(hall_id, seat_number, seat_row)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS manager (
+        employee_id INT PRIMARY KEY REFERENCES employee(employee_id),
+        management_level INT NOT NULL,
+        contract_type VARCHAR(30) NOT NULL,
+        hire_date DATE NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS cashier (
+        employee_id INT PRIMARY KEY REFERENCES employee(employee_id),
+        shift_type VARCHAR(20) NOT NULL,
+        hire_date DATE NOT NULL,
+        employment_status VARCHAR(10)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS cleaner (
+        employee_id INT PRIMARY KEY REFERENCES employee(employee_id),
+        shift_type VARCHAR(20) NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS showtime_supervisor (
+        employee_id INT PRIMARY KEY REFERENCES employee(employee_id),
+        shift_type VARCHAR(20) NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS food_order (
+        order_id INT PRIMARY KEY,
+        customer_id INT NOT NULL REFERENCES customer(customer_id),
+        order_date DATE NOT NULL,
+        order_time TIME NOT NULL,
+        order_amount DECIMAL(8,2) CHECK (order_amount > 0)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS order_food (
+        order_id INT NOT NULL REFERENCES food_order(order_id),
+        food_id INT NOT NULL REFERENCES food(food_id),
+        quantity INT NOT NULL CHECK (quantity > 0),
+        PRIMARY KEY (order_id, food_id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS payment (
+        payment_id INT PRIMARY KEY,
+        booking_id INT REFERENCES booking(booking_id),
+        order_id INT REFERENCES food_order(order_id),
+        payment_date DATE NOT NULL,
+        payment_time TIME NOT NULL,
+        amount DECIMAL(8,2) NOT NULL CHECK (amount > 0),
+        status VARCHAR(15) NOT NULL CHECK (status IN ('Completed', 'Failed')),
+        payment_method VARCHAR(10) NOT NULL CHECK (payment_method IN ('Cash', 'Card'))
+    )''',
+    '''CREATE TABLE IF NOT EXISTS cash_payment (
+        payment_id INT PRIMARY KEY REFERENCES payment(payment_id),
+        change_amount DECIMAL(6,2) NOT NULL CHECK (change_amount >= 0)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS card_payment (
+        payment_id INT PRIMARY KEY REFERENCES payment(payment_id),
+        card_number VARCHAR(20) NOT NULL,
+        card_type VARCHAR(20) NOT NULL,
+        expiry_date DATE NOT NULL,
+        cardholder_name VARCHAR(100) NOT NULL
+    )''',
+]
+
+SAMPLE_DATA = [
+    # Cinema
+    '''INSERT INTO cinema (cinema_id, location, name) VALUES
+        (1, 'Tirana', 'Cineplexx TEG'),
+        (2, 'Tirana', 'Cineplexx City Park'),
+        (3, 'Durres', 'Cineplexx Durres')''',
+    # Department
+    '''INSERT INTO department (department_id, department_name) VALUES
+        (1, 'Management'), (2, 'Box Office'), (3, 'Concessions'),
+        (4, 'Projection'), (5, 'Maintenance'), (6, 'Security')''',
+    # Customer
+    '''INSERT INTO customer (customer_id, full_name, phone_number, email, date_of_birth, gender) VALUES
+        (1, 'Arben Hoxha', '+355691234567', 'arben.hoxha@email.com', '1990-05-15', 'Male'),
+        (2, 'Maria Koci', '+355692345678', 'maria.koci@email.com', '1985-08-22', 'Female'),
+        (3, 'Dritan Leka', '+355693456789', 'dritan.leka@email.com', '1992-03-10', 'Male'),
+        (4, 'Elena Brahimi', '+355694567890', 'elena.brahimi@email.com', '1988-12-01', 'Female'),
+        (5, 'Besnik Shehu', '+355695678901', 'besnik.shehu@email.com', '1995-07-25', 'Male')''',
+    # Genre
+    '''INSERT INTO genre (genre_id, genre_name) VALUES
+        (1, 'Action'), (2, 'Comedy'), (3, 'Drama'), (4, 'Horror'), (5, 'Science Fiction'),
+        (6, 'Romance'), (7, 'Thriller'), (8, 'Animation'), (9, 'Adventure'), (10, 'Fantasy')''',
+    # Hall
+    '''INSERT INTO hall (hall_id, hall_name, capacity, cinema_id) VALUES
+        (1, 'Hall A - IMAX', 200, 1),
+        (2, 'Hall B - Premium', 150, 1),
+        (3, 'Hall C - Standard', 120, 1),
+        (4, 'Hall D - Standard', 120, 2),
+        (5, 'Hall E - VIP', 50, 2)''',
+    # Food
+    '''INSERT INTO food (food_id, food_name, price) VALUES
+        (1, 'Small Popcorn', 350.00), (2, 'Medium Popcorn', 500.00), (3, 'Large Popcorn', 650.00),
+        (4, 'Small Soda', 200.00), (5, 'Medium Soda', 300.00), (6, 'Large Soda', 400.00),
+        (7, 'Hot Dog', 450.00), (8, 'Nachos', 550.00)''',
+    # Movie
+    '''INSERT INTO movie (movie_id, title, duration, release_date, language, age_rating, adult_price, kids_price) VALUES
+        (1, 'The Dark Knight Returns', 152, '2025-06-15', 'English', 13, 800.00, 500.00),
+        (2, 'Love in Paris', 118, '2025-07-20', 'English', 12, 700.00, 450.00),
+        (3, 'Alien Invasion 3', 135, '2025-08-10', 'English', 16, 850.00, 550.00),
+        (4, 'Comedy Night', 95, '2025-09-01', 'English', 7, 600.00, 400.00),
+        (5, 'Frozen Dreams', 105, '2025-10-01', 'English', 0, 650.00, 450.00)''',
+    # Employee
+    '''INSERT INTO employee (employee_id, full_name, role, phone_number, email, date_of_birth, department_id, cinema_id) VALUES
+        (1, 'Robert Pasha', 'General Manager', '+355681111111', 'robert.p@cineplexx.al', '1975-03-15', 1, 1),
+        (2, 'Sara Kelmendi', 'Operations Manager', '+355682222222', 'sara.k@cineplexx.al', '1980-07-22', 1, 1),
+        (3, 'Tom Berisha', 'Floor Manager', '+355683333333', 'tom.b@cineplexx.al', '1985-11-10', 1, 2),
+        (4, 'Alba Hoti', 'Senior Cashier', '+355684444444', 'alba.h@cineplexx.al', '1992-05-18', 2, 1),
+        (5, 'Bujar Duka', 'Cashier', '+355685555555', 'bujar.d@cineplexx.al', '1995-08-25', 2, 1)''',
+    # Seat
+    '''INSERT INTO seat (hall_id, seat_number, seat_row, seat_type) VALUES
+        (1, 1, 'A', 'Regular'), (1, 2, 'A', 'Regular'), (1, 3, 'A', 'Regular'), (1, 4, 'A', 'Regular'), (1, 5, 'A', 'Regular'),
+        (1, 1, 'B', 'Regular'), (1, 2, 'B', 'Regular'), (1, 3, 'B', 'Regular'), (1, 4, 'B', 'Regular'), (1, 5, 'B', 'Regular'),
+        (1, 1, 'C', 'VIP'), (1, 2, 'C', 'VIP'), (1, 3, 'C', 'VIP'), (1, 4, 'C', 'VIP'), (1, 5, 'C', 'VIP'),
+        (2, 1, 'A', 'VIP'), (2, 2, 'A', 'VIP'), (2, 3, 'A', 'VIP'), (2, 4, 'A', 'VIP'), (2, 5, 'A', 'VIP')''',
+    # Movie Genre
+    '''INSERT INTO movie_genre (movie_id, genre_id) VALUES
+        (1, 1), (1, 7), (2, 6), (2, 2), (3, 5), (3, 1), (4, 2), (5, 8), (5, 10)''',
+    # Showtime
+    '''INSERT INTO showtime (showtime_id, movie_id, hall_id, show_date, start_time, end_time) VALUES
+        (1, 1, 1, '2026-03-01', '10:00:00', '12:32:00'),
+        (2, 1, 1, '2026-03-01', '14:00:00', '16:32:00'),
+        (3, 2, 2, '2026-03-01', '11:00:00', '12:58:00'),
+        (4, 3, 1, '2026-03-02', '18:00:00', '20:15:00')''',
+    # Manager
+    '''INSERT INTO manager (employee_id, management_level, contract_type, hire_date) VALUES
+        (1, 1, 'Full-time', '2015-01-10'),
+        (2, 2, 'Full-time', '2017-03-15'),
+        (3, 3, 'Full-time', '2019-06-20')''',
+    # Cashier
+    '''INSERT INTO cashier (employee_id, shift_type, hire_date, employment_status) VALUES
+        (4, 'Morning', '2020-02-01', 'Active'),
+        (5, 'Afternoon', '2021-05-15', 'Active')''',
+    # Booking
+    '''INSERT INTO booking (booking_id, customer_id, showtime_id, booking_date, adult_seat, child_seat) VALUES
+        (1, 1, 1, '2026-02-28', 2, 0),
+        (2, 2, 3, '2026-02-28', 2, 1)''',
+    # Ticket
+    '''INSERT INTO ticket (ticket_id, booking_id, showtime_id, hall_id, seat_number, seat_row, ticket_price) VALUES
+        (1, 1, 1, 1, 1, 'A', 800.00),
+        (2, 1, 1, 1, 2, 'A', 800.00),
+        (3, 2, 3, 2, 1, 'A', 700.00),
+        (4, 2, 3, 2, 2, 'A', 700.00),
+        (5, 2, 3, 2, 3, 'A', 450.00)''',
+    # Food Order
+    '''INSERT INTO food_order (order_id, customer_id, order_date, order_time, order_amount) VALUES
+        (1, 1, '2026-03-01', '09:45:00', 1200.00),
+        (2, 2, '2026-03-01', '10:30:00', 950.00)''',
+    # Order Food
+    '''INSERT INTO order_food (order_id, food_id, quantity) VALUES
+        (1, 3, 1), (1, 6, 2), (2, 2, 1), (2, 5, 1)''',
+    # Payment
+    '''INSERT INTO payment (payment_id, booking_id, order_id, payment_date, payment_time, amount, status, payment_method) VALUES
+        (1, 1, 1, '2026-03-01', '09:50:00', 2800.00, 'Completed', 'Card'),
+        (2, 2, 2, '2026-03-01', '10:35:00', 2800.00, 'Completed', 'Cash')''',
+    # Card Payment
+    '''INSERT INTO card_payment (payment_id, card_number, card_type, expiry_date, cardholder_name) VALUES
+        (1, '4532XXXXXXXX1234', 'Visa', '2028-05-01', 'Arben Hoxha')''',
+    # Cash Payment
+    '''INSERT INTO cash_payment (payment_id, change_amount) VALUES (2, 200.00)''',
+]
+
+def sample_data_steps(conn):
+    if conn.execute('SELECT 1 FROM cinema LIMIT 1').fetchone():
+        return []
+    print("Loading sample data...")
+    return SAMPLE_DATA
+
+MIGRATIONS = [
+    (1, 'base tables', BASE_TABLES),
+    (2, 'booking sequences and one ticket per seat', BOOKING_SCHEMA),
+    (3, 'seat holds', HOLD_SCHEMA),
+    (4, 'search indexes', [search_index_steps]),
+    (5, 'sample data', [sample_data_steps]),
+    (6, 'foreign key and access pattern indexes', [index_steps]),
+    (7, 'bookings have seats', [checked_constraint('booking', 'booking_has_seats', 'CHECK (adult_seat + child_seat > 0)')]),
+    (8, 'analytics views', ANALYTICS_SCHEMA),
+    (9, 'live counters', LIVE_SCHEMA + LIVE_REBUILD),
+    (10, 'sync booking sequences', BOOKING_SEQUENCE_SYNC),
+]
+
+def schema_version(conn):
+    try:
+        return conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+    except psycopg.errors.UndefinedTable:
+        return 0
+
+def resolve_steps(conn, steps):
+    resolved = []
+    for step in steps:
+        resolved += resolve_steps(conn, step(conn)) if callable(step) else [step]
+    return resolved
+
+def apply_migration(conn, version, name, steps):
+    steps = resolve_steps(conn, steps)
+    for attempt in range(MIGRATION_RETRIES):
+        try:
+            with conn.transaction():
+                conn.execute(f"SET LOCAL lock_timeout = '{MIGRATION_LOCK_TIMEOUT}'")
+                for sql in steps:
+                    if not isinstance(sql, Online):
+                        conn.execute(sql)
+            break
+        except psycopg.errors.LockNotAvailable:
+            if attempt == MIGRATION_RETRIES - 1:
+                raise
+            clock.sleep(0.5 * 2 ** attempt)
+    for sql in steps:
+        if isinstance(sql, Online):
+            conn.execute(sql)
+    conn.execute('INSERT INTO schema_version (version, name) VALUES (%s, %s) ON CONFLICT DO NOTHING', [version, name])
+
+def migrate():
+    applied = []
+    with get_connection() as conn:
+        conn.autocommit = True
+        try:
+            if schema_version(conn) < MIGRATIONS[-1][0]:
+                conn.execute('SELECT pg_advisory_lock(%s)', [MIGRATION_LOCK])
+                try:
+                    conn.execute(SCHEMA_VERSION_TABLE_SQL)
+                    current = schema_version(conn)
+                    for version, name, steps in MIGRATIONS:
+                        if version > current:
+                            apply_migration(conn, version, name, steps)
+                            applied.append(f'{version} {name}')
+                finally:
+                    conn.execute('SELECT pg_advisory_unlock(%s)', [MIGRATION_LOCK])
+        finally:
+            conn.autocommit = False
+    return applied
+
+def init_db():
+    try:
+        for migration in migrate():
+            print(f"Applied migration {migration}")
         print("Database initialized successfully!")
     except Exception as e:
         print(f"Database initialization error: {e}")
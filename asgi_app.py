@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+CineplexxDB - async (ASGI) serving mode
+Same routes as app.py on psycopg's AsyncConnectionPool: uvicorn asgi_app:app
+"""
+from quart import Quart, Response, render_template_string, request, jsonify
+import psycopg
+from psycopg_pool import AsyncConnectionPool
+import asyncio
+import codecs
+import contextlib
+import csv
+import os
+import time as clock
+import weakref
+
+import app as core
+from app import TABLES
+
+app = Quart(__name__)
+app.json = core.FastJSONProvider(app)
+# The seat-hold reaper and analytics refresher run as tasks on the event loop
+# (see open_pool), not as app.py's threads.
+core.BACKGROUND_THREADS = False
+# Flask has no body size or time limit, and exports and imports stream for as
+# long as the table takes, so lift Quart's 60 s response and body timeouts too.
+app.config['MAX_CONTENT_LENGTH'] = None
+app.config['RESPONSE_TIMEOUT'] = None
+app.config['BODY_TIMEOUT'] = None
+
+# ============================================
+# DATABASE CONFIGURATION (PostgreSQL)
+# ============================================
+# One AsyncConnectionPool per worker process, opened when the server starts
+# serving. Sizing reuses the DB_* settings of app.py: a single event loop
+# keeps many requests in flight on the same few connections, so the pool size
+# bounds database concurrency, not the number of requests being served.
+_pool = None
+_last_used = weakref.WeakKeyDictionary()
+
+async def _check_connection(conn):
+    if clock.monotonic() - _last_used.get(conn, 0) > core.DB_POOL_CHECK_IDLE:
+        await AsyncConnectionPool.check_connection(conn)
+
+async def _touch_connection(conn):
+    _last_used[conn] = clock.monotonic()
+
+class TracingCursor(psycopg.AsyncCursor):
+    async def execute(self, query, *args, **kwargs):
+        began = clock.perf_counter()
+        try:
+            return await super().execute(query, *args, **kwargs)
+        finally:
+            core.record_statement(query, clock.perf_counter() - began)
+
+    async def executemany(self, query, *args, **kwargs):
+        began = clock.perf_counter()
+        try:
+            return await super().executemany(query, *args, **kwargs)
+        finally:
+            core.record_statement(query, clock.perf_counter() - began)
+
+    @contextlib.asynccontextmanager
+    async def copy(self, statement, *args, **kwargs):
+        began = clock.perf_counter()
+        try:
+            async with super().copy(statement, *args, **kwargs) as copy:
+                yield copy
+        finally:
+            core.record_statement(statement, clock.perf_counter() - began)
+
+    async def fetchone(self):
+        with core.phase('fetch'):
+            return await super().fetchone()
+
+    async def fetchmany(self, *args, **kwargs):
+        with core.phase('fetch'):
+            return await super().fetchmany(*args, **kwargs)
+
+    async def fetchall(self):
+        with core.phase('fetch'):
+            return await super().fetchall()
+
+async def _configure_connection(conn):
+    conn.prepared_max = core.DB_PREPARED_MAX
+    conn.cursor_factory = TracingCursor
+    await _touch_connection(conn)
+
+def get_pool():
+    if _pool is None:
+        raise RuntimeError('Database pool is not open')
+    return _pool
+
+@contextlib.asynccontextmanager
+async def get_connection():
+    began = clock.perf_counter()
+    async with get_pool().connection() as conn:
+        core.add_phase('connect', clock.perf_counter() - began)
+        yield conn
+
+@app.before_serving
+async def open_pool():
+    global _pool
+    _pool = AsyncConnectionPool(
+        core.DATABASE_URL,
+        min_size=core.DB_POOL_MIN_SIZE,
+        max_size=core.DB_POOL_MAX_SIZE,
+        timeout=core.DB_POOL_TIMEOUT,
+        max_lifetime=core.DB_POOL_MAX_LIFETIME,
+        max_idle=core.DB_POOL_MAX_IDLE,
+        configure=_configure_connection,
+        check=_check_connection,
+        reset=_touch_connection,
+        name=f'cineplexx-async-{os.getpid()}',
+        open=False,
+    )
+    await _pool.open()
+    app.add_background_task(reaper_loop)
+    app.add_background_task(analytics_loop)
+
+@app.after_serving
+async def close_pool():
+    await _pool.close()
+
+async def respond(handler):
+    try:
+        return await core.run_steps_async(handler, get_connection)
+    except Exception as e:
+        return core.db_error(e)
+
+async def reaper_loop():
+    while True:
+        await asyncio.sleep(core.HOLD_REAP_INTERVAL)
+        try:
+            await core.run_steps_async(core.reap_expired_holds(), get_connection)
+        except Exception as e:
+            print(f"Seat hold reaper failed: {e}")
+
+async def analytics_loop():
+    while True:
+        await asyncio.sleep(core.ANALYTICS_REFRESH_INTERVAL)
+        try:
+            await core.run_steps_async(core.refresh_due_analytics(), get_connection)
+        except Exception as e:
+            print(f"Analytics refresh failed: {e}")
+
+# ============================================
+# API ROUTES
+# ============================================
+# Route bodies are app.py's handlers; these routes only read the request and
+# await the handler's database steps.
+
+# Requests share the event loop thread, so the sampling profiler, which
+# attributes thread stacks to requests, is not used here; slow requests still
+# reach the on_slow_request hooks with their timing breakdown.
+@app.before_request
+async def start_trace():
+    core.begin_trace(profile=False)
+
+@app.after_request
+async def report_trace(response):
+    rule = request.url_rule.rule if request.url_rule else None
+    response.headers.update(core.finish_trace(request.method, rule, request.view_args, response.status_code))
+    return response
+
+@app.after_request
+async def revalidate_response(response):
+    if core.conditional_etag(request, response) and core.not_modified(request, response, await response.get_data()):
+        response.status_code = 304
+        response.set_data(b'')
+    return response
+
+@app.route('/')
+async def index():
+    return await render_template_string(core.HTML_TEMPLATE)
+
+@app.route('/api/tables')
+async def get_tables():
+    return jsonify(TABLES)
+
+@app.route('/api/pool')
+async def get_pool_stats():
+    pool = get_pool()
+    stats = pool.get_stats()
+    in_use = stats.get('pool_size', 0) - stats.get('pool_available', 0)
+    stats['pid'] = os.getpid()
+    stats['in_use'] = in_use
+    stats['saturation'] = round(in_use / pool.max_size, 3)
+    return jsonify(stats)
+
+@app.route('/metrics')
+async def get_metrics():
+    pool_stats = _pool.get_stats() if _pool is not None else None
+    return Response(core.render_metrics(pool_stats), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/profiles')
+async def get_profiles():
+    return jsonify({'threshold_ms': core.PROFILE_SLOW_MS, 'requests': list(core._slow_requests)})
+
+@app.route('/api/statements')
+async def get_statement_stats():
+    return await respond(core.handle_statement_stats())
+
+@app.route('/api/indexes')
+async def get_index_report():
+    return await respond(core.handle_index_report())
+
+@app.route('/api/<table>', methods=['GET'])
+async def get_all_records(table):
+    return await respond(core.handle_list_records(table, request.args, request.headers))
+
+@app.route('/api/<table>', methods=['POST'])
+async def create_record(table):
+    return await respond(core.handle_create_record(table, await request.get_json()))
+
+@app.route('/api/<table>/<path:pk_values>', methods=['GET'])
+async def get_record(table, pk_values):
+    return await respond(core.handle_get_record(table, pk_values, request.headers))
+
+@app.route('/api/lookup/<table>', methods=['POST'])
+async def lookup_records(table):
+    return await respond(core.handle_lookup_records(table, await request.get_json()))
+
+@app.route('/api/<table>/<path:pk_values>', methods=['PUT'])
+async def update_record(table, pk_values):
+    return await respond(core.handle_update_record(table, pk_values, await request.get_json()))
+
+@app.route('/api/<table>/<path:pk_values>', methods=['DELETE'])
+async def delete_record(table, pk_values):
+    return await respond(core.handle_delete_record(table, pk_values))
+
+@app.route('/api/batch', methods=['POST'])
+async def run_batch():
+    return await respond(core.handle_batch(await request.get_json()))
+
+@app.route('/api/export/<table>')
+async def export_table(table):
+    if table not in TABLES:
+        return jsonify({'error': 'Table not found'}), 404
+    try:
+        fmt, columns, sql = core.export_sql(table, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    generate = export_csv if fmt == 'csv' else export_ndjson
+    return Response(generate(sql, columns), mimetype=core.EXPORT_MIMETYPES[fmt], headers=core.export_headers(table, fmt))
+
+async def export_ndjson(sql, columns):
+    async with get_connection() as conn:
+        cursor = core.json_cursor(conn, name='export')
+        cursor.itersize = core.EXPORT_FETCH_ROWS
+        await cursor.execute(sql)
+        buffer = []
+        size = 0
+        async for row in cursor:
+            line = app.json.dumps(dict(zip(columns, row))) + '\n'
+            buffer.append(line)
+            size += len(line)
+            if size >= core.EXPORT_CHUNK_BYTES:
+                yield ''.join(buffer).encode()
+                buffer = []
+                size = 0
+        if buffer:
+            yield ''.join(buffer).encode()
+        await cursor.close()
+
+async def export_csv(sql, columns):
+    async with get_connection() as conn:
+        cursor = conn.cursor()
+        buffer = bytearray()
+        async with cursor.copy(f'COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)') as copy:
+            async for data in copy:
+                buffer += data
+                if len(buffer) >= core.EXPORT_CHUNK_BYTES:
+                    yield bytes(buffer)
+                    buffer.clear()
+        if buffer:
+            yield bytes(buffer)
+
+@app.route('/api/import/<table>', methods=['POST'])
+async def import_table(table):
+    return await respond(core.handle_import(table, request.args, request.body, read_import_records))
+
+async def read_lines(body):
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    async for chunk in body:
+        pending += decoder.decode(chunk)
+        lines = pending.splitlines(keepends=True)
+        pending = lines.pop() if lines and not lines[-1].endswith(('\n', '\r')) else ''
+        for line in lines:
+            yield line
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+# csv.reader cannot be fed asynchronously, so lines are gathered until the
+# quotes balance (a quoted field may span lines) and each complete record is
+# parsed on its own, numbered like csv.DictReader.line_num in app.py.
+async def read_import_records(body, fmt):
+    line_no = 0
+    if fmt != 'csv':
+        async for line in read_lines(body):
+            line_no += 1
+            if line.strip():
+                yield line_no, core.parse_json_line(line_no, line)
+        return
+    header = None
+    record = []
+    async for line in read_lines(body):
+        line_no += 1
+        record.append(line)
+        if ''.join(record).count('"') % 2:
+            continue
+        values = next(csv.reader(record), [])
+        record = []
+        if not values:
+            continue
+        if header is None:
+            header = values
+            continue
+        if len(values) > len(header):
+            raise ValueError(f'Line {line_no}: more values than header columns')
+        yield line_no, dict(zip(header, values + [None] * (len(header) - len(values))))
+    if record:
+        raise ValueError(f'Line {line_no}: unterminated quoted field')
+
+@app.route('/api/seats/<int:showtime_id>')
+async def get_seat_availability(showtime_id):
+    return await respond(core.handle_seat_map(showtime_id, request.args))
+
+@app.route('/api/seats/<int:showtime_id>/best')
+async def get_best_seats(showtime_id):
+    return await respond(core.handle_best_seats(showtime_id, request.args))
+
+@app.route('/api/bookings', methods=['POST'])
+async def create_booking():
+    return await respond(core.handle_booking(await request.get_json()))
+
+@app.route('/api/holds', methods=['POST'])
+async def create_hold():
+    return await respond(core.handle_create_hold(await request.get_json()))
+
+@app.route('/api/holds/<hold_token>', methods=['GET'])
+async def get_hold(hold_token):
+    return await respond(core.handle_get_hold(hold_token))
+
+@app.route('/api/holds/<hold_token>', methods=['DELETE'])
+async def release_hold(hold_token):
+    return await respond(core.handle_release_hold(hold_token))
+
+# Concurrent misses share one in-flight query instead of each running it.
+_stats_task = None
+
+async def refresh_stats():
+    stats = await core.run_steps_async(core.read_stats(), get_connection)
+    core.store_stats(*stats)
+    return stats
+
+@app.route('/api/stats')
+async def get_stats():
+    global _stats_task
+    try:
+        if request.args.get('exact') == '1':
+            stats = await core.run_steps_async(core.read_stats(exact=True), get_connection)
+        else:
+            stats = core.cached_stats()
+            if stats is None:
+                if _stats_task is None or _stats_task.done():
+                    _stats_task = asyncio.ensure_future(refresh_stats())
+                stats = await asyncio.shield(_stats_task)
+    except Exception as e:
+        return core.db_error(e)
+    return core.stats_response(*stats)
+
+@app.route('/api/analytics')
+async def get_analytics_status():
+    return await respond(core.handle_analytics_status())
+
+@app.route('/api/analytics/<report>')
+async def get_analytics(report):
+    return await respond(core.handle_analytics(report, request.args))
+
+@app.route('/api/analytics/refresh', methods=['POST'])
+async def refresh_analytics_now():
+    return await respond(core.handle_refresh_analytics(request.args))
+
+@app.route('/api/live')
+async def get_live_counters():
+    return await respond(core.handle_live_counters(request.args))
+
+@app.route('/api/live/showtimes')
+async def get_live_showtimes():
+    return await respond(core.handle_live_showtimes(request.args))
+
+@app.route('/api/live/check', methods=['POST'])
+async def check_live():
+    return await respond(core.check_live_counters(request.args.get('repair') == '1'))
+
+@app.route('/api/events')
+async def stream_events():
+    try:
+        tables = core.parse_event_tables(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if len(core._subscribers) >= core.EVENTS_MAX_SUBSCRIBERS:
+        return jsonify({'error': 'Too many event subscribers, please retry'}), 503, {'Retry-After': '5'}
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+    subscription, replay = core.subscribe(tables, lambda: loop.call_soon_threadsafe(ready.set),
+                                          request.headers.get('Last-Event-ID'))
+
+    async def generate():
+        try:
+            yield core.event_preamble(replay)
+            while True:
+                try:
+                    await asyncio.wait_for(ready.wait(), core.EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    pass
+                ready.clear()
+                yield core.drain_events(subscription) or ': ping\n\n'
+        finally:
+            core.unsubscribe(subscription)
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/search/<table>')
+async def search_table(table):
+    return await respond(core.handle_search(table, request.args, request.headers))
+
+# ============================================
+# RUN THE APP
+# ============================================
+if __name__ == '__main__':
+    import uvicorn
+    core.init_db()
+    port = int(os.environ.get('PORT', 8080))
+    uvicorn.run(app, host='0.0.0.0', port=port)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Booking contention test: many concurrent buyers competing for the seats of a
+single showtime through POST /api/bookings.
+
+Creates a dedicated hall (rows x seats), a fresh showtime in it and then lets
+--buyers threads book random blocks of adjacent seats until the hall is sold
+out. Reports throughput and latency, and checks that no seat was sold twice.
+
+    python benchmarks/booking_contention.py --url http://localhost:8080 --buyers 200
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def call(base, method, path, body=None, raw=None):
+    data = raw if raw is not None else (json.dumps(body).encode() if body is not None else None)
+    req = urllib.request.Request(base + path, data=data, method=method, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            return resp.status, json.loads(resp.read() or b'null')
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b'null')
+
+
+def setup(base, hall_id, rows, seats_per_row):
+    call(base, 'POST', '/api/hall', {'hall_id': hall_id, 'hall_name': f'Bench Hall {hall_id}',
+                                     'capacity': rows * seats_per_row, 'cinema_id': 1})
+    lines = ['hall_id,seat_number,seat_row,seat_type']
+    for r in range(rows):
+        for n in range(1, seats_per_row + 1):
+            lines.append(f'{hall_id},{n},R{r:02d},{"VIP" if r >= rows - 2 else "Regular"}')
+    status, result = call(base, 'POST', '/api/import/seat?format=csv&mode=upsert', raw='\n'.join(lines).encode())
+    if status != 200:
+        raise SystemExit(f'seat import failed: {result}')
+    showtime_id = int(time.time()) % 1000000 + 100000
+    status, result = call(base, 'POST', '/api/showtime', {'showtime_id': showtime_id, 'movie_id': 1, 'hall_id': hall_id,
+                                                          'show_date': '2026-12-31', 'start_time': '20:00', 'end_time': '22:00'})
+    if status != 200:
+        raise SystemExit(f'showtime creation failed: {result}')
+    return showtime_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8080')
+    parser.add_argument('--buyers', type=int, default=200)
+    parser.add_argument('--hall-id', type=int, default=9001)
+    parser.add_argument('--rows', type=int, default=20)
+    parser.add_argument('--seats-per-row', type=int, default=20)
+    parser.add_argument('--max-block', type=int, default=4)
+    args = parser.parse_args()
+
+    base = args.url.rstrip('/')
+    showtime_id = setup(base, args.hall_id, args.rows, args.seats_per_row)
+    capacity = args.rows * args.seats_per_row
+    stats = {'ok': 0, 'conflict': 0, 'error': 0, 'seats': 0}
+    latencies = []
+    lock = threading.Lock()
+    sold_out = threading.Event()
+
+    def buyer(buyer_id):
+        rng = random.Random(buyer_id)
+        while not sold_out.is_set():
+            size = rng.randint(1, args.max_block)
+            row = rng.randrange(args.rows)
+            start = rng.randint(1, args.seats_per_row - size + 1)
+            seats = [{'seat_row': f'R{row:02d}', 'seat_number': n, 'kind': rng.choice(('adult', 'adult', 'child'))}
+                     for n in range(start, start + size)]
+            body = {'customer_id': 1 + buyer_id % 5, 'showtime_id': showtime_id, 'seats': seats,
+                    'payment': {'method': 'Cash', 'tendered': 9999}}
+            began = time.perf_counter()
+            status, result = call(base, 'POST', '/api/bookings', body)
+            elapsed = time.perf_counter() - began
+            with lock:
+                latencies.append(elapsed)
+                if status == 201:
+                    stats['ok'] += 1
+                    stats['seats'] += len(result['tickets'])
+                    if stats['seats'] >= capacity:
+                        sold_out.set()
+                elif status == 409:
+                    stats['conflict'] += 1
+                    # Stop once the hall is effectively full.
+                    if stats['conflict'] > 50 * capacity:
+                        sold_out.set()
+                else:
+                    stats['error'] += 1
+                    print('error', status, result)
+
+    began = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.buyers) as pool:
+        for i in range(args.buyers):
+            pool.submit(buyer, i)
+    elapsed = time.perf_counter() - began
+
+    status, seat_map = call(base, 'GET', f'/api/seats/{showtime_id}')
+    with urllib.request.urlopen(f'{base}/api/export/ticket?fields=showtime_id,seat_row,seat_number') as resp:
+        sold = [(t['seat_row'], t['seat_number']) for t in map(json.loads, resp)
+                if t['showtime_id'] == showtime_id]
+    latencies.sort()
+    requests_made = len(latencies)
+    print(f'showtime {showtime_id}: {capacity} seats, {args.buyers} concurrent buyers')
+    print(f'requests          {requests_made} in {elapsed:.2f}s ({requests_made / elapsed:.0f} req/s)')
+    print(f'bookings          {stats["ok"]} ok, {stats["conflict"]} conflicts, {stats["error"]} errors')
+    print(f'seats sold        {stats["seats"]} ({stats["seats"] / elapsed:.0f} seats/s), '
+          f'{capacity - seat_map["available"]} marked sold by /api/seats')
+    print(f'latency ms        p50 {latencies[requests_made // 2] * 1000:.1f}  '
+          f'p95 {latencies[int(requests_made * 0.95)] * 1000:.1f}  '
+          f'p99 {latencies[int(requests_made * 0.99)] * 1000:.1f}  '
+          f'mean {statistics.mean(latencies) * 1000:.1f}')
+    print(f'ticket rows       {len(sold)} for the showtime, {len(set(sold))} distinct seats')
+    if len(sold) != len(set(sold)) or len(sold) != stats['seats']:
+        raise SystemExit('DOUBLE SALE or lost ticket detected')
+
+
+if __name__ == '__main__':
+    main()
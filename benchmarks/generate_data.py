@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator: fills every table in TABLES with referentially
+consistent rows at a configurable scale, streamed through COPY by parallel
+worker processes.
+
+Every row is a pure function of its id and --seed, so any worker can compute
+the parent attributes it needs (a booking's showtime, that showtime's hall and
+movie, the movie's prices) without reading them back, and chunks of one table
+load concurrently. Tables are loaded level by level in foreign key order.
+
+The data respects every constraint in the schema: shows start at 10:00,
+13:30, 17:00 or 20:30 and last 80-180 minutes, so end_time > start_time;
+seat_type is Regular or VIP (the last two rows of a hall); each showtime's
+seats are split into disjoint blocks of up to four, one per booking, so no seat
+is sold twice; ticket prices, payment amounts and food order amounts are
+derived from the movie and food prices they stand for.
+
+It REPLACES the rows of all tables (asks for --yes when they are not empty),
+then resyncs the booking id sequences and ANALYZEs. Bookings hold 2.5 tickets
+on average; payments are one per booking plus one per food order.
+
+    python benchmarks/generate_data.py --cinemas 5 --tickets 100000
+    python benchmarks/generate_data.py --cinemas 50 --customers 2000000 --tickets 10000000 \\
+        --food-orders 16000000 --days 120 --workers 8 --yes
+"""
+import argparse
+import math
+import multiprocessing
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import app  # noqa: E402
+import psycopg  # noqa: E402
+
+CITIES = ['Tirana', 'Durres', 'Vlore', 'Shkoder', 'Elbasan', 'Korce', 'Fier', 'Berat', 'Lushnje', 'Pogradec']
+FIRST_NAMES = ['Arben', 'Maria', 'Dritan', 'Elena', 'Besnik', 'Alba', 'Bujar', 'Sara', 'Robert', 'Tom',
+               'Erion', 'Klea', 'Ledio', 'Jonida', 'Gent', 'Anisa', 'Ilir', 'Megi', 'Blerim', 'Dea']
+LAST_NAMES = ['Hoxha', 'Koci', 'Leka', 'Brahimi', 'Shehu', 'Hoti', 'Duka', 'Kelmendi', 'Pasha', 'Berisha',
+              'Gjoka', 'Marku', 'Prifti', 'Cela', 'Basha', 'Dervishi', 'Kola', 'Meta', 'Rama', 'Zeneli']
+DEPARTMENTS = ['Management', 'Box Office', 'Concessions', 'Projection', 'Maintenance', 'Security']
+GENRES = ['Action', 'Comedy', 'Drama', 'Horror', 'Science Fiction', 'Romance', 'Thriller', 'Animation', 'Adventure', 'Fantasy']
+FOODS = [('Small Popcorn', 35000), ('Medium Popcorn', 50000), ('Large Popcorn', 65000), ('Small Soda', 20000),
+         ('Medium Soda', 30000), ('Large Soda', 40000), ('Hot Dog', 45000), ('Nachos', 55000)]
+LANGUAGES = ['English', 'Albanian', 'Italian', 'French', 'German']
+SLOTS = [600, 810, 1020, 1230]  # minutes after midnight: 10:00, 13:30, 17:00, 20:30
+MAX_BLOCK = 4
+CHUNK = 100000
+
+# Each table's rows are produced per id of a driver entity: seats per hall,
+# tickets and the booking payment per booking, and so on. Tables in one
+# level only reference tables in earlier levels.
+LEVELS = [
+    ['cinema', 'department', 'genre', 'food', 'customer', 'movie'],
+    ['hall', 'employee', 'movie_genre'],
+    ['seat', 'showtime', 'manager', 'cashier', 'cleaner', 'showtime_supervisor'],
+    ['booking', 'food_order'],
+    ['ticket', 'order_food', 'payment'],
+    ['card_payment', 'cash_payment'],
+]
+
+
+def mix(n, salt):
+    # Cheap deterministic 32-bit hash; random.Random per row would dominate
+    # the generator's run time.
+    x = (n * 0x9E3779B1 + salt * 0x85EBCA77 + SEED * 0xC2B2AE3D) & 0xFFFFFFFF
+    x ^= x >> 15
+    x = (x * 0x2C1B3C6D) & 0xFFFFFFFF
+    x ^= x >> 12
+    x = (x * 0x297A2D39) & 0xFFFFFFFF
+    return x ^ (x >> 15)
+
+
+SEED = 0
+CFG = {}
+
+
+def plan(args):
+    if args.rows_per_hall > 26:
+        raise SystemExit('--rows-per-hall is at most 26 (rows are lettered A-Z)')
+    halls = args.cinemas * args.halls_per_cinema
+    showtimes = halls * args.days * len(SLOTS)
+    per_showtime = args.rows_per_hall * args.seats_per_row // MAX_BLOCK
+    bookings = math.ceil(args.tickets / 2.5)
+    if bookings > showtimes * per_showtime:
+        raise SystemExit(f'{args.tickets} tickets do not fit in {showtimes} showtimes; raise --days or the hall size')
+    return {'seed': args.seed, 'cinemas': args.cinemas, 'halls_per_cinema': args.halls_per_cinema, 'halls': halls,
+            'rows': args.rows_per_hall, 'seats': args.seats_per_row, 'days': args.days, 'showtimes': showtimes,
+            'movies': args.movies, 'customers': args.customers, 'bookings': bookings, 'food_orders': args.food_orders,
+            'employees_per_cinema': args.employees_per_cinema, 'employees': args.cinemas * args.employees_per_cinema,
+            'payments': bookings + args.food_orders, 'start': date.fromisoformat(args.start_date)}
+
+
+def driver_count(table):
+    return {'cinema': CFG['cinemas'], 'department': len(DEPARTMENTS), 'genre': len(GENRES), 'food': len(FOODS),
+            'customer': CFG['customers'], 'movie': CFG['movies'], 'hall': CFG['halls'],
+            'employee': CFG['employees'], 'movie_genre': CFG['movies'], 'seat': CFG['halls'],
+            'showtime': CFG['showtimes'], 'manager': CFG['employees'], 'cashier': CFG['employees'],
+            'cleaner': CFG['employees'], 'showtime_supervisor': CFG['employees'], 'booking': CFG['bookings'],
+            'food_order': CFG['food_orders'], 'ticket': CFG['bookings'], 'order_food': CFG['food_orders'],
+            'payment': CFG['payments'], 'card_payment': CFG['payments'], 'cash_payment': CFG['payments']}[table]
+
+
+def money(cents):
+    return f'{cents // 100}.{cents % 100:02d}'
+
+
+def clock_time(minutes):
+    return f'{minutes // 60:02d}:{minutes % 60:02d}:00'
+
+
+def person(n, salt):
+    return f'{FIRST_NAMES[mix(n, salt) % len(FIRST_NAMES)]} {LAST_NAMES[mix(n, salt + 1) % len(LAST_NAMES)]}'
+
+
+def movie_prices(movie_id):
+    adult = 50000 + mix(movie_id, 3) % 8 * 5000
+    return adult, adult - 20000
+
+
+def movie_duration(movie_id):
+    return 80 + mix(movie_id, 2) % 101
+
+
+def showtime(showtime_id):
+    index = showtime_id - 1
+    hall_id = index % CFG['halls'] + 1
+    day, slot = divmod(index // CFG['halls'], len(SLOTS))
+    movie_id = mix(showtime_id, 1) % CFG['movies'] + 1
+    return hall_id, movie_id, CFG['start'] + timedelta(days=day), SLOTS[slot]
+
+
+def booking(booking_id):
+    index = booking_id - 1
+    showtime_id = index % CFG['showtimes'] + 1
+    block = index // CFG['showtimes']
+    seats = 1 + mix(booking_id, 4) % MAX_BLOCK
+    children = mix(booking_id, 5) % (seats + 1) if mix(booking_id, 6) % 4 == 0 else 0
+    hall_id, movie_id, show_date, _ = showtime(showtime_id)
+    return {'showtime_id': showtime_id, 'block': block, 'seats': seats, 'children': children, 'hall_id': hall_id,
+            'movie_id': movie_id, 'customer_id': mix(booking_id, 7) % CFG['customers'] + 1,
+            'date': show_date - timedelta(days=mix(booking_id, 8) % 14)}
+
+
+def food_items(order_id):
+    first = mix(order_id, 20) % len(FOODS)
+    return [((first + k) % len(FOODS) + 1, 1 + mix(order_id, 21 + k) % 3) for k in range(1 + mix(order_id, 22) % 3)]
+
+
+def payment_method(payment_id):
+    return 'Cash' if mix(payment_id, 9) % 3 == 0 else 'Card'
+
+
+def payment(payment_id):
+    if payment_id <= CFG['bookings']:
+        b = booking(payment_id)
+        adult, kids = movie_prices(b['movie_id'])
+        amount = (b['seats'] - b['children']) * adult + b['children'] * kids
+        return payment_id, None, b['date'], amount, b['customer_id']
+    order_id = payment_id - CFG['bookings']
+    amount = sum(FOODS[food_id - 1][1] * quantity for food_id, quantity in food_items(order_id))
+    return None, order_id, food_order_date(order_id), amount, mix(order_id, 23) % CFG['customers'] + 1
+
+
+def food_order_date(order_id):
+    return CFG['start'] + timedelta(days=mix(order_id, 24) % CFG['days'])
+
+
+def employee_kind(employee_id):
+    kind = (employee_id - 1) % 10
+    return 'manager' if kind == 0 else 'cashier' if kind < 5 else 'cleaner' if kind < 8 else 'showtime_supervisor'
+
+
+def rows(table, n):
+    """Rows for driver id n, as tuples in TABLES column order."""
+    if table == 'cinema':
+        city = CITIES[(n - 1) % len(CITIES)]
+        yield n, city, f'Cineplexx {city} {n}'
+    elif table == 'department':
+        yield n, DEPARTMENTS[n - 1]
+    elif table == 'genre':
+        yield n, GENRES[n - 1]
+    elif table == 'food':
+        yield n, FOODS[n - 1][0], money(FOODS[n - 1][1])
+    elif table == 'customer':
+        birth = date(1950, 1, 1) + timedelta(days=mix(n, 30) % 20000)
+        yield n, person(n, 31), f'+3556{n:09d}', f'customer{n}@example.com', birth, 'Female' if mix(n, 33) % 2 else 'Male'
+    elif table == 'movie':
+        adult, kids = movie_prices(n)
+        release = CFG['start'] - timedelta(days=mix(n, 34) % 365)
+        yield (n, f'Movie {n}', movie_duration(n), release, LANGUAGES[mix(n, 35) % len(LANGUAGES)],
+               [0, 7, 12, 13, 16, 18][mix(n, 36) % 6], money(adult), money(kids))
+    elif table == 'hall':
+        cinema_id = (n - 1) // CFG['halls_per_cinema'] + 1
+        yield n, f'Hall {(n - 1) % CFG["halls_per_cinema"] + 1}', CFG['rows'] * CFG['seats'], cinema_id
+    elif table == 'employee':
+        cinema_id = (n - 1) // CFG['employees_per_cinema'] + 1
+        role = {'manager': 'Manager', 'cashier': 'Cashier', 'cleaner': 'Cleaner', 'showtime_supervisor': 'Supervisor'}[employee_kind(n)]
+        birth = date(1960, 1, 1) + timedelta(days=mix(n, 40) % 14000)
+        yield (n, person(n, 41), role, f'+3558{n:09d}', f'employee{n}@cineplexx.example', birth,
+               mix(n, 43) % len(DEPARTMENTS) + 1, cinema_id)
+    elif table == 'movie_genre':
+        first = mix(n, 50) % len(GENRES)
+        for k in range(1 + mix(n, 51) % 3):
+            yield n, (first + k) % len(GENRES) + 1
+    elif table == 'seat':
+        for row in range(CFG['rows']):
+            seat_type = 'VIP' if row >= CFG['rows'] - 2 else 'Regular'
+            for number in range(1, CFG['seats'] + 1):
+                yield n, number, chr(65 + row), seat_type
+    elif table == 'showtime':
+        hall_id, movie_id, show_date, start = showtime(n)
+        yield n, movie_id, hall_id, show_date, clock_time(start), clock_time(start + movie_duration(movie_id))
+    elif table in ('manager', 'cashier', 'cleaner', 'showtime_supervisor'):
+        if employee_kind(n) != table:
+            return
+        hired = CFG['start'] - timedelta(days=30 + mix(n, 60) % 3000)
+        shift = ['Morning', 'Afternoon', 'Night'][mix(n, 61) % 3]
+        if table == 'manager':
+            yield n, 1 + mix(n, 62) % 3, ['Full-time', 'Part-time', 'Contract'][mix(n, 63) % 3], hired
+        elif table == 'cashier':
+            yield n, shift, hired, ['Active', 'Active', 'Active', 'Inactive', 'On Leave'][mix(n, 64) % 5]
+        else:
+            yield n, shift
+    elif table == 'booking':
+        b = booking(n)
+        yield n, b['customer_id'], b['showtime_id'], b['date'], b['seats'] - b['children'], b['children']
+    elif table == 'ticket':
+        b = booking(n)
+        adult, kids = movie_prices(b['movie_id'])
+        for k in range(b['seats']):
+            row, number = divmod(b['block'] * MAX_BLOCK + k, CFG['seats'])
+            price = adult if k < b['seats'] - b['children'] else kids
+            yield (n - 1) * MAX_BLOCK + k + 1, n, b['showtime_id'], b['hall_id'], number + 1, chr(65 + row), money(price)
+    elif table == 'food_order':
+        amount = sum(FOODS[food_id - 1][1] * quantity for food_id, quantity in food_items(n))
+        yield n, mix(n, 23) % CFG['customers'] + 1, food_order_date(n), clock_time(540 + mix(n, 25) % 840), money(amount)
+    elif table == 'order_food':
+        for food_id, quantity in food_items(n):
+            yield n, food_id, quantity
+    elif table == 'payment':
+        booking_id, order_id, paid_on, amount, _ = payment(n)
+        status = 'Failed' if mix(n, 70) % 50 == 0 else 'Completed'
+        yield n, booking_id, order_id, paid_on, clock_time(540 + mix(n, 71) % 840), money(amount), status, payment_method(n)
+    elif table == 'card_payment':
+        if payment_method(n) == 'Card':
+            _, _, paid_on, _, customer_id = payment(n)
+            expiry = paid_on.replace(day=1) + timedelta(days=365 * (1 + mix(n, 72) % 5))
+            yield (n, f'4532XXXXXXXX{mix(n, 73) % 10000:04d}', ['Visa', 'Mastercard', 'Amex', 'Discover'][mix(n, 74) % 4],
+                   expiry.replace(day=1), person(customer_id, 31))
+    elif table == 'cash_payment':
+        if payment_method(n) == 'Cash':
+            yield n, money(mix(n, 75) % 100000)
+
+
+def copy_line(row):
+    return '\t'.join(['\\N' if value is None else str(value) for value in row]) + '\n'
+
+
+def init_worker(cfg):
+    global CFG, SEED
+    CFG = cfg
+    SEED = cfg['seed']
+
+
+def load_chunk(task):
+    table, start, end = task
+    columns = ', '.join([f'"{col}"' for col in app.TABLES[table]['columns']])
+    count = 0
+    with psycopg.connect(app.DATABASE_URL) as conn:
+        conn.execute('SET synchronous_commit = off')
+        with conn.cursor().copy(f'COPY "{table}" ({columns}) FROM STDIN') as copy:
+            buffer = []
+            for n in range(start, end):
+                for row in rows(table, n):
+                    buffer.append(copy_line(row))
+                if len(buffer) >= 10000:
+                    copy.write(''.join(buffer))
+                    count += len(buffer)
+                    buffer = []
+            if buffer:
+                copy.write(''.join(buffer))
+                count += len(buffer)
+    return table, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cinemas', type=int, default=5)
+    parser.add_argument('--halls-per-cinema', type=int, default=8)
+    parser.add_argument('--rows-per-hall', type=int, default=12)
+    parser.add_argument('--seats-per-row', type=int, default=16)
+    parser.add_argument('--employees-per-cinema', type=int, default=40)
+    parser.add_argument('--movies', type=int, default=200)
+    parser.add_argument('--customers', type=int, default=10000)
+    parser.add_argument('--tickets', type=int, default=100000, help='approximate; bookings hold 2.5 on average')
+    parser.add_argument('--food-orders', type=int, default=50000)
+    parser.add_argument('--days', type=int, default=30, help='days of showtimes, four shows per hall per day')
+    parser.add_argument('--start-date', default='2026-01-01')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--yes', action='store_true', help='replace existing rows without asking')
+    args = parser.parse_args()
+    cfg = plan(args)
+    init_worker(cfg)
+
+    app.migrate()
+    tables = [table for level in LEVELS for table in level]
+    assert sorted(tables) == sorted(app.TABLES), 'LEVELS must cover TABLES'
+    with app.get_connection() as conn:
+        if conn.execute('SELECT 1 FROM cinema LIMIT 1').fetchone() and not args.yes:
+            raise SystemExit('Tables already hold rows; pass --yes to replace them')
+        conn.execute('TRUNCATE ' + ', '.join([f'"{table}"' for table in tables + ['seat_hold', 'live_showtime', 'live_cinema_day']]))
+        conn.commit()
+
+    began = time.perf_counter()
+    totals = {}
+    with multiprocessing.Pool(args.workers, initializer=init_worker, initargs=(cfg,)) as pool:
+        for level in LEVELS:
+            level_began = time.perf_counter()
+            tasks = [(table, start, min(start + CHUNK, driver_count(table) + 1))
+                     for table in level for start in range(1, driver_count(table) + 1, CHUNK)]
+            for table, count in pool.imap_unordered(load_chunk, tasks):
+                totals[table] = totals.get(table, 0) + count
+            print(f"{', '.join(level)}: {sum(totals.get(t, 0) for t in level)} rows "
+                  f"in {time.perf_counter() - level_began:.1f}s", flush=True)
+
+    with app.get_connection() as conn:
+        app.sync_booking_sequences(conn)
+        conn.execute('ANALYZE')
+        conn.commit()
+    elapsed = time.perf_counter() - began
+    total = sum(totals.values())
+    print(f"Loaded {total} rows into {len(totals)} tables in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)")
+    for table in tables:
+        print(f"{table:>20}  {totals.get(table, 0):>12}")
+
+
+if __name__ == '__main__':
+    main()
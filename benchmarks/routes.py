@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Route benchmark: drives every route in app.py (list, get, create, update,
+delete and search for each table in TABLES, plus stats) at several concurrency
+levels and reports throughput, p50/p95/p99 latency and database round trips
+per request, as counted by the server in the X-DB-Round-Trips header.
+
+Load the synthetic dataset and start a server first, e.g.
+
+    python benchmarks/generate_data.py --customers 100000 --tickets 1000000 --yes
+    gunicorn -w 4 -b 127.0.0.1:8080 app:app
+    python benchmarks/routes.py --url http://127.0.0.1:8080 --concurrency 1,8,32 \\
+        --output results/$(git rev-parse --short HEAD).json
+
+Results are written as JSON keyed by scenario, table and concurrency, so two
+runs can be compared; --compare exits non-zero when a scenario got slower than
+--threshold percent at p95 or lost that much throughput:
+
+    python benchmarks/routes.py --output new.json --compare results/baseline.json
+
+Creates insert rows with primary keys above --id-base and the delete scenario
+removes exactly those rows again, so the dataset is unchanged after a run.
+Updates write each sampled row back with its own values.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote, urlencode, urlsplit
+
+SAMPLE_ROWS = 50
+
+
+class Client:
+    # One keep-alive connection per worker thread, so the numbers measure the
+    # server rather than TCP setup.
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+
+    def call(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {'Content-Type': 'application/json'} if data is not None else {}
+        try:
+            self.conn.request(method, path, body=data, headers=headers)
+            resp = self.conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            self.conn.close()
+            self.conn.request(method, path, body=data, headers=headers)
+            resp = self.conn.getresponse()
+        payload = resp.read()
+        return resp.status, payload, resp.getheader('X-DB-Round-Trips')
+
+    def close(self):
+        self.conn.close()
+
+
+def call_json(url, method, path, body=None):
+    client = Client(url)
+    try:
+        status, payload, _ = client.call(method, path, body)
+    finally:
+        client.close()
+    return status, json.loads(payload or b'null')
+
+
+def pk_path(schema, row):
+    return '/'.join([quote(str(row[col]), safe='') for col in schema['pk']])
+
+
+def unique_value(col, typ, n):
+    # Columns that carry unique constraints in the schema (emails, phone
+    # numbers) get a value derived from the new key instead of the sample's.
+    if 'email' in col:
+        return f'bench{n}@bench.example'
+    if 'phone' in col:
+        return f'+1{n:010d}'[:int(typ[8:-1]) if typ.startswith('varchar(') else None]
+    return None
+
+
+class TablePlan:
+    def __init__(self, name, schema, rows, id_base):
+        self.name = name
+        self.schema = schema
+        self.rows = rows
+        self.keys = itertools.count(id_base)
+        self.created = []
+        self.created_lock = threading.Lock()
+        self.skipped = {}
+        int_pk = [col for col in schema['pk'] if schema['types'][schema['columns'].index(col)] == 'int']
+        self.key_col = int_pk[-1] if int_pk else None
+        self.query = None
+        for col, typ in zip(schema['columns'], schema['types']):
+            if 'varchar' in typ and rows and isinstance(rows[0].get(col), str) and len(rows[0][col]) >= 3:
+                self.query = rows[0][col].split()[0][:3]
+                break
+
+    def sample(self, i):
+        return self.rows[i % len(self.rows)]
+
+    def new_row(self):
+        n = next(self.keys)
+        row = dict(self.sample(n))
+        row[self.key_col] = n
+        for col, typ in zip(self.schema['columns'], self.schema['types']):
+            value = unique_value(col, typ, n)
+            if value is not None and row.get(col) is not None:
+                row[col] = value
+        return row
+
+    def update_body(self, row):
+        return {col: ('' if row[col] is None else row[col]) for col in self.schema['columns']
+                if col not in self.schema['pk'] and col in row}
+
+
+def plan_tables(url, names, id_base):
+    status, tables = call_json(url, 'GET', '/api/tables')
+    if status != 200:
+        raise SystemExit(f'/api/tables failed with {status}')
+    plans = []
+    for name in names or tables:
+        status, page = call_json(url, 'GET', f'/api/{name}?limit={SAMPLE_ROWS}')
+        if status != 200:
+            raise SystemExit(f'/api/{name} failed with {status}: {page}')
+        plan = TablePlan(name, tables[name], page['data'], id_base)
+        if not plan.rows:
+            plan.skipped['all'] = 'table is empty'
+        elif plan.key_col is None:
+            plan.skipped['create'] = plan.skipped['delete'] = 'no integer primary key column'
+        else:
+            # Probe with one insert: tables whose key is also a foreign key
+            # (or that have other unique columns) cannot take cloned rows.
+            row = plan.new_row()
+            status, result = call_json(url, 'POST', f'/api/{name}', row)
+            if status != 200:
+                plan.skipped['create'] = plan.skipped['delete'] = f'probe insert failed: {result}'
+            else:
+                call_json(url, 'DELETE', f'/api/{name}/{pk_path(plan.schema, row)}')
+        if plan.query is None:
+            plan.skipped['search'] = 'no text column to search'
+        plans.append(plan)
+    return plans
+
+
+def scenarios(plans):
+    # Each scenario is (name, table, request factory). A factory returns the
+    # next (method, path, body) for worker i, or None once it is exhausted.
+    for plan in plans:
+        if 'all' in plan.skipped:
+            continue
+        name = plan.name
+
+        def get_list(i, name=name):
+            return 'GET', f'/api/{name}?limit=50', None
+
+        def get_one(i, plan=plan):
+            return 'GET', f'/api/{plan.name}/{pk_path(plan.schema, plan.sample(i))}', None
+
+        def search(i, plan=plan):
+            return 'GET', f'/api/search/{plan.name}?' + urlencode({'q': plan.query}), None
+
+        def update(i, plan=plan):
+            row = plan.sample(i)
+            return 'PUT', f'/api/{plan.name}/{pk_path(plan.schema, row)}', plan.update_body(row)
+
+        def create(i, plan=plan):
+            row = plan.new_row()
+            with plan.created_lock:
+                plan.created.append(row)
+            return 'POST', f'/api/{plan.name}', row
+
+        def delete(i, plan=plan):
+            with plan.created_lock:
+                if not plan.created:
+                    return None
+                row = plan.created.pop()
+            return 'DELETE', f'/api/{plan.name}/{pk_path(plan.schema, row)}', None
+
+        yield 'list', name, get_list
+        yield 'get', name, get_one
+        if 'search' not in plan.skipped:
+            yield 'search', name, search
+        yield 'update', name, update
+        if 'create' not in plan.skipped:
+            # Delete runs right after create and removes what it inserted.
+            yield 'create', name, create
+            yield 'delete', name, delete
+    yield 'stats', None, lambda i: ('GET', '/api/stats', None)
+
+
+def run(url, factory, concurrency, duration):
+    samples = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    counter = itertools.count()
+
+    def worker():
+        client = Client(url)
+        local = []
+        try:
+            while time.perf_counter() < deadline:
+                request = factory(next(counter))
+                if request is None:
+                    break
+                began = time.perf_counter()
+                status, payload, trips = client.call(*request)
+                elapsed = time.perf_counter() - began
+                if status >= 400:
+                    with lock:
+                        errors.append((status, payload[:200]))
+                else:
+                    local.append((elapsed, int(trips) if trips is not None else None))
+        finally:
+            client.close()
+            with lock:
+                samples.extend(local)
+
+    began = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    return summarize(samples, errors, elapsed)
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(samples, errors, elapsed):
+    latencies = sorted([s[0] for s in samples])
+    trips = [s[1] for s in samples if s[1] is not None]
+    result = {'requests': len(samples), 'errors': len(errors), 'seconds': round(elapsed, 3),
+              'rps': round(len(samples) / elapsed, 1) if elapsed else 0.0}
+    if latencies:
+        result.update(p50_ms=round(percentile(latencies, 0.50) * 1000, 3),
+                      p95_ms=round(percentile(latencies, 0.95) * 1000, 3),
+                      p99_ms=round(percentile(latencies, 0.99) * 1000, 3),
+                      mean_ms=round(statistics.mean(latencies) * 1000, 3))
+    result['round_trips'] = round(statistics.mean(trips), 2) if trips else None
+    if errors:
+        result['first_error'] = f'{errors[0][0]} {errors[0][1].decode(errors="replace")}'
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result):
+    return result['scenario'], result['table'], result['concurrency']
+
+
+def compare(results, baseline, threshold):
+    previous = {result_key(r): r for r in baseline['results']}
+    regressions = 0
+    print(f'\ncompared with {baseline["meta"].get("commit") or "baseline"} (threshold {threshold:g}%)')
+    for result in results:
+        old = previous.get(result_key(result))
+        if not old or 'p95_ms' not in old or 'p95_ms' not in result:
+            continue
+        p95 = (result['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 if old['p95_ms'] else 0.0
+        rps = (result['rps'] - old['rps']) / old['rps'] * 100 if old['rps'] else 0.0
+        trips = result['round_trips'] != old['round_trips']
+        slower = p95 > threshold or rps < -threshold
+        if slower or trips:
+            regressions += slower
+            scenario, table, concurrency = result_key(result)
+            print(f'  {"SLOWER" if slower else "changed":<8}{scenario:<8}{table or "-":<22}c={concurrency:<5}'
+                  f'p95 {p95:+6.1f}%  rps {rps:+6.1f}%  round trips {old["round_trips"]} -> {result["round_trips"]}')
+    print(f'{regressions} regressions')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8080')
+    parser.add_argument('--concurrency', default='1,8,32', help='comma separated levels')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per scenario and level')
+    parser.add_argument('--tables', help='comma separated subset of TABLES (default: all)')
+    parser.add_argument('--scenarios', help='comma separated subset of list,get,search,update,create,delete,stats')
+    parser.add_argument('--id-base', type=int, default=900000000, help='first primary key used by create')
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=10.0, help='regression threshold in percent')
+    args = parser.parse_args()
+
+    url = args.url.rstrip('/')
+    levels = [int(c) for c in args.concurrency.split(',')]
+    names = args.tables.split(',') if args.tables else None
+    wanted = set(args.scenarios.split(',')) if args.scenarios else None
+    plans = plan_tables(url, names, args.id_base)
+    for plan in plans:
+        for scenario, reason in plan.skipped.items():
+            print(f'skipping {scenario} on {plan.name}: {reason}')
+
+    results = []
+    print(f'{"scenario":<8}{"table":<22}{"conc":>5}{"req/s":>10}{"p50 ms":>9}{"p95 ms":>9}'
+          f'{"p99 ms":>9}{"trips":>7}{"errors":>8}')
+    for concurrency in levels:
+        for scenario, table, factory in scenarios(plans):
+            if wanted and scenario not in wanted:
+                continue
+            result = run(url, factory, concurrency, args.duration)
+            result.update(scenario=scenario, table=table, concurrency=concurrency)
+            results.append(result)
+            print(f'{scenario:<8}{table or "-":<22}{concurrency:>5}{result["rps"]:>10.1f}'
+                  f'{result.get("p50_ms", 0):>9.2f}{result.get("p95_ms", 0):>9.2f}{result.get("p99_ms", 0):>9.2f}'
+                  f'{result["round_trips"] if result["round_trips"] is not None else "-":>7}{result["errors"]:>8}')
+            if result.get('first_error'):
+                print(f'    first error: {result["first_error"]}')
+
+    # Rows left over when delete ran out of time before create's inserts did.
+    for plan in plans:
+        for row in plan.created:
+            call_json(url, 'DELETE', f'/api/{plan.name}/{pk_path(plan.schema, row)}')
+
+    report = {
+        'meta': {'url': url, 'commit': git_commit(), 'started': datetime.now(timezone.utc).isoformat(),
+                 'duration': args.duration, 'concurrency': levels, 'python': platform.python_version(),
+                 'host': platform.node(),
+                 'skipped': {plan.name: plan.skipped for plan in plans if plan.skipped}},
+        'results': results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'results written to {args.output}')
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
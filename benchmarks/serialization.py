@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Row serialization benchmark: fetches --rows synthetic rows shaped like the
+wider TABLES (int, varchar, date, time, decimal columns) and turns them into a
+JSON response body through each pipeline, reporting rows/sec.
+
+    before        default loaders, per-cell serialize_row, dict rows, json
+    loaders       json_cursor loaders, dict rows, json
+    columns       json_cursor loaders, column arrays, json
+    columns+orjson  as columns, encoded with orjson (when installed)
+
+    DATABASE_URL=... python benchmarks/serialization.py --rows 200000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, time as dtime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import app  # noqa: E402
+
+SQL = '''SELECT i AS id, 'Customer ' || i AS full_name, 'customer' || i || '@example.com' AS email,
+    DATE '2020-01-01' + (i %% 2000) AS show_date, TIME '10:00' + make_interval(mins => i %% 720) AS start_time,
+    ((i %% 90000) / 100.0)::numeric(8, 2) AS amount, (i %% 7)::int AS adult_seat
+    FROM generate_series(1, %s) AS i'''
+
+
+def serialize_row(row, columns):
+    # The per-cell conversion the read routes ran before json_cursor.
+    result = {}
+    for i, col in enumerate(columns):
+        value = row[i]
+        if isinstance(value, (date, dtime)):
+            result[col] = str(value)
+        elif isinstance(value, Decimal):
+            result[col] = float(value)
+        else:
+            result[col] = value
+    return result
+
+
+def stdlib_dumps(obj):
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'))
+
+
+def run(conn, rows, pipeline):
+    began = time.perf_counter()
+    cursor = app.json_cursor(conn) if pipeline != 'before' else conn.cursor()
+    cursor.execute(SQL, [rows])
+    columns = [desc[0] for desc in cursor.description]
+    data = cursor.fetchall()
+    fetched = time.perf_counter()
+    if pipeline == 'before':
+        body = stdlib_dumps({'columns': columns, 'data': [serialize_row(row, columns) for row in data]})
+    elif pipeline == 'loaders':
+        body = stdlib_dumps(app.rows_payload(columns, data))
+    elif pipeline == 'columns':
+        body = stdlib_dumps(app.rows_payload(columns, data, 'columns'))
+    else:
+        body = app.app.json.dumps(app.rows_payload(columns, data, 'columns'))
+    done = time.perf_counter()
+    return {'pipeline': pipeline, 'rows': rows, 'bytes': len(body),
+            'fetch_s': round(fetched - began, 3), 'serialize_s': round(done - fetched, 3),
+            'rows_per_s': round(rows / (done - began)), 'serialize_rows_per_s': round(rows / (done - fetched))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    pipelines = ['before', 'loaders', 'columns']
+    if app.orjson is not None and app.JSON_ENCODER == 'orjson':
+        pipelines.append('columns+orjson')
+    results = []
+    with app.get_connection() as conn:
+        for pipeline in pipelines:
+            best = max((run(conn, args.rows, pipeline) for _ in range(args.repeat)), key=lambda r: r['rows_per_s'])
+            results.append(best)
+            if not args.json:
+                print(f"{pipeline:>15}  {best['rows_per_s']:>9} rows/s end to end  "
+                      f"{best['serialize_rows_per_s']:>9} rows/s serializing  {best['bytes']:>10} bytes", flush=True)
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Sync vs async serving comparison: drives the same read-mostly request mix at
+the gunicorn (app:app) and uvicorn (asgi_app:app) servers at increasing
+concurrency and reports throughput and latency percentiles for each.
+
+Start both servers first, e.g.
+
+    gunicorn -w 4 -b 127.0.0.1:8080 app:app
+    uvicorn asgi_app:app --port 8081
+    python benchmarks/sync_vs_async.py --target sync=http://127.0.0.1:8080 \\
+        --target async=http://127.0.0.1:8081 --concurrency 1,16,64,256
+
+Requests are issued from one asyncio loop (one connection per request), so the
+client can keep hundreds in flight without a thread per request.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = [
+    '/api/showtime?limit=50',
+    '/api/movie/1',
+    '/api/customer?limit=20&order_by=-customer_id',
+    '/api/search/customer?q=ma',
+    '/api/seats/1',
+    '/api/stats',
+]
+
+
+async def fetch(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n'.encode())
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    return int(response.split(b' ', 2)[1])
+
+
+async def run_level(base, paths, concurrency, duration):
+    parts = urlsplit(base)
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client(client_id):
+        nonlocal errors
+        i = client_id
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            began = time.perf_counter()
+            try:
+                status = await fetch(parts.hostname, parts.port or 80, path)
+            except (OSError, ValueError, IndexError):
+                status = 0
+            latencies.append(time.perf_counter() - began)
+            if status != 200:
+                errors += 1
+
+    began = time.perf_counter()
+    await asyncio.gather(*[client(n) for n in range(concurrency)])
+    elapsed = time.perf_counter() - began
+    latencies.sort()
+    if not latencies:
+        return {'concurrency': concurrency, 'requests': 0, 'errors': errors}
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [latencies[0]] * 99
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(cuts[49] * 1000, 1),
+        'p95_ms': round(cuts[94] * 1000, 1),
+        'p99_ms': round(cuts[98] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', action='append', required=True, help='name=url, repeatable')
+    parser.add_argument('--concurrency', default='1,16,64,256')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--path', action='append', help='request path, repeatable (default: a read-mostly mix)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(',')]
+    paths = args.path or DEFAULT_PATHS
+    results = []
+    for target in args.target:
+        name, _, base = target.partition('=')
+        for concurrency in levels:
+            result = asyncio.run(run_level(base.rstrip('/'), paths, concurrency, args.duration))
+            result['target'] = name
+            results.append(result)
+            if not args.json:
+                print(f"{name:>8} c={concurrency:<4} {result.get('rps', 0):>8} req/s  p50 {result.get('p50_ms', '-')} ms"
+                      f"  p95 {result.get('p95_ms', '-')} ms  p99 {result.get('p99_ms', '-')} ms  errors {result['errors']}",
+                      flush=True)
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()